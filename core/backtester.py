@@ -1,11 +1,15 @@
 import os
+import time
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import List, Optional
 import plotly.express as px
 import plotly.graph_objects as go
 import plotly.io as pio
 
+from core.robustness import analyze_portfolio
+from core.results_store import ResultsStore, data_fingerprint, portfolio_symbol_metrics, strategy_params
+
 
 class Backtester:
     """
@@ -13,13 +17,22 @@ class Backtester:
     Збирає метрики, будує графіки, генерує HTML-звіти.
     """
 
-    def __init__(self, strategies: List, results_path: str = "./results"):
+    def __init__(self, strategies: List, results_path: str = "./results", robustness_sims: int = 0,
+                 report_every: int = 60, store_path: Optional[str] = None):
         """
         :param strategies: список екземплярів класів (наслідуваних від StrategyBase)
         :param results_path: директорія для збереження результатів (csv, графіки, html)
+        :param robustness_sims: якщо > 0 – кількість Monte Carlo/бутстрап симуляцій
+                                для довірчих інтервалів метрик (core.robustness)
+        :param report_every: крок (у барах) проріджування рядів ковзних метрик і equity curve
+        :param store_path: SQLite-сховище результатів (за замовчуванням results_path/results.db);
+                           кожен run_all дописує туди новий запуск
         """
         self.strategies = strategies
         self.results_path = results_path
+        self.robustness_sims = robustness_sims
+        self.report_every = report_every
+        self.store = ResultsStore(store_path or os.path.join(self.results_path, "results.db"))
         os.makedirs(self.results_path, exist_ok=True)
         os.makedirs(os.path.join(self.results_path, "screenshots"), exist_ok=True)
         os.makedirs(os.path.join(self.results_path, "html"), exist_ok=True)
@@ -29,26 +42,47 @@ class Backtester:
         Запускає бектест для кожної стратегії, зберігає метрики в CSV і графіки в PNG/HTML.
         """
         all_metrics = []
+        store_rows = []
 
         for strat in self.strategies:
             strat_name = strat.__class__.__name__
             print(f"[Backtester] Running backtest for {strat_name} ...")
 
+            started = time.perf_counter()
             pf = strat.run_backtest()
             metrics = strat.get_metrics()
+            elapsed = time.perf_counter() - started
             metrics["strategy"] = strat_name
             all_metrics.append(metrics)
+            store_rows.append(dict(
+                metrics,
+                params=strategy_params(strat),
+                n_symbols=strat.data["close"].shape[1],
+                elapsed_sec=elapsed,
+                symbol_metrics=portfolio_symbol_metrics(pf),
+            ))
+
+            if self.robustness_sims > 0:
+                robust = analyze_portfolio(pf, n_sims=self.robustness_sims,
+                                           fees=strat.fees, slippage=strat.slippage)
+                robust.to_csv(os.path.join(self.results_path, f"{strat_name}_robustness.csv"))
+
+            # Ковзні метрики (Sharpe, просідання, експозиція, turnover) і середній NAV –
+            # з того ж портфеля pf, що й метрики вище (крос-секційні стратегії – один
+            # портфель зі спільним кешем), без повторної симуляції
+            rolling = strat.rolling_metrics(report_every=self.report_every)
+            rolling_df = rolling.to_frame()
+            rolling_df.to_csv(os.path.join(self.results_path, f"{strat_name}_rolling.csv"))
 
             # Equity curve (mean по всіх символах)
-            mean_nav = pf.value().mean(axis=1)
-            fig_curve = px.line(mean_nav, title=f"Equity Curve - {strat_name}")
+            fig_curve = px.line(rolling_df["nav"], title=f"Equity Curve - {strat_name}")
             fig_curve.update_layout(xaxis_title="Time", yaxis_title="Mean NAV")
 
             fig_curve_path = os.path.join(self.results_path, "screenshots", f"{strat_name}_equity.png")
             fig_curve.write_image(fig_curve_path)
 
             # Heatmap по total_return кожного символу
-            ret_series = pf.total_return()
+            ret_series = pf.total_return(group_by=False)
             ret_df = ret_series.to_frame(name="total_return").reset_index()
 
             if 'symbol' not in ret_df.columns:
@@ -67,13 +101,23 @@ class Backtester:
 
             # Генеруємо HTML-звіт
             html_output_dir = os.path.join(self.results_path, "html")
-            self.generate_html_report(strat_name, [fig_curve, fig_heat], html_output_dir)
+            fig_rolling = px.line(
+                rolling_df[["rolling_sharpe", "drawdown", "exposure", "turnover"]],
+                title=f"Rolling metrics - {strat_name}",
+            )
+            self.generate_html_report(strat_name, [fig_curve, fig_heat, fig_rolling], html_output_dir)
 
         # Зберігаємо сукупний CSV з метриками
         df_metrics = pd.DataFrame(all_metrics)
         df_metrics.to_csv(os.path.join(self.results_path, "metrics.csv"), index=False)
         print("[Backtester] All metrics saved to metrics.csv")
 
+        # Append-only історія запусків
+        fingerprint = data_fingerprint(self.strategies[0].raw_data) if self.strategies else None
+        run_id = self.store.start_run(data_fingerprint=fingerprint, description="Backtester.run_all")
+        self.store.record(run_id, store_rows)
+        print(f"[Backtester] Run {run_id} appended to {self.store.db_path}")
+
     def generate_html_report(self, strategy_name: str, figures: List, output_path: str):
         """
         Генерує інтерактивний .html звіт з переданих фігур Plotly.
@@ -1,4 +1,5 @@
 import os
+import json
 import time
 import pandas as pd
 from typing import List, Optional
@@ -6,6 +7,13 @@ import pyarrow as pa
 import pyarrow.parquet as pq
 import ccxt
 
+from core.data_loader.validation import inspect_bars, align_to_grid
+from core.data_loader.market_cache import MarketMetadataCache
+from core.data_loader.bars import BAR_TYPE_META_KEY
+
+# Ключ метаданих parquet, під яким зберігається опис всесвіту і періоду кешу
+UNIVERSE_META_KEY = b"fintech_backtesting.universe"
+
 
 class DataLoader:
     """
@@ -19,36 +27,61 @@ class DataLoader:
         start_date: str = "2025-02-01",
         end_date: str = "2025-02-28",
         symbols: Optional[List[str]] = None,
+        align_grid: bool = False,
+        freq: str = "1min",
+        fill_policy: str = "ffill",
+        fill_limit: Optional[int] = None,
+        meta_path: str = "./data/meta",
+        meta_ttl_hours: float = 24.0,
     ):
         """
         :param data_path: Шлях до локального parquet-файлу з даними.
         :param start_date: Початок періоду (YYYY-MM-DD).
         :param end_date: Кінець періоду (YYYY-MM-DD).
         :param symbols: Якщо задано, завантажимо лише ці символи. Якщо None – оберемо топ 100.
+        :param align_grid: Якщо True – дані розкладаються на повну сітку time × symbol з кроком freq.
+        :param freq: Крок сітки барів (для пошуку пропусків і вирівнювання).
+        :param fill_policy: Як заповнювати пропущені бари на сітці: "ffill" або "nan".
+        :param fill_limit: Максимум барів поспіль, що заповнюються (None – без обмеження).
+        :param meta_path: Директорія кешу метаданих біржі (маркети, дати лістингу, всесвіти).
+        :param meta_ttl_hours: Скільки годин метадані вважаються свіжими.
         """
         self.data_path = data_path
         self.start_date = pd.to_datetime(start_date)
         self.end_date = pd.to_datetime(end_date)
         self.symbols = symbols if symbols else []
+        self.align_grid = align_grid
+        self.freq = freq
+        self.fill_policy = fill_policy
+        self.fill_limit = fill_limit
         self.data = None
+        self.bar_type = "time"
+        self.gap_report = None
+        self.universe_info = None
 
         # ccxt-біржа
         self.binance = ccxt.binance({"enableRateLimit": True})
+        self.market_cache = MarketMetadataCache(meta_path, exchange=self.binance, ttl_hours=meta_ttl_hours)
 
     def load_data(self) -> pd.DataFrame:
         """
         Основна функція для завантаження. Якщо локальний файл існує – зчитуємо.
         Якщо ні – отримуємо з Binance, кешуємо у parquet і повертаємо DataFrame.
         """
+        self.bar_type = "time"
         if os.path.exists(self.data_path):
             print(f"[DataLoader] Loading data from local cache: {self.data_path}")
             self.data = pd.read_parquet(self.data_path)
+            meta = pq.read_schema(self.data_path).metadata or {}
+            if UNIVERSE_META_KEY in meta:
+                self.universe_info = json.loads(meta[UNIVERSE_META_KEY])
+            self.bar_type = meta.get(BAR_TYPE_META_KEY, b"time").decode()
         else:
             print("[DataLoader] Local data not found. Start fetching from Binance ...")
             self.data = self._fetch_and_build_dataset()
 
             os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
-            self.data.to_parquet(self.data_path, compression="snappy")
+            self._save_cache(self.data)
             print(f"[DataLoader] Data saved to {self.data_path}")
 
         # Якщо symbols задано, фільтруємо
@@ -58,29 +91,34 @@ class DataLoader:
         # Валідація
         self._validate_data()
 
+        # Event-time бари (build_bars) стратегії рахують окремо для кожного символу
+        self.data.attrs["bar_type"] = self.bar_type
         return self.data
 
     def get_top_liquid_symbols(self, limit: int = 100) -> List[str]:
         """
-        Отримує список найбільш ліквідних пар до BTC. Використовує:
-         - market-інфо від Binance (суто за 24h volume).
+        Отримує список найбільш ліквідних пар до BTC станом на start_date:
+        середній денний обсяг у BTC за тиждень до start_date серед усіх пар,
+        що тоді торгувалися (включно з пізніше делістованими). Метадані й денна
+        історія кешуються (MarketMetadataCache), тож повторний вибір миттєвий.
         """
-        # Всі маркети з Binance
-        markets = self.binance.fetch_markets()
-        btc_markets = [m for m in markets if m["quote"] == "BTC" and m["active"]]
-
-        # Сортуємо за об'ємом (info['quoteVolume'] або 'baseVolume'])
-        # У різних полів може бути різне значення, залежить від відповіді біржі.
-        # Спробуємо baseVolume.
-        sorted_markets = sorted(
-            btc_markets,
-            key=lambda m: float(m["info"]["baseVolume"]) if ("baseVolume" in m["info"]) else 0,
-            reverse=True,
-        )
-        top_markets = sorted_markets[:limit]
+        return self.market_cache.universe(as_of=self.start_date, limit=limit)
 
-        top_symbols = [m["symbol"] for m in top_markets]
-        return top_symbols
+    def _save_cache(self, df: pd.DataFrame):
+        """
+        Пише parquet-кеш разом з описом всесвіту (символи, період, звідки взято список).
+        """
+        self.universe_info = {
+            "symbols": list(self.symbols),
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "selection": self.market_cache.last_universe,
+            "created_at": pd.Timestamp.utcnow().tz_localize(None).isoformat(),
+        }
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        meta = dict(table.schema.metadata or {})
+        meta[UNIVERSE_META_KEY] = json.dumps(self.universe_info).encode()
+        pq.write_table(table.replace_schema_metadata(meta), self.data_path, compression="snappy")
 
     def _fetch_and_build_dataset(self) -> pd.DataFrame:
         """
@@ -95,10 +133,17 @@ class DataLoader:
             self.symbols = self.get_top_liquid_symbols(limit=100)
             print("[DataLoader] Found top 100 symbols:", self.symbols)
 
+        # Дати лістингу: символи, що не торгувалися в періоді, не запитуємо взагалі,
+        # а для решти починаємо з max(start_date, дата лістингу)
+        plan = self.market_cache.plan_fetch(self.symbols, self.start_date, self.end_date)
+
         all_dfs = []
         for sym in self.symbols:
+            if plan[sym] is None:
+                print(f"[DataLoader] Skipping {sym}: not traded in the requested range")
+                continue
             print(f"[DataLoader] Fetching 1m data for {sym} ...")
-            df_sym = self._fetch_symbol_ohlcv(sym)
+            df_sym = self._fetch_symbol_ohlcv(sym, since=plan[sym])
             if df_sym is not None and not df_sym.empty:
                 all_dfs.append(df_sym)
             else:
@@ -112,14 +157,14 @@ class DataLoader:
         df_all.sort_values(["symbol", "time"], inplace=True)
         return df_all
 
-    def _fetch_symbol_ohlcv(self, symbol: str) -> pd.DataFrame:
+    def _fetch_symbol_ohlcv(self, symbol: str, since: Optional[pd.Timestamp] = None) -> pd.DataFrame:
         """
         Завантажує 1m OHLCV через ccxt.fetch_ohlcv для одного symbol
-        за період [self.start_date, self.end_date].
+        за період [since або self.start_date, self.end_date].
         Повертає DataFrame зі стовпцями: [time, symbol, open, high, low, close, volume].
         """
         timeframe = "1m"
-        since = int(self.start_date.timestamp() * 1000)  # у мс
+        since = int((since if since is not None else self.start_date).timestamp() * 1000)  # у мс
         end_timestamp = int(self.end_date.timestamp() * 1000)
         limit = 1000  # Binance віддає максимум 1000-1500 свічок за запит
 
@@ -154,8 +199,12 @@ class DataLoader:
 
     def _validate_data(self):
         """
-        Мінімальні перевірки дат та колонок.
+        Перевірки дат та колонок, пошук дублікатів/пропусків/рядків не по порядку
+        (звіт у self.gap_report) і, за потреби, вирівнювання на регулярну сітку.
+        Для event-time барів (volume/dollar/tick з build_bars) – лише колонки, діапазон дат
+        і порядок рядків: спільні timestamp-и не є дублікатами, а сітки freq немає.
         """
+        event_time = self.bar_type != "time"
         if self.data.isnull().values.any():
             print("[DataLoader] Warning: dataset contains NaN values.")
 
@@ -172,3 +221,27 @@ class DataLoader:
             raise ValueError(
                 "[DataLoader] No data in specified date range. Check start_date/end_date or the fetch logic."
             )
+
+        # Дублікати та порядок рядків: інакше pivot_table усереднює дублікати
+        self.data, self.gap_report = inspect_bars(self.data, freq=self.freq, event_time=event_time)
+        issues = self.gap_report[["duplicates", "out_of_order", "gaps"]].sum()
+        if issues.any():
+            print(
+                f"[DataLoader] Warning: {issues['duplicates']} duplicate rows, "
+                f"{issues['out_of_order']} out-of-order rows, {issues['gaps']} gaps "
+                f"({self.gap_report['missing_bars'].sum()} missing bars) across "
+                f"{(self.gap_report[['duplicates', 'out_of_order', 'gaps']].sum(axis=1) > 0).sum()} symbols."
+            )
+
+        if self.align_grid and event_time:
+            print(f"[DataLoader] Warning: align_grid ignored for '{self.bar_type}' bars.")
+        elif self.align_grid:
+            self.data, filled = align_to_grid(
+                self.data,
+                freq=self.freq,
+                fill_policy=self.fill_policy,
+                fill_limit=self.fill_limit,
+                start=self.start_date,
+                end=self.end_date,
+            )
+            self.gap_report["filled_bars"] = filled
@@ -0,0 +1,254 @@
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from numba import njit
+
+
+BAR_TYPES = {"time": 0, "volume": 1, "dollar": 2, "tick": 3}
+
+# Ключ метаданих parquet (і DataFrame.attrs) з типом барів: стратегії рахують
+# event-time бари (volume/dollar/tick) окремо для кожного символу
+BAR_TYPE_META_KEY = b"fintech_backtesting.bar_type"
+
+BAR_SCHEMA = pa.schema([
+    ("time", pa.timestamp("ns")),
+    ("symbol", pa.string()),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+])
+
+# Індекси стану незавершеного бару (переноситься між батчами)
+_S_HAVE, _S_KEY = 0, 1
+_F_OPEN, _F_HIGH, _F_LOW, _F_CLOSE, _F_VOL, _F_ACC = 0, 1, 2, 3, 4, 5
+
+
+@njit(cache=True)
+def _build_bars_nb(ts, price, amount, mode, threshold, state_i, state_f,
+                   out_ts, out_o, out_h, out_l, out_c, out_v):
+    """
+    Один прохід по трейдах батчу. Незавершений бар живе у state_i/state_f,
+    тож наступний батч продовжує його. Повертає кількість завершених барів.
+    mode: 0 – time (threshold = крок у нс), 1 – volume, 2 – dollar, 3 – tick.
+    Для time-барів час бару – початок інтервалу, для інших – час останнього трейду.
+    """
+    n_out = 0
+    for k in range(ts.shape[0]):
+        t = ts[k]
+        p = price[k]
+        q = amount[k]
+
+        if mode == 0:
+            bucket = t // np.int64(threshold)
+            if state_i[_S_HAVE] == 1 and bucket != state_i[_S_KEY]:
+                out_ts[n_out] = state_i[_S_KEY] * np.int64(threshold)
+                out_o[n_out] = state_f[_F_OPEN]
+                out_h[n_out] = state_f[_F_HIGH]
+                out_l[n_out] = state_f[_F_LOW]
+                out_c[n_out] = state_f[_F_CLOSE]
+                out_v[n_out] = state_f[_F_VOL]
+                n_out += 1
+                state_i[_S_HAVE] = 0
+            if state_i[_S_HAVE] == 0:
+                state_i[_S_KEY] = bucket
+
+        if state_i[_S_HAVE] == 0:
+            state_i[_S_HAVE] = 1
+            state_f[_F_OPEN] = p
+            state_f[_F_HIGH] = p
+            state_f[_F_LOW] = p
+            state_f[_F_VOL] = 0.0
+            state_f[_F_ACC] = 0.0
+        else:
+            if p > state_f[_F_HIGH]:
+                state_f[_F_HIGH] = p
+            if p < state_f[_F_LOW]:
+                state_f[_F_LOW] = p
+        state_f[_F_CLOSE] = p
+        state_f[_F_VOL] += q
+
+        if mode != 0:
+            state_i[_S_KEY] = t
+            if mode == 1:
+                state_f[_F_ACC] += q
+            elif mode == 2:
+                state_f[_F_ACC] += p * q
+            else:
+                state_f[_F_ACC] += 1.0
+            if state_f[_F_ACC] >= threshold:
+                out_ts[n_out] = t
+                out_o[n_out] = state_f[_F_OPEN]
+                out_h[n_out] = state_f[_F_HIGH]
+                out_l[n_out] = state_f[_F_LOW]
+                out_c[n_out] = state_f[_F_CLOSE]
+                out_v[n_out] = state_f[_F_VOL]
+                n_out += 1
+                state_i[_S_HAVE] = 0
+    return n_out
+
+
+class BarBuilder:
+    """
+    Потокова побудова барів одного символу: time, volume, dollar або tick.
+    Пам'ять – O(розмір батчу); незавершений бар переноситься між викликами update.
+    """
+
+    def __init__(self, symbol: str, bar_type: str = "time", threshold=None):
+        """
+        :param symbol: символ, до якого належать трейди
+        :param bar_type: "time", "volume", "dollar" або "tick"
+        :param threshold: для time – частота ("1min"), для volume – обсяг у базовій валюті,
+                          для dollar – обсяг у котирувальній валюті, для tick – кількість трейдів
+        """
+        if bar_type not in BAR_TYPES:
+            raise ValueError(f"[BarBuilder] Unknown bar_type: {bar_type}. Use one of {list(BAR_TYPES)}")
+        if threshold is None:
+            raise ValueError("[BarBuilder] threshold must be set.")
+        self.symbol = symbol
+        self.bar_type = bar_type
+        self.mode = BAR_TYPES[bar_type]
+        if bar_type == "time":
+            self.threshold = float(pd.Timedelta(pd.tseries.frequencies.to_offset(threshold)).value)
+        else:
+            self.threshold = float(threshold)
+        self.state_i = np.zeros(2, dtype=np.int64)
+        self.state_f = np.zeros(6, dtype=np.float64)
+
+    def update(self, ts: np.ndarray, price: np.ndarray, amount: np.ndarray) -> pd.DataFrame:
+        """
+        Додає батч трейдів (відсортованих за часом, ts – int64 нс) і повертає завершені бари.
+        """
+        n = ts.shape[0]
+        out_ts = np.empty(n, dtype=np.int64)
+        out = [np.empty(n, dtype=np.float64) for _ in range(5)]
+        n_out = _build_bars_nb(
+            np.ascontiguousarray(ts, dtype=np.int64),
+            np.ascontiguousarray(price, dtype=np.float64),
+            np.ascontiguousarray(amount, dtype=np.float64),
+            self.mode, self.threshold, self.state_i, self.state_f, out_ts, *out,
+        )
+        return self._frame(out_ts[:n_out], [a[:n_out] for a in out])
+
+    def flush(self, keep_partial: bool = True) -> pd.DataFrame:
+        """
+        Повертає незавершений бар (наприклад, в кінці потоку) і скидає стан.
+        """
+        if self.state_i[_S_HAVE] == 0 or not keep_partial:
+            self.state_i[_S_HAVE] = 0
+            return self._frame(np.empty(0, dtype=np.int64), [np.empty(0)] * 5)
+        key = self.state_i[_S_KEY]
+        bar_ts = key * np.int64(self.threshold) if self.mode == 0 else key
+        f = self.state_f
+        self.state_i[_S_HAVE] = 0
+        return self._frame(
+            np.array([bar_ts], dtype=np.int64),
+            [np.array([f[_F_OPEN]]), np.array([f[_F_HIGH]]), np.array([f[_F_LOW]]),
+             np.array([f[_F_CLOSE]]), np.array([f[_F_VOL]])],
+        )
+
+    def _frame(self, ts: np.ndarray, cols: List[np.ndarray]) -> pd.DataFrame:
+        return pd.DataFrame({
+            "time": pd.to_datetime(ts),
+            "symbol": self.symbol,
+            "open": cols[0],
+            "high": cols[1],
+            "low": cols[2],
+            "close": cols[3],
+            "volume": cols[4],
+        })
+
+
+def build_bars(batches: Iterable[pa.RecordBatch], bar_type: str = "time", threshold=None,
+               out_path: Optional[str] = None, keep_partial: bool = True) -> Optional[pd.DataFrame]:
+    """
+    Будує бари з потоку батчів трейдів [time, symbol, price, amount] за один прохід.
+    Трейди кожного символу мають іти за зростанням часу (символи можуть чергуватися).
+    :param batches: ітератор pyarrow.RecordBatch (див. iter_trade_batches)
+    :param out_path: якщо задано – бари одразу пишуться у parquet (схема DataLoader),
+                     і в пам'яті тримається лише поточний батч; інакше повертається DataFrame
+    :param keep_partial: чи записувати незавершений останній бар кожного символу
+    Тип барів пишеться в метадані parquet (BAR_TYPE_META_KEY) або в DataFrame.attrs["bar_type"];
+    load_bars відновлює його при читанні.
+    """
+    builders: Dict[str, BarBuilder] = {}
+    writer = None
+    collected = []
+
+    def emit(bars: pd.DataFrame):
+        nonlocal writer
+        if bars.empty:
+            return
+        if out_path is None:
+            collected.append(bars)
+            return
+        if writer is None:
+            if os.path.dirname(out_path):
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            schema = BAR_SCHEMA.with_metadata({BAR_TYPE_META_KEY: bar_type.encode()})
+            writer = pq.ParquetWriter(out_path, schema, compression="snappy")
+        writer.write_table(pa.Table.from_pandas(bars, schema=BAR_SCHEMA, preserve_index=False))
+
+    try:
+        for batch in batches:
+            if batch.num_rows == 0:
+                continue
+            ts = _time_ns(batch.column("time"))
+            price = batch.column("price").to_numpy(zero_copy_only=False)
+            amount = batch.column("amount").to_numpy(zero_copy_only=False)
+            encoded = batch.column("symbol").dictionary_encode()
+            names = encoded.dictionary.to_pylist()
+            codes = encoded.indices.to_numpy(zero_copy_only=False)
+
+            if len(names) == 1:
+                groups = [(names[0], slice(None))]
+            else:
+                # Групуємо за символом, зберігаючи часовий порядок усередині групи
+                order = np.argsort(codes, kind="stable")
+                bounds = np.flatnonzero(np.diff(codes[order])) + 1
+                groups = [(names[codes[idx[0]]], idx) for idx in np.split(order, bounds)]
+
+            parts = []
+            for sym, idx in groups:
+                builder = builders.get(sym)
+                if builder is None:
+                    builder = builders[sym] = BarBuilder(sym, bar_type, threshold)
+                parts.append(builder.update(ts[idx], price[idx], amount[idx]))
+            emit(pd.concat(parts, ignore_index=True))
+
+        emit(pd.concat([b.flush(keep_partial) for b in builders.values()] or [pd.DataFrame()],
+                       ignore_index=True))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if out_path is not None:
+        return None
+    bars = pd.concat(collected, ignore_index=True) if collected else pd.DataFrame(columns=BAR_SCHEMA.names)
+    bars.attrs["bar_type"] = bar_type
+    return bars
+
+
+def load_bars(path: str) -> pd.DataFrame:
+    """
+    Читає parquet, записаний build_bars, і відновлює тип барів у DataFrame.attrs["bar_type"]
+    (файли без цього ключа вважаються time-барами).
+    """
+    bars = pd.read_parquet(path)
+    meta = pq.read_schema(path).metadata or {}
+    bars.attrs["bar_type"] = meta.get(BAR_TYPE_META_KEY, b"time").decode()
+    return bars
+
+
+def _time_ns(col: pa.Array) -> np.ndarray:
+    """
+    Колонка time у нс: timestamp будь-якої точності або int64 мілісекунди (формат ccxt).
+    """
+    if pa.types.is_timestamp(col.type):
+        return col.cast(pa.timestamp("ns")).to_numpy(zero_copy_only=False).view("i8")
+    return col.cast(pa.int64()).to_numpy(zero_copy_only=False) * 1_000_000
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+import ccxt
+
+
+MARKET_COLUMNS = ["symbol", "base", "quote", "active", "price_precision", "amount_precision",
+                  "min_amount", "min_cost", "quote_volume_24h"]
+DAILY_COLUMNS = ["symbol", "time", "close", "volume", "quote_volume"]
+DAY_MS = 86_400_000
+
+
+class MarketMetadataCache:
+    """
+    Персистентний кеш метаданих біржі для вибору всесвіту символів:
+     - знімки маркетів (precision, ліміти, active, 24h обсяг) з TTL; кожне оновлення
+       зберігає новий знімок, тож можна взяти стан «на дату» (point-in-time);
+     - денна історія цін/обсягів по символах: дати лістингу й останніх торгів
+       та обсяг на будь-яку дату в минулому.
+    Вибір всесвіту на дату start_date використовує обсяги того періоду і включає
+    пари, які пізніше були делістовані (без survivorship bias). Кожен вибір
+    записується в universes.jsonl.
+    """
+
+    def __init__(self, cache_dir: str = "./data/meta", exchange=None, ttl_hours: float = 24.0,
+                 quote: str = "BTC"):
+        """
+        :param cache_dir: директорія кешу (знімки маркетів, денна історія, журнал всесвітів)
+        :param exchange: ccxt-біржа (за замовчуванням ccxt.binance)
+        :param ttl_hours: скільки годин знімок маркетів і денна історія вважаються свіжими
+        :param quote: котирувальна валюта всесвіту
+        """
+        self.cache_dir = cache_dir
+        self.exchange = exchange if exchange is not None else ccxt.binance({"enableRateLimit": True})
+        self.ttl = pd.Timedelta(hours=ttl_hours)
+        self.quote = quote
+        self.daily_path = os.path.join(cache_dir, "daily.parquet")
+        self.checked_path = os.path.join(cache_dir, "daily_checked.json")
+        self.universe_log = os.path.join(cache_dir, "universes.jsonl")
+        self._daily: Optional[pd.DataFrame] = None
+        self.last_universe: Optional[Dict] = None
+
+    # --- Знімки маркетів -------------------------------------------------------
+
+    def _snapshots(self) -> List[tuple]:
+        """
+        Список (час знімка, шлях) за зростанням часу.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        out = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("markets_") and name.endswith(".parquet"):
+                out.append((pd.Timestamp(name[len("markets_"):-len(".parquet")]), os.path.join(self.cache_dir, name)))
+        return sorted(out)
+
+    def markets(self, refresh: bool = False) -> pd.DataFrame:
+        """
+        Найсвіжіший знімок маркетів; якщо він старший за TTL (або refresh=True) –
+        завантажує новий з біржі і зберігає поруч зі старими.
+        """
+        snaps = self._snapshots()
+        now = pd.Timestamp.utcnow().tz_localize(None)
+        if snaps and not refresh and now - snaps[-1][0] < self.ttl:
+            return pd.read_parquet(snaps[-1][1])
+
+        print("[MarketCache] Fetching markets snapshot ...")
+        df = self._fetch_markets()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, f"markets_{now.strftime('%Y%m%dT%H%M%S')}.parquet")
+        df.to_parquet(path, index=False)
+        return df
+
+    def snapshot(self, as_of) -> Optional[pd.DataFrame]:
+        """
+        Останній знімок маркетів, зроблений не пізніше as_of (None, якщо такого немає).
+        """
+        as_of = pd.Timestamp(as_of)
+        snaps = [path for taken_at, path in self._snapshots() if taken_at <= as_of]
+        return pd.read_parquet(snaps[-1]) if snaps else None
+
+    def _fetch_markets(self) -> pd.DataFrame:
+        markets = self.exchange.fetch_markets()
+        try:
+            tickers = self.exchange.fetch_tickers()
+        except ccxt.BaseError as exc:
+            print(f"[MarketCache] Warning: fetch_tickers failed ({exc}); 24h volumes are unknown.")
+            tickers = {}
+
+        rows = []
+        for m in markets:
+            precision = m.get("precision") or {}
+            limits = m.get("limits") or {}
+            ticker = tickers.get(m["symbol"]) or {}
+            quote_volume = ticker.get("quoteVolume")
+            if quote_volume is None and ticker.get("baseVolume") is not None and ticker.get("last"):
+                quote_volume = ticker["baseVolume"] * ticker["last"]
+            rows.append({
+                "symbol": m["symbol"],
+                "base": m.get("base"),
+                "quote": m.get("quote"),
+                "active": bool(m.get("active")) if m.get("active") is not None else True,
+                "price_precision": precision.get("price"),
+                "amount_precision": precision.get("amount"),
+                "min_amount": (limits.get("amount") or {}).get("min"),
+                "min_cost": (limits.get("cost") or {}).get("min"),
+                "quote_volume_24h": quote_volume,
+            })
+        df = pd.DataFrame(rows, columns=MARKET_COLUMNS)
+        for col in MARKET_COLUMNS[4:]:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+        return df
+
+    # --- Денна історія ---------------------------------------------------------
+
+    def daily_history(self, symbols: List[str], until=None) -> pd.DataFrame:
+        """
+        Денні свічки для symbols з кешу. Символ довантажується з біржі, якщо його ще
+        не перевіряли або якщо перевірка старша за TTL, а історія в кеші закінчується раніше until.
+        """
+        until = pd.Timestamp(until) if until is not None else pd.Timestamp.utcnow().tz_localize(None)
+        daily = self._load_daily()
+        last = daily.groupby("symbol")["time"].max() if not daily.empty else pd.Series(dtype="datetime64[ns]")
+        checked = self._load_checked()
+        now = time.time()
+
+        fetched = []
+        for sym in symbols:
+            if sym in checked:
+                fresh = now - checked[sym] < self.ttl.total_seconds()
+                covered = sym in last.index and last[sym] >= until - pd.Timedelta(days=1)
+                if fresh or covered:
+                    continue
+            since = int(last[sym].timestamp() * 1000) + DAY_MS if sym in last.index else 0
+            print(f"[MarketCache] Fetching daily history for {sym} ...")
+            fetched.append(self._fetch_daily(sym, since))
+            checked[sym] = now
+
+        if len(fetched):
+            fetched = [f for f in fetched if not f.empty]
+            if fetched:
+                daily = pd.concat([d for d in [daily] + fetched if not d.empty], ignore_index=True)
+                daily = daily.drop_duplicates(["symbol", "time"], keep="last").sort_values(["symbol", "time"])
+                daily = daily.reset_index(drop=True)
+                os.makedirs(self.cache_dir, exist_ok=True)
+                daily.to_parquet(self.daily_path, index=False)
+            self._save_checked(checked)
+        self._daily = daily
+        return daily[daily["symbol"].isin(symbols)]
+
+    def _load_daily(self) -> pd.DataFrame:
+        if self._daily is None:
+            if os.path.exists(self.daily_path):
+                self._daily = pd.read_parquet(self.daily_path)
+            else:
+                self._daily = pd.DataFrame(columns=DAILY_COLUMNS).astype({"time": "datetime64[ns]"})
+        return self._daily
+
+    def _load_checked(self) -> Dict[str, float]:
+        """
+        Коли кожен символ востаннє звіряли з біржею (unix-час) – і для символів без історії.
+        """
+        if os.path.exists(self.checked_path):
+            with open(self.checked_path, encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_checked(self, checked: Dict[str, float]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.checked_path, "w", encoding="utf-8") as f:
+            json.dump(checked, f)
+
+    def _fetch_daily(self, symbol: str, since: int) -> pd.DataFrame:
+        rows = []
+        now_ms = int(time.time() * 1000)
+        while since < now_ms:
+            data = self.exchange.fetch_ohlcv(symbol, "1d", since=since, limit=1000)
+            if not data:
+                break
+            rows += data
+            since = data[-1][0] + DAY_MS
+            if len(data) < 1000:
+                break
+            time.sleep(0.2)
+        if not rows:
+            return pd.DataFrame(columns=DAILY_COLUMNS)
+        df = pd.DataFrame(rows, columns=["time", "open", "high", "low", "close", "volume"])
+        df["time"] = pd.to_datetime(df["time"], unit="ms")
+        df["symbol"] = symbol
+        df["quote_volume"] = df["volume"] * df["close"]
+        return df[DAILY_COLUMNS]
+
+    def listing_dates(self, symbols: List[str]) -> pd.DataFrame:
+        """
+        Перший і останній день торгів кожного символу (індекс – symbol).
+        Символи без історії на біржі отримують NaT.
+        """
+        daily = self.daily_history(symbols)
+        spans = daily.groupby("symbol")["time"].agg(first_time="min", last_time="max")
+        return spans.reindex(symbols)
+
+    # --- Всесвіт символів ------------------------------------------------------
+
+    def universe(self, as_of=None, limit: int = 100, lookback_days: int = 7) -> List[str]:
+        """
+        Топ limit пар до quote за обсягом у валюті котирування.
+        as_of=None – за поточним 24h обсягом; інакше – за середнім денним обсягом
+        за lookback_days днів до as_of серед усіх пар (включно з неактивними нині),
+        що торгувалися в той період. Вибір записується в universes.jsonl.
+        """
+        if as_of is None:
+            markets = self.markets()
+            markets = markets[(markets["quote"] == self.quote) & markets["active"]]
+            volumes = markets.set_index("symbol")["quote_volume_24h"].fillna(0.0)
+            source = "ticker_24h"
+        else:
+            as_of = pd.Timestamp(as_of)
+            markets = self.snapshot(as_of)
+            if markets is None:
+                markets = self.markets()
+            candidates = markets.loc[markets["quote"] == self.quote, "symbol"].tolist()
+            daily = self.daily_history(candidates, until=as_of)
+            window = daily[(daily["time"] >= as_of - pd.Timedelta(days=lookback_days)) & (daily["time"] < as_of)]
+            volumes = window.groupby("symbol")["quote_volume"].mean()
+            source = f"daily_{lookback_days}d"
+
+        volumes = volumes[volumes > 0].sort_values(ascending=False, kind="stable").head(limit)
+        symbols = volumes.index.tolist()
+        self._log_universe({
+            "created_at": pd.Timestamp.utcnow().tz_localize(None).isoformat(),
+            "as_of": None if as_of is None else as_of.isoformat(),
+            "quote": self.quote,
+            "limit": limit,
+            "source": source,
+            "symbols": symbols,
+            "volumes": [float(v) for v in volumes.to_numpy()],
+        })
+        return symbols
+
+    def _log_universe(self, record: Dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.universe_log, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self.last_universe = record
+
+    def plan_fetch(self, symbols: List[str], start, end) -> Dict[str, Optional[pd.Timestamp]]:
+        """
+        Для кожного символу – з якого моменту варто запитувати хвилинні дані
+        (не раніше лістингу) або None, якщо символ не торгувався в [start, end].
+        Символи без денної історії лишаються з start (немає підстав їх пропускати).
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        spans = self.listing_dates(symbols)
+        plan = {}
+        for sym in symbols:
+            first, last = spans.loc[sym, "first_time"], spans.loc[sym, "last_time"]
+            if pd.isna(first):
+                plan[sym] = start
+            elif first > end or last + pd.Timedelta(days=1) <= start:
+                plan[sym] = None
+            else:
+                plan[sym] = max(start, first)
+        return plan
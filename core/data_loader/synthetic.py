@@ -0,0 +1,251 @@
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from core.data_loader.bars import BAR_SCHEMA
+
+
+# Режими ринку: річний дрейф і множник волатильності (спільні для всіх символів)
+DEFAULT_REGIMES = (
+    {"name": "calm", "drift": 0.0, "vol": 1.0},
+    {"name": "bull", "drift": 3.0, "vol": 1.4},
+    {"name": "crash", "drift": -6.0, "vol": 2.5},
+)
+# Розмір блоку генерації (барів): кожен блок має власний потік випадкових чисел,
+# тож результат залежить лише від seed, а не від того, як дані читаються/пишуться
+BLOCK_BARS = 1440
+SYNTHETIC_META_KEY = b"fintech_backtesting.synthetic"
+
+
+class SyntheticMarket:
+    """
+    Векторизований генератор синтетичних OHLCV-панелей у схемі DataLoader
+    (time, symbol, open, high, low, close, volume) для тестів і бенчмарків масштабу:
+     - корельований GBM (однофакторна модель: спільний шок з хвостами Стьюдента,
+       ідіосинкратичні шоки + рідкісні стрибки) з марковськими перемиканнями режимів
+       ринку (дрейф / волатильність);
+     - open = попередній close, high/low – внутрішньобарові екстремуми поза [open, close];
+     - обсяг з важким (Парето) хвостом, вищий на великих рухах і в бурхливих режимах;
+     - опційні пропуски барів (серії відсутніх рядків, як у реальних даних біржі).
+    Генерація йде блоками по BLOCK_BARS барів, ціна і режим переносяться між блоками,
+    тож рік хвилинних даних для сотень символів не потребує всієї панелі в пам'яті.
+    """
+
+    def __init__(self, n_symbols: int = 100, start: str = "2025-02-01", periods: int = 1440 * 28,
+                 freq: str = "1min", seed: int = 0, correlation: float = 0.4, annual_vol: float = 0.8,
+                 regimes: Sequence[Dict] = DEFAULT_REGIMES, regime_bars: float = 4320.0,
+                 tail_df: float = 4.0, jump_prob: float = 1e-4, jump_size: float = 10.0,
+                 volume_tail: float = 2.5, gap_prob: float = 0.0,
+                 gap_bars: float = 5.0, symbols: Optional[List[str]] = None):
+        """
+        :param n_symbols: кількість символів (ігнорується, якщо задано symbols)
+        :param start: час першого бару
+        :param periods: кількість барів
+        :param freq: крок барів
+        :param seed: зерно; однаковий seed – однакові дані
+        :param correlation: попарна кореляція дохідностей символів (0..1)
+        :param annual_vol: середня річна волатильність символу (у спокійному режимі)
+        :param regimes: режими ринку: {"name", "drift" (річний), "vol" (множник)}
+        :param regime_bars: середня тривалість режиму у барах
+        :param tail_df: ступені свободи t-розподілу спільного шоку (None або <= 2 – нормальний)
+        :param jump_prob: ймовірність стрибка ціни на бар × символ
+        :param jump_size: середній розмір стрибка у барових сигмах (знак випадковий)
+        :param volume_tail: показник Парето для обсягу (менше – важчий хвіст)
+        :param gap_prob: ймовірність початку пропуску на бар × символ
+        :param gap_bars: середня довжина пропуску у барах
+        :param symbols: явні назви символів
+        """
+        if not 0.0 <= correlation < 1.0:
+            raise ValueError("[SyntheticMarket] correlation must be in [0, 1)")
+        self.symbols = list(symbols) if symbols else [f"S{i:03d}/BTC" for i in range(n_symbols)]
+        self.start = pd.Timestamp(start)
+        self.periods = int(periods)
+        self.freq = freq
+        self.seed = int(seed)
+        self.correlation = float(correlation)
+        self.annual_vol = float(annual_vol)
+        self.regimes = [dict(r) for r in regimes]
+        self.regime_bars = float(regime_bars)
+        self.tail_df = tail_df
+        self.jump_prob = float(jump_prob)
+        self.jump_size = float(jump_size)
+        self.volume_tail = float(volume_tail)
+        self.gap_prob = float(gap_prob)
+        self.gap_bars = float(gap_bars)
+
+        self.step_ns = pd.Timedelta(pd.tseries.frequencies.to_offset(freq)).value
+        bars_per_year = pd.Timedelta("365 days").value / self.step_ns
+        self._drift = np.array([r["drift"] for r in self.regimes], dtype=np.float64) / bars_per_year
+        self._vol_mult = np.array([r["vol"] for r in self.regimes], dtype=np.float64)
+
+        # Статичні параметри символів – окремий потік (блок 0)
+        rng = np.random.default_rng([self.seed, 0])
+        m = len(self.symbols)
+        self._sigma = self.annual_vol * rng.lognormal(0.0, 0.3, m) / np.sqrt(bars_per_year)
+        self._log_price0 = rng.uniform(np.log(1e-5), np.log(1e-1), m)
+        # Базовий обсяг у базовій валюті: обіг у BTC ~ lognormal, дешевші монети – більше штук
+        self._base_volume = rng.lognormal(np.log(0.5), 1.0, m) / np.exp(self._log_price0)
+        self.regime_path = None
+
+    def _shocks(self, rng: np.random.Generator, shape) -> np.ndarray:
+        """
+        Шоки з одиничною дисперсією: t-розподіл (важкі хвости) або нормальний.
+        """
+        if self.tail_df is None or self.tail_df <= 2:
+            return rng.standard_normal(shape)
+        return rng.standard_t(self.tail_df, shape) * np.sqrt((self.tail_df - 2.0) / self.tail_df)
+
+    def _sparse_cells(self, rng: np.random.Generator, n: int, m: int, prob: float) -> np.ndarray:
+        """
+        Плоскі індекси рідкісних подій у блоці n × m: біноміальна кількість
+        випадкових позицій замість повної матриці rng.random.
+        """
+        return rng.integers(0, n * m, rng.binomial(n * m, prob)) if prob > 0.0 else np.empty(0, dtype=np.int64)
+
+    def _gap_mask(self, rng: np.random.Generator, n: int, m: int) -> Optional[np.ndarray]:
+        """
+        Маска присутніх рядків (n × m) або None, якщо пропусків немає.
+        Довжини пропусків – геометричні.
+        """
+        if self.gap_prob <= 0.0:
+            return None
+        keep = np.ones(n * m, dtype=bool)
+        flat = self._sparse_cells(rng, n, m, self.gap_prob)
+        lengths = rng.geometric(1.0 / max(self.gap_bars, 1.0), len(flat))
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        rows = np.repeat(flat // m, lengths) + offsets
+        cols = np.repeat(flat % m, lengths)
+        inside = rows < n
+        keep[rows[inside] * m + cols[inside]] = False
+        return keep.reshape(n, m)
+
+    def blocks(self) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Генерує панель блоками: {"time": (n,) int64 нс, "open"/"high"/"low"/"close"/"volume": (n × m),
+        "keep": (n × m) bool або None, "regime": (n,)}.
+        """
+        m = len(self.symbols)
+        n_regimes = len(self.regimes)
+        log_price = self._log_price0.copy()
+        regime = 0
+        regime_path = []
+        sqrt_rho, sqrt_idio = np.sqrt(self.correlation), np.sqrt(1.0 - self.correlation)
+
+        for b, first in enumerate(range(0, self.periods, BLOCK_BARS)):
+            n = min(BLOCK_BARS, self.periods - first)
+            rng = np.random.default_rng([self.seed, b + 1])
+
+            # Перемикання режимів: у момент перемикання – випадковий інший режим
+            switch = rng.random(n) < 1.0 / self.regime_bars
+            step = np.where(switch, rng.integers(1, max(n_regimes, 2), n), 0)
+            regimes = (regime + np.cumsum(step)) % n_regimes
+            regime = int(regimes[-1])
+            regime_path.append(regimes)
+
+            sigma = self._vol_mult[regimes][:, None] * self._sigma[None, :]
+            z = sqrt_rho * self._shocks(rng, (n, 1)) + sqrt_idio * rng.standard_normal((n, m))
+            jumps = self._sparse_cells(rng, n, m, self.jump_prob)
+            z.ravel()[jumps] += self.jump_size * rng.choice([-1.0, 1.0], len(jumps)) \
+                * rng.standard_exponential(len(jumps))
+            returns = (self._drift[regimes][:, None] - 0.5 * sigma ** 2) + sigma * z
+
+            log_close = log_price + np.cumsum(returns, axis=0)
+            log_open = np.vstack([log_price[None, :], log_close[:-1]])
+            log_price = log_close[-1].copy()
+
+            # Екстремуми всередині бару – за межами [open, close] на експоненційну величину
+            wick = 0.4 * sigma
+            log_high = np.maximum(log_open, log_close) + wick * rng.standard_exponential((n, m))
+            log_low = np.minimum(log_open, log_close) - wick * rng.standard_exponential((n, m))
+
+            # Парето(a) + 1 = exp(Exp(1) / a) – дешевше за rng.pareto
+            volume = (self._base_volume[None, :] * self._vol_mult[regimes][:, None] * (1.0 + np.abs(z))
+                      * np.exp(rng.standard_exponential((n, m)) / self.volume_tail))
+
+            yield {
+                "time": self.start.value + (first + np.arange(n, dtype=np.int64)) * self.step_ns,
+                "open": np.exp(log_open),
+                "high": np.exp(log_high),
+                "low": np.exp(log_low),
+                "close": np.exp(log_close),
+                "volume": volume,
+                "keep": self._gap_mask(rng, n, m),
+                "regime": regimes,
+            }
+        self.regime_path = np.concatenate(regime_path) if regime_path else np.empty(0, dtype=np.int64)
+
+    def _block_table(self, block: Dict[str, np.ndarray]) -> pa.Table:
+        """
+        Блок у довгому форматі (рядки впорядковані за time, потім symbol) зі схемою BAR_SCHEMA.
+        """
+        n, m = block["close"].shape
+        keep = block["keep"].ravel() if block["keep"] is not None else None
+        times = np.repeat(block["time"], m)
+        codes = np.tile(np.arange(m, dtype=np.int32), n)
+        if keep is not None:
+            times, codes = times[keep], codes[keep]
+        symbols = pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(self.symbols, pa.string()))
+        columns = [pa.array(times.view("datetime64[ns]")), symbols.cast(pa.string())]
+        for col in ["open", "high", "low", "close", "volume"]:
+            values = block[col].ravel()
+            columns.append(pa.array(values[keep] if keep is not None else values))
+        return pa.Table.from_arrays(columns, schema=BAR_SCHEMA)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Уся панель одним DataFrame (для тестів і невеликих обсягів).
+        """
+        tables = [self._block_table(block) for block in self.blocks()]
+        if not tables:
+            return BAR_SCHEMA.empty_table().to_pandas()
+        return pa.concat_tables(tables).to_pandas()
+
+    def metadata(self) -> Dict:
+        return {
+            "seed": self.seed,
+            "symbols": self.symbols,
+            "start": self.start.isoformat(),
+            "periods": self.periods,
+            "freq": self.freq,
+            "correlation": self.correlation,
+            "annual_vol": self.annual_vol,
+            "regimes": self.regimes,
+            "regime_bars": self.regime_bars,
+            "tail_df": self.tail_df,
+            "jump_prob": self.jump_prob,
+            "jump_size": self.jump_size,
+            "volume_tail": self.volume_tail,
+            "gap_prob": self.gap_prob,
+            "gap_bars": self.gap_bars,
+        }
+
+    def to_parquet(self, path: str, compression: str = "snappy") -> int:
+        """
+        Потоковий запис у parquet (одна row group на блок) – файл читається
+        DataLoader / OutOfCoreBacktester як звичайний кеш. Параметри генерації
+        зберігаються в метаданих схеми. Повертає кількість рядків.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        schema = BAR_SCHEMA.with_metadata({SYNTHETIC_META_KEY: json.dumps(self.metadata()).encode()})
+        n_rows = 0
+        # Словникове кодування лише для symbol: для випадкових float воно марне і дороге
+        with pq.ParquetWriter(path, schema, compression=compression, use_dictionary=["symbol"]) as writer:
+            for block in self.blocks():
+                table = self._block_table(block).replace_schema_metadata(schema.metadata)
+                writer.write_table(table)
+                n_rows += table.num_rows
+        print(f"[SyntheticMarket] Wrote {n_rows} rows ({len(self.symbols)} symbols) to {path}")
+        return n_rows
+
+
+def generate_ohlcv(n_symbols: int = 10, periods: int = 1440, seed: int = 0, **kwargs) -> pd.DataFrame:
+    """
+    Коротка форма: SyntheticMarket(...).to_frame().
+    """
+    return SyntheticMarket(n_symbols=n_symbols, periods=periods, seed=seed, **kwargs).to_frame()
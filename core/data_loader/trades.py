@@ -0,0 +1,167 @@
+import os
+import time
+from typing import Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import ccxt
+
+from core.data_loader.bars import build_bars
+
+
+TRADE_SCHEMA = pa.schema([
+    ("time", pa.timestamp("ms")),
+    ("symbol", pa.string()),
+    ("id", pa.int64()),
+    ("price", pa.float64()),
+    ("amount", pa.float64()),
+    ("side", pa.string()),
+])
+
+
+class TradeLoader:
+    """
+    Завантаження сирих трейдів із Binance через ccxt.fetch_trades з потоковим записом
+    у parquet (пам'ять обмежена flush_rows) та побудова з них барів.
+    """
+
+    def __init__(
+        self,
+        trades_path: str = "./data/trades",
+        start_date: str = "2025-02-01",
+        end_date: str = "2025-02-28",
+        symbols: Optional[List[str]] = None,
+        flush_rows: int = 500_000,
+    ):
+        """
+        :param trades_path: Директорія для parquet-файлів трейдів (один файл на символ).
+        :param start_date: Початок періоду (YYYY-MM-DD).
+        :param end_date: Кінець періоду (YYYY-MM-DD).
+        :param symbols: Список символів.
+        :param flush_rows: Скільки трейдів накопичувати в пам'яті перед записом row group.
+        """
+        self.trades_path = trades_path
+        self.start_date = pd.to_datetime(start_date)
+        self.end_date = pd.to_datetime(end_date)
+        self.symbols = symbols if symbols else []
+        self.flush_rows = flush_rows
+
+        # ccxt-біржа
+        self.binance = ccxt.binance({"enableRateLimit": True})
+
+    def symbol_path(self, symbol: str) -> str:
+        return os.path.join(self.trades_path, symbol.replace("/", "_") + ".parquet")
+
+    def load_trades(self) -> List[str]:
+        """
+        Для кожного символу: якщо parquet з трейдами вже є – пропускаємо,
+        інакше завантажуємо з Binance. Повертає список шляхів до файлів.
+        """
+        os.makedirs(self.trades_path, exist_ok=True)
+        paths = []
+        for sym in self.symbols:
+            path = self.symbol_path(sym)
+            if os.path.exists(path):
+                print(f"[TradeLoader] Using cached trades: {path}")
+            else:
+                print(f"[TradeLoader] Fetching trades for {sym} ...")
+                self._fetch_symbol_trades(sym, path)
+            paths.append(path)
+        return paths
+
+    def _fetch_symbol_trades(self, symbol: str, path: str) -> int:
+        """
+        Посторінково завантажує трейди через ccxt.fetch_trades за [start_date, end_date]
+        і дописує їх у parquet row group-ами. Повертає кількість записаних трейдів.
+        Перша сторінка шукається за часом (since), далі – за id (fromId), тож трейди
+        з однаковим мс на межі сторінок не губляться і не дублюються.
+        """
+        since = int(self.start_date.timestamp() * 1000)  # у мс
+        end_timestamp = int(self.end_date.timestamp() * 1000)
+        limit = 1000
+
+        tmp_path = path + ".part"
+        writer = pq.ParquetWriter(tmp_path, TRADE_SCHEMA, compression="snappy")
+        buffer = []
+        last_id = None
+        total = 0
+        try:
+            while since < end_timestamp:
+                if last_id is None:
+                    raw = self.binance.fetch_trades(symbol, since=since, limit=limit)
+                    if not raw:
+                        # Binance віддає трейди вікнами до 1 години – порожнє вікно пропускаємо
+                        since += 3_600_000
+                        continue
+                else:
+                    raw = self.binance.fetch_trades(symbol, limit=limit, params={"fromId": last_id + 1})
+                    if not raw:
+                        break
+                data = [t for t in raw if t["timestamp"] < end_timestamp]
+                if data:
+                    buffer += data
+                    last_id = int(data[-1]["id"])
+                if len(data) < len(raw):
+                    break
+                since = raw[-1]["timestamp"]
+
+                if len(buffer) >= self.flush_rows:
+                    total += self._write_trades(writer, symbol, buffer)
+                    buffer = []
+                # Маленька пауза, щоб не впертися в rate limit
+                time.sleep(0.2)
+
+            if buffer:
+                total += self._write_trades(writer, symbol, buffer)
+        finally:
+            writer.close()
+
+        os.replace(tmp_path, path)
+        print(f"[TradeLoader] {total} trades saved to {path}")
+        return total
+
+    @staticmethod
+    def _write_trades(writer: pq.ParquetWriter, symbol: str, trades: List[dict]) -> int:
+        table = pa.table({
+            "time": pa.array([t["timestamp"] for t in trades], type=pa.int64()).cast(pa.timestamp("ms")),
+            "symbol": pa.array([symbol] * len(trades), type=pa.string()),
+            "id": pa.array([int(t["id"]) for t in trades], type=pa.int64()),
+            "price": pa.array([float(t["price"]) for t in trades], type=pa.float64()),
+            "amount": pa.array([float(t["amount"]) for t in trades], type=pa.float64()),
+            "side": pa.array([t.get("side") for t in trades], type=pa.string()),
+        }, schema=TRADE_SCHEMA)
+        writer.write_table(table)
+        return len(trades)
+
+    def build_bars(self, bar_type: str = "time", threshold="1min", out_path: Optional[str] = None,
+                   batch_size: int = 1_000_000, keep_partial: bool = True) -> Optional[pd.DataFrame]:
+        """
+        Будує бари (time / volume / dollar / tick) з усіх завантажених трейдів
+        в схемі DataLoader. Див. core.data_loader.bars.build_bars.
+        """
+        paths = [self.symbol_path(sym) for sym in self.symbols]
+        return build_bars(iter_trade_batches(paths, batch_size=batch_size),
+                          bar_type=bar_type, threshold=threshold, out_path=out_path,
+                          keep_partial=keep_partial)
+
+
+def iter_trade_batches(paths, batch_size: int = 1_000_000) -> Iterator[pa.RecordBatch]:
+    """
+    Потоково читає трейди з parquet (файл, директорія або список файлів) чи CSV
+    з колонками [time, symbol, price, amount, ...]. time – timestamp або int64 мс (як у ccxt).
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        if path.endswith(".csv"):
+            reader = pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=64 << 20))
+            for batch in reader:
+                yield batch
+        else:
+            dataset = ds.dataset(path, format="parquet")
+            for batch in dataset.to_batches(columns=["time", "symbol", "price", "amount"],
+                                            batch_size=batch_size):
+                yield batch
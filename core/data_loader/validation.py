@@ -0,0 +1,140 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+FILL_POLICIES = ("ffill", "nan")
+
+
+def _step_ns(freq: str) -> int:
+    return int(pd.Timedelta(pd.tseries.frequencies.to_offset(freq)).value)
+
+
+def inspect_bars(df: pd.DataFrame, freq: str = "1min",
+                 event_time: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Векторно перевіряє long-DataFrame [time, symbol, open, high, low, close, volume]:
+    рядки не по порядку, дублікати timestamp-ів і пропущені бари для кожного символу.
+    Повертає (очищений DataFrame, звіт по символах).
+    Очищений DataFrame відсортований за (symbol, time); з дублікатів лишається останній рядок.
+    event_time=True – volume/dollar/tick бари: кілька барів можуть мати один timestamp,
+    а сітки з кроком freq немає, тож лишається тільки перевірка порядку (дублікати й пропуски – 0).
+    """
+    step = _step_ns(freq)
+    times = pd.to_datetime(df["time"]).values.astype("datetime64[ns]").view("i8")
+    codes, uniques = pd.factorize(df["symbol"], sort=True)
+    n_sym = len(uniques)
+
+    # Рядки не по порядку: стабільне групування за символом зберігає вихідний порядок
+    by_sym = np.argsort(codes, kind="stable")
+    t_sym, c_sym = times[by_sym], codes[by_sym]
+    same = c_sym[1:] == c_sym[:-1]
+    out_of_order = np.bincount(c_sym[1:][same & (t_sym[1:] < t_sym[:-1])], minlength=n_sym)
+
+    # Повне сортування (symbol, time); lexsort стабільний – останній дублікат лишається останнім
+    order = np.lexsort((times, codes))
+    t_sorted, c_sorted = times[order], codes[order]
+    dup = np.zeros(len(order), dtype=bool)
+    if not event_time:
+        dup[:-1] = (c_sorted[1:] == c_sorted[:-1]) & (t_sorted[1:] == t_sorted[:-1])
+    duplicates = np.bincount(c_sorted[dup], minlength=n_sym)
+
+    keep = order[~dup]
+    t_keep, c_keep = times[keep], codes[keep]
+
+    # Пропуски: різниця між сусідніми барами одного символу більша за крок
+    same = c_keep[1:] == c_keep[:-1]
+    diffs = np.diff(t_keep)
+    gap_mask = same & (diffs > step) & (not event_time)
+    gap_codes = c_keep[1:][gap_mask]
+    gap_sizes = diffs[gap_mask] // step - 1
+    n_gaps = np.bincount(gap_codes, minlength=n_sym)
+    missing = np.bincount(gap_codes, weights=gap_sizes, minlength=n_sym).astype(np.int64)
+    max_gap = np.zeros(n_sym, dtype=np.int64)
+    np.maximum.at(max_gap, gap_codes, gap_sizes)
+
+    n_rows = np.bincount(c_keep, minlength=n_sym)
+    first = np.full(n_sym, np.iinfo(np.int64).max)
+    last = np.full(n_sym, np.iinfo(np.int64).min)
+    np.minimum.at(first, c_keep, t_keep)
+    np.maximum.at(last, c_keep, t_keep)
+
+    report = pd.DataFrame({
+        "rows": n_rows,
+        "duplicates": duplicates,
+        "out_of_order": out_of_order,
+        "gaps": n_gaps,
+        "missing_bars": missing,
+        "max_gap_bars": max_gap,
+        "first": pd.to_datetime(first),
+        "last": pd.to_datetime(last),
+    }, index=pd.Index(uniques, name="symbol"))
+
+    clean = df.iloc[keep].reset_index(drop=True)
+    return clean, report
+
+
+def align_to_grid(df: pd.DataFrame, freq: str = "1min", fill_policy: str = "ffill",
+                  fill_limit: Optional[int] = None, start=None, end=None) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Розкладає очищені дані (без дублікатів) на повну регулярну сітку time × symbol.
+    :param fill_policy: "ffill" – пропущений бар отримує close попереднього бару як
+                        open/high/low/close і нульовий volume; "nan" – пропуски лишаються NaN
+    :param fill_limit: максимум барів поспіль, що заповнюються (None – без обмеження)
+    :param start: початок сітки (за замовчуванням – перший timestamp у даних)
+    :param end: кінець сітки (за замовчуванням – останній timestamp у даних)
+    :return: (long DataFrame на сітці, кількість заповнених барів по символах)
+    Бари до першого справжнього бару символу (до лістингу) і після останнього
+    (делістинг або кінець історії) лишаються NaN – заповнюються лише внутрішні пропуски.
+    """
+    if fill_policy not in FILL_POLICIES:
+        raise ValueError(f"[DataLoader] Unknown fill_policy: {fill_policy}. Use one of {FILL_POLICIES}")
+
+    step = _step_ns(freq)
+    times = pd.to_datetime(df["time"]).values.astype("datetime64[ns]").view("i8")
+    codes, uniques = pd.factorize(df["symbol"], sort=True)
+
+    t0 = pd.Timestamp(start).floor(freq).value if start is not None else times.min()
+    t1 = pd.Timestamp(end).value if end is not None else times.max()
+    n_t = int((t1 - t0) // step) + 1
+    n_s = len(uniques)
+
+    pos = (times - t0) // step
+    inside = (pos >= 0) & (pos < n_t)
+    pos, col = pos[inside], codes[inside]
+
+    panel = {}
+    for name in OHLCV_COLUMNS:
+        arr = np.full((n_t, n_s), np.nan)
+        arr[pos, col] = df[name].to_numpy(dtype=np.float64)[inside]
+        panel[name] = arr
+
+    valid = np.zeros((n_t, n_s), dtype=bool)
+    valid[pos, col] = True
+    filled = np.zeros(n_s, dtype=np.int64)
+
+    if fill_policy == "ffill":
+        rows = np.arange(n_t)[:, None]
+        last_valid = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+        last_real = np.where(valid.any(axis=0), n_t - 1 - np.argmax(valid[::-1], axis=0), -1)
+        to_fill = ~valid & (last_valid >= 0) & (rows <= last_real[None, :])
+        if fill_limit is not None:
+            to_fill &= (rows - last_valid) <= fill_limit
+        src = np.where(to_fill, last_valid, 0)
+        prev_close = np.take_along_axis(panel["close"], src, axis=0)
+        for name in ("open", "high", "low", "close"):
+            panel[name] = np.where(to_fill, prev_close, panel[name])
+        panel["volume"] = np.where(to_fill, 0.0, panel["volume"])
+        filled = to_fill.sum(axis=0)
+
+    grid = pd.DatetimeIndex(t0 + np.arange(n_t, dtype=np.int64) * step)
+    out = pd.DataFrame({
+        "time": np.repeat(grid.values, n_s),
+        "symbol": np.tile(np.asarray(uniques, dtype=object), n_t),
+    })
+    for name in OHLCV_COLUMNS:
+        out[name] = panel[name].ravel()
+
+    return out, pd.Series(filled, index=pd.Index(uniques, name="symbol"), name="filled_bars")
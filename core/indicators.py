@@ -0,0 +1,258 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+from core.parallel import run_column_blocks
+
+
+# Ядра працюють над блоком колонок (бари × колонки) і пишуть у виходи на місці.
+# nogil=True – run_column_blocks виконує блоки в різних потоках паралельно.
+# Семантика NaN і чисельні алгоритми повторюють pandas.rolling / ta, тож стратегії
+# дають ті самі сигнали, що й раніше: вікно з хоча б одним NaN дає NaN.
+
+@njit(nogil=True, cache=True)
+def _rolling_sum_nb(x, out, window, mean):
+    """
+    Ковзна сума (mean=True – середнє) з компенсацією Кехена, як roll_sum/roll_mean у pandas:
+    спершу видалення старого значення, потім додавання нового, окремі компенсації.
+    Вікно з однакових значень дає саме це значення (без похибки округлення).
+    """
+    n, m = x.shape
+    for j in range(m):
+        nobs = 0
+        total = 0.0
+        comp_add = 0.0
+        comp_rem = 0.0
+        prev = np.nan
+        same = 0
+        for i in range(n):
+            if i >= window:
+                v = x[i - window, j]
+                if not np.isnan(v):
+                    nobs -= 1
+                    y = -v - comp_rem
+                    t = total + y
+                    comp_rem = t - total - y
+                    total = t
+            v = x[i, j]
+            if not np.isnan(v):
+                nobs += 1
+                y = v - comp_add
+                t = total + y
+                comp_add = t - total - y
+                total = t
+                same = same + 1 if v == prev else 1
+                prev = v
+            if nobs >= window and nobs > 0:
+                if same >= nobs:
+                    out[i, j] = prev if mean else prev * nobs
+                else:
+                    out[i, j] = total / nobs if mean else total
+            else:
+                out[i, j] = np.nan
+
+
+@njit(nogil=True, cache=True)
+def _rolling_var_nb(x, out, window, ddof, take_sqrt):
+    """
+    Ковзна дисперсія (take_sqrt=True – std) онлайн-алгоритмом Велфорда з компенсацією,
+    як roll_var у pandas. Вікно з однакових значень дає рівно 0.
+    """
+    n, m = x.shape
+    for j in range(m):
+        nobs = 0
+        mean_x = 0.0
+        ssqdm = 0.0
+        comp_add = 0.0
+        comp_rem = 0.0
+        prev = np.nan
+        same = 0
+        for i in range(n):
+            if i >= window:
+                v = x[i - window, j]
+                if not np.isnan(v):
+                    nobs -= 1
+                    if nobs:
+                        prev_mean = mean_x - comp_rem
+                        y = v - comp_rem
+                        t = y - mean_x
+                        comp_rem = t + mean_x - y
+                        mean_x = mean_x - t / nobs
+                        ssqdm = ssqdm - (v - prev_mean) * (v - mean_x)
+                    else:
+                        mean_x = 0.0
+                        ssqdm = 0.0
+            v = x[i, j]
+            if not np.isnan(v):
+                nobs += 1
+                same = same + 1 if v == prev else 1
+                prev = v
+                prev_mean = mean_x - comp_add
+                y = v - comp_add
+                t = y - mean_x
+                comp_add = t + mean_x - y
+                mean_x = mean_x + t / nobs
+                ssqdm = ssqdm + (v - prev_mean) * (v - mean_x)
+            if nobs >= window and nobs > ddof:
+                if nobs == 1 or same >= nobs:
+                    res = 0.0
+                else:
+                    res = ssqdm / (nobs - ddof)
+                    if res < 0.0:
+                        res = 0.0
+                out[i, j] = np.sqrt(res) if take_sqrt else res
+            else:
+                out[i, j] = np.nan
+
+
+@njit(nogil=True, cache=True)
+def _rolling_extreme_nb(x, out, window, is_max):
+    """
+    Ковзний максимум / мінімум за O(n) через монотонну чергу індексів.
+    """
+    n, m = x.shape
+    queue = np.empty(window + 1, dtype=np.int64)
+    for j in range(m):
+        head = 0
+        tail = 0
+        nobs = 0
+        for i in range(n):
+            if i >= window and not np.isnan(x[i - window, j]):
+                nobs -= 1
+            while tail > head and queue[head % (window + 1)] <= i - window:
+                head += 1
+            v = x[i, j]
+            if not np.isnan(v):
+                nobs += 1
+                while tail > head:
+                    last = x[queue[(tail - 1) % (window + 1)], j]
+                    if (last <= v) if is_max else (last >= v):
+                        tail -= 1
+                    else:
+                        break
+                queue[tail % (window + 1)] = i
+                tail += 1
+            if nobs >= window:
+                out[i, j] = x[queue[head % (window + 1)], j]
+            else:
+                out[i, j] = np.nan
+
+
+@njit(nogil=True, cache=True)
+def _atr_nb(high, low, close, out, window):
+    """
+    ATR за Вайлдером, як ta.volatility.AverageTrueRange: нулі до window-1,
+    на window-1 – середнє true range, далі рекурсивне згладжування.
+    """
+    n, m = close.shape
+    for j in range(m):
+        for i in range(n):
+            out[i, j] = 0.0
+        if n < window:
+            continue
+        total = 0.0
+        cnt = 0
+        for i in range(n):
+            h = high[i, j]
+            lo = low[i, j]
+            tr = h - lo
+            if i > 0:
+                pc = close[i - 1, j]
+                a = abs(h - pc)
+                b = abs(lo - pc)
+                if np.isnan(tr) or a > tr:
+                    tr = a
+                if np.isnan(tr) or b > tr:
+                    tr = b
+            if i < window:
+                if not np.isnan(tr):
+                    total += tr
+                    cnt += 1
+                if i == window - 1:
+                    out[i, j] = total / cnt if cnt > 0 else np.nan
+            else:
+                out[i, j] = (out[i - 1, j] * (window - 1) + tr) / window
+
+
+@njit(nogil=True, cache=True)
+def _rsi_nb(close, out, window):
+    """
+    RSI як ta.momentum.RSIIndicator: ewm(alpha=1/window, adjust=False) приростів і спадів,
+    NaN-різниці вважаються нульовими, перші window-1 барів – NaN.
+    """
+    n, m = close.shape
+    alpha = 1.0 / window
+    old_wt = 1.0 - alpha
+    norm = old_wt + alpha
+    for j in range(m):
+        ema_up = 0.0
+        ema_dn = 0.0
+        for i in range(n):
+            d = close[i, j] - close[i - 1, j] if i > 0 else np.nan
+            up = d if d > 0.0 else 0.0
+            dn = -d if d < 0.0 else 0.0
+            if i == 0:
+                ema_up = up
+                ema_dn = dn
+            else:
+                if ema_up != up:
+                    ema_up = (old_wt * ema_up + alpha * up) / norm
+                if ema_dn != dn:
+                    ema_dn = (old_wt * ema_dn + alpha * dn) / norm
+            if i + 1 < window:
+                out[i, j] = np.nan
+            elif ema_dn == 0.0:
+                out[i, j] = 100.0
+            else:
+                out[i, j] = 100.0 - 100.0 / (1.0 + ema_up / ema_dn)
+
+
+def _frame(values: np.ndarray, like: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(values, index=like.index, columns=like.columns)
+
+
+def rolling_sum(df: pd.DataFrame, window: int) -> pd.DataFrame:
+    out, = run_column_blocks(_rolling_sum_nb, [df.to_numpy()], args=(int(window), False))
+    return _frame(out, df)
+
+
+def rolling_mean(df: pd.DataFrame, window: int) -> pd.DataFrame:
+    out, = run_column_blocks(_rolling_sum_nb, [df.to_numpy()], args=(int(window), True))
+    return _frame(out, df)
+
+
+def rolling_std(df: pd.DataFrame, window: int, ddof: int = 1) -> pd.DataFrame:
+    out, = run_column_blocks(_rolling_var_nb, [df.to_numpy()], args=(int(window), int(ddof), True))
+    return _frame(out, df)
+
+
+def rolling_max(df: pd.DataFrame, window: int) -> pd.DataFrame:
+    out, = run_column_blocks(_rolling_extreme_nb, [df.to_numpy()], args=(int(window), True))
+    return _frame(out, df)
+
+
+def rolling_min(df: pd.DataFrame, window: int) -> pd.DataFrame:
+    out, = run_column_blocks(_rolling_extreme_nb, [df.to_numpy()], args=(int(window), False))
+    return _frame(out, df)
+
+
+def atr(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame, window: int = 14) -> pd.DataFrame:
+    out, = run_column_blocks(_atr_nb, [high.to_numpy(), low.to_numpy(), close.to_numpy()], args=(int(window),))
+    return _frame(out, close)
+
+
+def rsi(close: pd.DataFrame, window: int = 14) -> pd.DataFrame:
+    out, = run_column_blocks(_rsi_nb, [close.to_numpy()], args=(int(window),))
+    return _frame(out, close)
+
+
+def bollinger_bands(close: pd.DataFrame, window: int = 20,
+                    window_dev: float = 2.0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (нижня, верхня) смуги Боллінджера, як ta.volatility.BollingerBands (std з ddof=0).
+    """
+    mavg = rolling_mean(close, window)
+    mstd = rolling_std(close, window, ddof=0)
+    return mavg - window_dev * mstd, mavg + window_dev * mstd
@@ -1,3 +1,6 @@
+from typing import List, Optional
+
+import numpy as np
 import vectorbt as vbt
 import pandas as pd
 
@@ -32,22 +35,10 @@ def compute_metrics(pf: vbt.Portfolio) -> dict:
 
 def compute_exposure_time(pf: vbt.Portfolio) -> float:
     # (Повна реалізація, описана вище)
-    trades = pf.get_trades()
-    records = trades.records_readable
-    if records.empty:
-        return 0.0
-
-    if "Entry Time" not in records.columns or "Exit Time" not in records.columns:
+    intervals = _trade_intervals(pf)
+    if not intervals:
         return 0.0
 
-    intervals = []
-    for _, row in records.iterrows():
-        start_t = row["Entry Time"]
-        end_t = row["Exit Time"]
-        if pd.isnull(end_t):
-            end_t = pf.wrapper.index[-1]
-        intervals.append((start_t, end_t))
-
     merged = unify_intervals(intervals)
     if not merged:
         return 0.0
@@ -84,3 +75,88 @@ def unify_intervals(intervals):
             current_start, current_end = start, end
     merged.append((current_start, current_end))
     return merged
+
+
+def _trade_intervals(pf: vbt.Portfolio) -> list:
+    """
+    (вхід, вихід) кожної угоди; відкриті угоди тривають до кінця індексу.
+    """
+    records = pf.get_trades().records_readable
+    if records.empty:
+        return []
+
+    # vectorbt називає колонки "Entry Timestamp"/"Exit Timestamp"
+    entry_col = "Entry Timestamp" if "Entry Timestamp" in records.columns else "Entry Time"
+    exit_col = "Exit Timestamp" if "Exit Timestamp" in records.columns else "Exit Time"
+    if entry_col not in records.columns or exit_col not in records.columns:
+        return []
+
+    intervals = []
+    for _, row in records.iterrows():
+        start_t = row[entry_col]
+        end_t = row[exit_col]
+        if pd.isnull(end_t):
+            end_t = pf.wrapper.index[-1]
+        intervals.append((start_t, end_t))
+    return intervals
+
+
+COMPONENT_COLUMNS = ["total_return", "sharpe_ratio", "max_drawdown", "win_rate"]
+
+
+def metric_components(pf: vbt.Portfolio) -> dict:
+    """
+    Складники compute_metrics, з яких метрики точно відновлюються після об'єднання
+    портфелів на різних наборах символів (шарди свіпу): метрики кожного символу
+    (COMPONENT_COLUMNS; win_rate – None для символу без угод), об'єднані інтервали
+    угод і межі часового індексу (нс). win_rate і exposure_time не можна усереднювати
+    за кількістю символів: перша – середнє лише по символах з угодами, друга –
+    об'єднання інтервалів усіх символів.
+    """
+    columns = pf.wrapper.columns
+    per_symbol = pd.DataFrame({
+        "total_return": np.atleast_1d(pf.total_return()),
+        "sharpe_ratio": np.atleast_1d(pf.sharpe_ratio()),
+        "max_drawdown": np.atleast_1d(pf.max_drawdown()),
+    }, index=columns)
+    records = pf.get_trades().records_readable
+    if not records.empty and "PnL" in records.columns and "Column" in records.columns:
+        per_symbol["win_rate"] = (records["PnL"] > 0).groupby(records["Column"]).mean()
+    else:
+        per_symbol["win_rate"] = np.nan
+
+    index = pf.wrapper.index
+    return {
+        "symbols": {
+            str(sym): [None if pd.isna(v) else float(v) for v in vals]
+            for sym, vals in zip(columns, per_symbol[COMPONENT_COLUMNS].to_numpy(dtype=np.float64))
+        },
+        "intervals": [[pd.Timestamp(st).value, pd.Timestamp(en).value]
+                      for st, en in unify_intervals(_trade_intervals(pf))],
+        "span": [index[0].value, index[-1].value],
+    }
+
+
+def combine_metric_components(parts: List[dict]) -> dict:
+    """
+    Метрики у форматі compute_metrics для об'єднання портфелів, описаних metric_components.
+    """
+    symbols = {}
+    intervals = []
+    for part in parts:
+        symbols.update(part["symbols"])
+        intervals.extend((st, en) for st, en in part["intervals"])
+    values = pd.DataFrame.from_dict(symbols, orient="index", columns=COMPONENT_COLUMNS, dtype=np.float64)
+
+    start_all = min(part["span"][0] for part in parts)
+    end_all = max(part["span"][1] for part in parts)
+    occupied = sum(max(min(en, end_all) - max(st, start_all), 0) for st, en in unify_intervals(intervals))
+    win_rate: Optional[float] = float(values["win_rate"].mean()) if values["win_rate"].notna().any() else None
+
+    return {
+        "total_return": values["total_return"].mean(),
+        "sharpe_ratio": values["sharpe_ratio"].mean(),
+        "max_drawdown": values["max_drawdown"].mean(),
+        "win_rate": win_rate,
+        "exposure_time": occupied / (end_all - start_all) if end_all > start_all else 0.0,
+    }
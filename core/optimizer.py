@@ -0,0 +1,285 @@
+import json
+import math
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.metrics import compute_metrics
+from core.sweep import expand_grid, resolve_strategy
+
+
+BUDGET_TYPES = ("symbols", "time")
+
+
+def _params_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class HalvingSearch:
+    """
+    Адаптивний підбір параметрів стратегії: successive halving і Hyperband.
+    Кандидати спершу оцінюються на дешевій підмножині даних (частина символів
+    або початковий відрізок часу), гірші відсіюються, а ті, що вижили, переоцінюються
+    на дедалі більших підмножинах аж до повних даних. Нові кандидати можна
+    пропонувати випадково або байєсівськи (TPE по значеннях сітки, як у BOHB).
+    Повний розклад відсіювання (бюджети, кандидати, оцінки, хто пройшов далі)
+    зберігається в schedule/history, щоб запуск можна було відтворити.
+    """
+
+    def __init__(self, strategy, param_grid: Dict[str, List], data: pd.DataFrame,
+                 metric: str = "sharpe_ratio", maximize: bool = True, eta: int = 3,
+                 min_budget: float = 1 / 9, budget: str = "symbols", min_symbols: int = 1,
+                 constraint: Optional[Callable[[dict], bool]] = None, seed: int = 0):
+        """
+        :param strategy: клас стратегії, ім'я з STRATEGY_REGISTRY або "module:Class"
+        :param param_grid: сітка параметрів {"short_window": [5, 10, ...], ...}
+        :param data: дані в long-форматі DataLoader
+        :param metric: метрика з compute_metrics, за якою ранжуються кандидати
+        :param maximize: False – менше значення метрики краще
+        :param eta: у скільки разів скорочується кількість кандидатів між щаблями
+        :param min_budget: найменша частка даних (0, 1]
+        :param budget: "symbols" – частка символів, "time" – частка барів від початку періоду
+        :param min_symbols: мінімум символів у підмножині
+        :param constraint: фільтр допустимих наборів (напр. short_window < long_window)
+        :param seed: зерно для порядку символів і вибору кандидатів
+        """
+        if budget not in BUDGET_TYPES:
+            raise ValueError(f"[HalvingSearch] Unknown budget: {budget}. Use one of {BUDGET_TYPES}")
+        if not 0.0 < min_budget <= 1.0:
+            raise ValueError("[HalvingSearch] min_budget must be in (0, 1].")
+        self.strategy_cls = resolve_strategy(strategy) if isinstance(strategy, str) else strategy
+        self.param_grid = {k: list(v) for k, v in param_grid.items()}
+        self.metric = metric
+        self.maximize = maximize
+        self.eta = int(eta)
+        self.min_budget = float(min_budget)
+        self.budget = budget
+        self.min_symbols = min_symbols
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        self.candidates = [p for p in expand_grid(self.param_grid) if constraint is None or constraint(p)]
+        if not self.candidates:
+            raise ValueError("[HalvingSearch] No parameter sets satisfy the constraint.")
+
+        self.data = data
+        # Вкладені підмножини: символи у фіксованому (за seed) порядку, час – від початку
+        symbols = np.array(sorted(data["symbol"].unique()))
+        self._symbol_order = symbols[np.random.default_rng(seed).permutation(len(symbols))]
+        self._times = np.sort(data["time"].unique())
+        self._subsets: Dict[float, pd.DataFrame] = {}
+
+        self._cache: Dict[tuple, float] = {}
+        self.history: List[dict] = []
+        self.schedule: List[dict] = []
+        self.budget_used = 0.0
+
+    # --- Дані та оцінювання --------------------------------------------------
+
+    def _subset(self, r: float) -> pd.DataFrame:
+        r = round(min(r, 1.0), 10)
+        if r not in self._subsets:
+            if r >= 1.0:
+                self._subsets[r] = self.data
+            elif self.budget == "symbols":
+                n = max(self.min_symbols, math.ceil(r * len(self._symbol_order)))
+                self._subsets[r] = self.data[self.data["symbol"].isin(self._symbol_order[:n])]
+            else:
+                n = max(2, math.ceil(r * len(self._times)))
+                self._subsets[r] = self.data[self.data["time"] <= self._times[n - 1]]
+        return self._subsets[r]
+
+    def _score(self, value) -> float:
+        """
+        Оцінка «більше – краще»; NaN/None – найгірша.
+        """
+        if value is None or np.isnan(value):
+            return -np.inf
+        return float(value) if self.maximize else -float(value)
+
+    def evaluate(self, params: dict, r: float) -> float:
+        """
+        Бектест одного набору параметрів на частці даних r; результати кешуються.
+        """
+        r = round(min(r, 1.0), 10)
+        key = (_params_key(params), r)
+        if key not in self._cache:
+            subset = self._subset(r)
+            strat = self.strategy_cls(subset, **params)
+            strat.run_backtest()
+            value = compute_metrics(strat.pf).get(self.metric)
+            self._cache[key] = self._score(value)
+            self.budget_used += len(subset) / len(self.data)
+        return self._cache[key]
+
+    # --- Successive halving і Hyperband --------------------------------------
+
+    def _n_rungs(self, min_budget: float) -> int:
+        return int(math.floor(math.log(1.0 / min_budget, self.eta) + 1e-9)) + 1
+
+    def successive_halving(self, candidates: Optional[List[dict]] = None, min_budget: Optional[float] = None,
+                           bracket: int = 0) -> pd.DataFrame:
+        """
+        Один прогін successive halving: усі candidates (за замовчуванням – уся сітка)
+        на бюджеті min_budget, далі top 1/eta переходить на бюджет × eta, до повних даних.
+        Повертає оцінки кандидатів останнього щабля (повний бюджет), від кращого.
+        """
+        candidates = list(self.candidates if candidates is None else candidates)
+        min_budget = self.min_budget if min_budget is None else min_budget
+        n_rungs = self._n_rungs(min_budget)
+
+        for rung in range(n_rungs):
+            r = 1.0 if rung == n_rungs - 1 else min_budget * self.eta ** rung
+            scores = np.array([self.evaluate(p, r) for p in candidates])
+            order = np.argsort(-scores, kind="stable")
+            n_keep = len(candidates) if rung == n_rungs - 1 else max(1, len(candidates) // self.eta)
+            promoted = set(order[:n_keep].tolist())
+
+            for idx, (params, score) in enumerate(zip(candidates, scores)):
+                self.history.append({
+                    "bracket": bracket, "rung": rung, "budget": r,
+                    "params": _params_key(params), **params,
+                    "score": score, "promoted": idx in promoted,
+                })
+            self.schedule.append({
+                "bracket": bracket, "rung": rung, "budget": r,
+                "n_rows": len(self._subset(r)),
+                "n_candidates": len(candidates), "n_promoted": n_keep,
+            })
+            print(f"[HalvingSearch] bracket={bracket} rung={rung} budget={r:.3f} "
+                  f"candidates={len(candidates)} -> {n_keep}")
+
+            if rung < n_rungs - 1:
+                candidates = [candidates[i] for i in order[:n_keep]]
+
+        final = self.history_frame()
+        final = final[(final["bracket"] == bracket) & (final["rung"] == n_rungs - 1)]
+        return final.sort_values("score", ascending=False).reset_index(drop=True)
+
+    def hyperband(self, n_iterations: int = 1, sampler: str = "random") -> pd.DataFrame:
+        """
+        Hyperband: кілька прогонів successive halving з різним співвідношенням
+        «кількість кандидатів / стартовий бюджет». sampler="tpe" пропонує нових
+        кандидатів за вже отриманими оцінками (TPE), "random" – випадково з сітки.
+        Повертає найкращі набори на повних даних.
+        """
+        if sampler not in ("random", "tpe"):
+            raise ValueError("[HalvingSearch] sampler must be 'random' or 'tpe'.")
+        s_max = self._n_rungs(self.min_budget) - 1
+        bracket = 0
+        for _ in range(n_iterations):
+            for s in range(s_max, -1, -1):
+                n = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+                n = min(n, len(self.candidates))
+                if sampler == "tpe":
+                    candidates = self.propose(n)
+                else:
+                    candidates = self._sample(n)
+                self.successive_halving(candidates, min_budget=self.eta ** -s, bracket=bracket)
+                bracket += 1
+        return self.top(n=len(self.candidates))
+
+    def _sample(self, n: int, exclude: Optional[set] = None) -> List[dict]:
+        pool = [p for p in self.candidates if exclude is None or _params_key(p) not in exclude]
+        if len(pool) <= n:
+            return pool
+        idx = self.rng.choice(len(pool), size=n, replace=False)
+        return [pool[i] for i in sorted(idx)]
+
+    def propose(self, n: int, gamma: float = 0.25, n_samples: int = 64) -> List[dict]:
+        """
+        Байєсівська пропозиція n нових кандидатів (Tree-structured Parzen Estimator):
+        спостереження найбільшого бюджету з достатньою кількістю точок ділимо на
+        «добрі» (top gamma) і «погані»; для кожного параметра оцінюємо розподіли
+        значень сітки l(x) і g(x) (зі згладжуванням по сусідніх значеннях) і беремо
+        кандидатів із найбільшим l(x) / g(x). Якщо даних мало – випадкова вибірка.
+        """
+        obs = self.history_frame()
+        min_obs = len(self.param_grid) + 2
+        if obs.empty:
+            return self._sample(n)
+        obs = obs.drop_duplicates(["params", "budget"])
+        counts = obs.groupby("budget").size()
+        enough = counts[counts >= min_obs]
+        if enough.empty:
+            return self._sample(n)
+        obs = obs[obs["budget"] == enough.index.max()].sort_values("score", ascending=False)
+        n_good = max(1, int(math.ceil(gamma * len(obs))))
+        good, bad = obs.iloc[:n_good], obs.iloc[n_good:]
+
+        def density(frame: pd.DataFrame, name: str, values: list) -> np.ndarray:
+            hist = np.ones(len(values))  # апріорний рівномірний внесок
+            pos = {json.dumps(v, default=str): i for i, v in enumerate(values)}
+            for v in frame[name]:
+                i = pos.get(json.dumps(v, default=str))
+                if i is None:
+                    continue
+                hist[i] += 1.0
+                # Згладжування: значення сітки впорядковані, сусіди отримують частку ваги
+                if i > 0:
+                    hist[i - 1] += 0.5
+                if i < len(values) - 1:
+                    hist[i + 1] += 0.5
+            return hist / hist.sum()
+
+        tried = set(obs["params"])
+        pool = [p for p in self.candidates if _params_key(p) not in tried]
+        if len(pool) <= n:
+            return pool + self._sample(n - len(pool), exclude={_params_key(p) for p in pool})
+
+        # Для кожного кандидата: log l(x) і log l(x) / g(x) (параметри – незалежні)
+        log_l = np.zeros(len(pool))
+        log_ratio = np.zeros(len(pool))
+        for name, values in self.param_grid.items():
+            l_dens = density(good, name, values)
+            g_dens = density(bad, name, values)
+            pos = {json.dumps(v, default=str): i for i, v in enumerate(values)}
+            idx = np.array([pos[json.dumps(p[name], default=str)] for p in pool])
+            log_l += np.log(l_dens[idx])
+            log_ratio += np.log(l_dens[idx]) - np.log(g_dens[idx])
+
+        # Вибірка n_samples кандидатів пропорційно l(x), далі – найкращі за l/g
+        prob = np.exp(log_l - log_l.max())
+        prob /= prob.sum()
+        size = min(len(pool), max(n, n_samples))
+        drawn = self.rng.choice(len(pool), size=size, replace=False, p=prob)
+        best = drawn[np.argsort(-log_ratio[drawn], kind="stable")[:n]]
+        return [pool[i] for i in sorted(best)]
+
+    # --- Результати -----------------------------------------------------------
+
+    def history_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.history)
+
+    def top(self, n: int = 10) -> pd.DataFrame:
+        """
+        Найкращі набори, оцінені на повних даних.
+        """
+        hist = self.history_frame()
+        if hist.empty:
+            return hist
+        full = hist[hist["budget"] >= 1.0].drop_duplicates("params")
+        return full.sort_values("score", ascending=False).head(n).reset_index(drop=True)
+
+    def save_schedule(self, path: str):
+        """
+        Зберігає розклад відсіювання та всі оцінки в JSON (для відтворення запуску).
+        """
+        payload = {
+            "strategy": f"{self.strategy_cls.__module__}:{self.strategy_cls.__name__}",
+            "param_grid": self.param_grid,
+            "metric": self.metric,
+            "maximize": self.maximize,
+            "eta": self.eta,
+            "min_budget": self.min_budget,
+            "budget": self.budget,
+            "seed": self.seed,
+            "symbol_order": self._symbol_order.tolist(),
+            "budget_used": self.budget_used,
+            "schedule": self.schedule,
+            "history": [{k: (None if isinstance(v, float) and not np.isfinite(v) else v)
+                         for k, v in rec.items()} for rec in self.history],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, default=str)
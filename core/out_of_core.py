@@ -0,0 +1,336 @@
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from numba import njit
+
+from core.rolling_metrics import RollingMetrics
+from strategies.base import StrategyBase
+
+
+OHLCV_COLUMNS = ["time", "symbol", "open", "high", "low", "close", "volume"]
+
+
+@njit(cache=True)
+def simulate_signals_nb(close, entries, exits, fees, slippage,
+                        cash, position, last_close, entry_cost, prev_value,
+                        peak, max_dd, ret_n, ret_mean, ret_m2, n_trades, n_wins,
+                        value_out, pos_out, traded_out):
+    """
+    Long-only симуляція all-in ордерів за сигналами (семантика vbt.Portfolio.from_signals
+    з size=inf) для одного часового чанку. Всі масиви стану (shape = n_symbols)
+    оновлюються на місці, тож наступний чанк продовжує з того ж стану.
+    value_out / pos_out / traded_out (n_bars × n_symbols, розміром із чанк) – вартість,
+    відкрита позиція та обсяг угод після кожного бару (для RollingMetrics).
+    """
+    n_bars, n_cols = close.shape
+    for i in range(n_bars):
+        for j in range(n_cols):
+            traded_out[i, j] = 0.0
+            price = close[i, j]
+            if not np.isnan(price):
+                last_close[j] = price
+                if position[j] == 0.0:
+                    if entries[i, j] and not exits[i, j] and cash[j] > 0.0:
+                        adj_price = price * (1.0 + slippage)
+                        req_cash = cash[j] / (1.0 + fees)
+                        entry_cost[j] = cash[j]
+                        position[j] = req_cash / adj_price
+                        traded_out[i, j] = req_cash
+                        cash[j] = 0.0
+                elif exits[i, j] and not entries[i, j]:
+                    adj_price = price * (1.0 - slippage)
+                    proceeds = position[j] * adj_price
+                    traded_out[i, j] = proceeds
+                    cash[j] += proceeds - proceeds * fees
+                    position[j] = 0.0
+                    n_trades[j] += 1
+                    if cash[j] - entry_cost[j] > 0.0:
+                        n_wins[j] += 1
+
+            if position[j] != 0.0:
+                pos_out[i, j] = True
+                value = cash[j] + position[j] * last_close[j]
+            else:
+                pos_out[i, j] = False
+                value = cash[j]
+            value_out[i, j] = value
+            if np.isnan(value):
+                continue
+
+            # Онлайн-метрики: дохідність (Welford) і просідання
+            if prev_value[j] == 0.0:
+                ret = 0.0 if value == 0.0 else np.inf
+            else:
+                ret = (value - prev_value[j]) / prev_value[j]
+            prev_value[j] = value
+            ret_n[j] += 1
+            delta = ret - ret_mean[j]
+            ret_mean[j] += delta / ret_n[j]
+            ret_m2[j] += delta * (ret - ret_mean[j])
+
+            if np.isnan(peak[j]) or value > peak[j]:
+                peak[j] = value
+            dd = value / peak[j] - 1.0
+            if dd < max_dd[j]:
+                max_dd[j] = dd
+
+
+class PortfolioState:
+    """
+    Стан портфеля по символах, що переноситься між часовими чанками:
+    кеш, позиція, остання ціна, а також акумулятори метрик.
+    Пам'ять – O(кількість символів), незалежно від довжини історії.
+    """
+
+    def __init__(self, symbols: List[str], init_cash: float = 100.0):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.init_cash = init_cash
+        self.cash = np.full(n, float(init_cash))
+        self.position = np.zeros(n)
+        self.last_close = np.full(n, np.nan)
+        self.entry_cost = np.zeros(n)
+        self.prev_value = np.full(n, float(init_cash))
+        self.peak = np.full(n, np.nan)
+        self.max_dd = np.zeros(n)
+        self.ret_n = np.zeros(n, dtype=np.int64)
+        self.ret_mean = np.zeros(n)
+        self.ret_m2 = np.zeros(n)
+        self.n_trades = np.zeros(n, dtype=np.int64)
+        self.n_wins = np.zeros(n, dtype=np.int64)
+        # Для exposure_time: об'єднання інтервалів угод по всіх символах
+        self.first_time = None
+        self.last_time = None
+        self.last_any_open = False
+        self.occupied_ns = 0
+
+    def update(self, index: pd.DatetimeIndex, close: np.ndarray, entries: np.ndarray,
+               exits: np.ndarray, fees: float, slippage: float,
+               rolling: Optional[RollingMetrics] = None):
+        """
+        Проганяє один чанк (index без warm-up рядків) і оновлює стан.
+        :param rolling: якщо задано – акумулятор ковзних метрик, що оновлюється тим же чанком
+        """
+        if len(index) == 0:
+            return
+        shape = (len(index), len(self.symbols))
+        value_out = np.empty(shape)
+        pos_out = np.empty(shape, dtype=np.bool_)
+        traded_out = np.empty(shape)
+        simulate_signals_nb(
+            np.ascontiguousarray(close, dtype=np.float64),
+            np.ascontiguousarray(entries, dtype=np.bool_),
+            np.ascontiguousarray(exits, dtype=np.bool_),
+            fees, slippage,
+            self.cash, self.position, self.last_close, self.entry_cost, self.prev_value,
+            self.peak, self.max_dd, self.ret_n, self.ret_mean, self.ret_m2,
+            self.n_trades, self.n_wins, value_out, pos_out, traded_out,
+        )
+        if rolling is not None:
+            rolling.update(index, value_out, pos_out, traded_out)
+        in_pos = pos_out.any(axis=1)
+
+        times = index.values.astype("datetime64[ns]").view("i8")
+        if self.last_time is not None and self.last_any_open:
+            # Крок між останнім баром попереднього чанку і першим баром цього
+            self.occupied_ns += int(times[0] - self.last_time)
+        if len(times) > 1:
+            self.occupied_ns += int(np.diff(times)[in_pos[:-1]].sum())
+        if self.first_time is None:
+            self.first_time = int(times[0])
+        self.last_time = int(times[-1])
+        self.last_any_open = bool(in_pos[-1])
+
+    def value(self) -> np.ndarray:
+        asset = np.where(self.position != 0.0, self.position * self.last_close, 0.0)
+        return self.cash + asset
+
+    def metrics(self, freq: str = "1min", year_freq: str = "365 days") -> dict:
+        """
+        Підсумкові метрики у форматі compute_metrics (середнє по символах).
+        """
+        value = self.value()
+        total_return = value / self.init_cash - 1.0
+
+        ann_factor = pd.Timedelta(year_freq) / pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(self.ret_m2 / (self.ret_n - 1))
+            sharpe = np.where(std == 0.0, np.inf, self.ret_mean / std * np.sqrt(ann_factor))
+        sharpe = np.where(self.ret_n < 2, np.nan, sharpe)
+
+        # Відкриті угоди рахуються за останньою ціною (як у vbt trades)
+        open_mask = self.position != 0.0
+        trades = self.n_trades + open_mask
+        wins = self.n_wins + (open_mask & (self.position * self.last_close - self.entry_cost > 0))
+        has_trades = trades > 0
+        win_rate = float(np.mean(wins[has_trades] / trades[has_trades])) if has_trades.any() else None
+
+        if self.first_time is None or self.last_time <= self.first_time:
+            exposure_time = 0.0
+        else:
+            exposure_time = self.occupied_ns / (self.last_time - self.first_time)
+
+        return {
+            "total_return": _nanmean(total_return),
+            "sharpe_ratio": _nanmean(sharpe),
+            "max_drawdown": _nanmean(np.where(np.isnan(self.peak), np.nan, self.max_dd)),
+            "win_rate": win_rate,
+            "exposure_time": exposure_time,
+        }
+
+
+def _nanmean(arr: np.ndarray) -> float:
+    arr = arr[~np.isnan(arr)]
+    return float(arr.mean()) if len(arr) else np.nan
+
+
+def _time_scalar(ts: pd.Timestamp, time_type: pa.DataType) -> pa.Scalar:
+    return pa.scalar(ts.to_datetime64(), type=pa.timestamp("ns")).cast(time_type)
+
+
+def scan_universe(dataset: ds.Dataset) -> Tuple[List[str], pd.Timestamp, pd.Timestamp]:
+    """
+    Один прохід батчами по колонках symbol/time: унікальні символи та межі часу.
+    Пам'ять обмежена розміром батчу, а не всією історією.
+    """
+    symbols = set()
+    t_min, t_max = None, None
+    for batch in dataset.to_batches(columns=["symbol", "time"]):
+        if batch.num_rows == 0:
+            continue
+        symbols.update(pc.unique(batch.column(0)).to_pylist())
+        bounds = pc.min_max(batch.column(1))
+        lo, hi = pd.Timestamp(bounds["min"].as_py()), pd.Timestamp(bounds["max"].as_py())
+        t_min = lo if t_min is None else min(t_min, lo)
+        t_max = hi if t_max is None else max(t_max, hi)
+    return sorted(symbols), t_min, t_max
+
+
+def scan_time_chunks(data_path: str, start, end, chunk_size: str = "7D", warmup_bars: int = 1440,
+                     freq: str = "1min", symbols: Optional[List[str]] = None
+                     ) -> Iterator[Tuple[pd.Timestamp, pd.Timestamp, pd.DataFrame]]:
+    """
+    Послідовно читає parquet-файл/директорію (Arrow dataset) часовими чанками
+    [chunk_start - warmup, chunk_end). Pushdown-фільтри по time/symbol означають,
+    що в пам'яті одночасно лише один чанк із warm-up.
+    :return: ітератор (chunk_start, chunk_end, long DataFrame)
+    """
+    dataset = ds.dataset(data_path, format="parquet")
+    time_type = dataset.schema.field("time").type
+    warmup = pd.Timedelta(pd.tseries.frequencies.to_offset(freq)) * warmup_bars
+    step = pd.Timedelta(chunk_size)
+
+    chunk_start = pd.Timestamp(start)
+    end = pd.Timestamp(end)
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + step, end + pd.Timedelta(1, "ns"))
+        flt = ((ds.field("time") >= _time_scalar(chunk_start - warmup, time_type))
+               & (ds.field("time") < _time_scalar(chunk_end, time_type)))
+        if symbols is not None:
+            flt = flt & ds.field("symbol").isin(symbols)
+        table = dataset.to_table(columns=OHLCV_COLUMNS, filter=flt)
+        yield chunk_start, chunk_end, table.to_pandas()
+        chunk_start = chunk_end
+
+
+class OutOfCoreBacktester:
+    """
+    Бектест стратегії (StrategyBase) по багаторічній історії без завантаження всього
+    набору в пам'ять: сигнали рахуються по часових чанках із warm-up перекриттям,
+    а стан портфеля і метрики переносяться між чанками (PortfolioState).
+
+    Для стратегій з індикаторами скінченного вікна (rolling, shift, resample) при
+    warmup_bars >= найбільшого вікна результат збігається з run_backtest в пам'яті.
+    Рекурсивні індикатори (RSI, ATR з core.indicators) на початку кожного чанку стартують
+    заново, але внесок старту згасає як (1 - 1/window)^warmup_bars – при warm-up 1440
+    і вікні 14 це далеко нижче точності float64, тож результат теж збігається.
+    Підтримуються лише стратегії з сигналами по символах (signal_based=True, longonly).
+    """
+
+    def __init__(self, data_path: str, strategy_cls, strategy_params: Optional[dict] = None,
+                 start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 chunk_size: str = "7D", warmup_bars: int = 1440, freq: str = "1min",
+                 symbols: Optional[List[str]] = None, init_cash: float = 100.0,
+                 rolling_window: int = 1440, report_every: int = 60):
+        """
+        :param data_path: parquet-файл або директорія з parquet-файлами (схема DataLoader)
+        :param strategy_cls: клас стратегії, наслідуваний від StrategyBase
+        :param strategy_params: параметри конструктора стратегії
+        :param chunk_size: довжина часового чанку (pd.Timedelta рядок), визначає пікову пам'ять
+        :param warmup_bars: кількість барів перекриття (найбільше вікно індикатора, напр. 1440)
+        :param freq: частота барів (для warm-up та анулізації Sharpe)
+        :param symbols: символи; якщо None – всі символи зі сховища
+        :param rolling_window: вікно ковзного Sharpe у барах (RollingMetrics)
+        :param report_every: крок проріджування ряду ковзних метрик у барах
+        """
+        self.data_path = data_path
+        self.strategy_cls = strategy_cls
+        self.strategy_params = strategy_params or {}
+        self.start_date = start_date
+        self.end_date = end_date
+        self.chunk_size = chunk_size
+        self.warmup_bars = warmup_bars
+        self.freq = freq
+        self.symbols = symbols
+        self.init_cash = init_cash
+        self.rolling_window = rolling_window
+        self.report_every = report_every
+        self.state = None
+        self.rolling = None
+
+        # Симуляція по чанках повторює from_signals по кожному символу окремо:
+        # крос-секційні портфелі зі спільним кешем і ребалансуванням вона не відтворює
+        if not (isinstance(strategy_cls, type) and issubclass(strategy_cls, StrategyBase)
+                and strategy_cls.signal_based):
+            raise ValueError(f"[OutOfCore] {getattr(strategy_cls, '__name__', strategy_cls)} is not a per-symbol "
+                             f"signal strategy (StrategyBase with signal_based=True); "
+                             f"cross-sectional strategies are not supported.")
+        if getattr(strategy_cls, "direction", "longonly") != "longonly":
+            raise ValueError("[OutOfCore] Only longonly strategies are supported.")
+
+    def run(self) -> dict:
+        """
+        Проганяє всі чанки і повертає метрики у форматі compute_metrics.
+        """
+        dataset = ds.dataset(self.data_path, format="parquet")
+        symbols, t_min, t_max = scan_universe(dataset)
+        symbols = self.symbols or symbols
+        start = pd.Timestamp(self.start_date) if self.start_date is not None else t_min
+        end = pd.Timestamp(self.end_date) if self.end_date is not None else t_max
+        self.state = PortfolioState(symbols, init_cash=self.init_cash)
+        self.rolling = RollingMetrics(len(symbols), window=self.rolling_window,
+                                      every=self.report_every, freq=self.freq)
+        self.rolling.init_value(self.init_cash)
+
+        fees = self.strategy_cls.fees
+        slippage = self.strategy_cls.slippage
+        for chunk_start, chunk_end, df in scan_time_chunks(
+                self.data_path, start, end, chunk_size=self.chunk_size,
+                warmup_bars=self.warmup_bars, freq=self.freq, symbols=self.symbols):
+            if df.empty:
+                continue
+            print(f"[OutOfCore] Chunk {chunk_start} – {chunk_end}: {len(df)} rows")
+            strat = self.strategy_cls(df, **self.strategy_params)
+            signals = strat.generate_signals()
+
+            # Відкидаємо warm-up і вирівнюємо колонки на повний всесвіт символів
+            keep = signals.index >= chunk_start
+            close = strat.data["close"].loc[keep].reindex(columns=symbols)
+            signals = signals.loc[keep].reindex(columns=symbols)
+            self.state.update(close.index, close.to_numpy(),
+                              (signals == 1).to_numpy(), (signals == -1).to_numpy(),
+                              fees, slippage, rolling=self.rolling)
+
+        return self.state.metrics(freq=self.freq)
+
+    def rolling_report(self) -> pd.DataFrame:
+        """
+        Проріджений часовий ряд ковзних метрик останнього run().
+        """
+        if self.rolling is None:
+            raise ValueError("[OutOfCore] Call run() first.")
+        return self.rolling.to_frame()
@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numba
+import numpy as np
+
+
+def _default_threads() -> int:
+    env = os.environ.get("FINTECH_NUM_THREADS")
+    return max(int(env), 1) if env else (os.cpu_count() or 1)
+
+
+_num_threads = _default_threads()
+
+
+def set_num_threads(n: Optional[int] = None) -> int:
+    """
+    Глобальна кількість потоків для колонкових ядер (run_column_blocks) і prange-ядер numba.
+    None – значення за замовчуванням (FINTECH_NUM_THREADS або кількість ядер).
+    Повертає встановлене значення.
+    """
+    global _num_threads
+    _num_threads = max(int(n), 1) if n else _default_threads()
+    numba.set_num_threads(min(_num_threads, numba.config.NUMBA_NUM_THREADS))
+    return _num_threads
+
+
+def get_num_threads() -> int:
+    return _num_threads
+
+
+def column_blocks(n_cols: int, n_blocks: int) -> List[Tuple[int, int]]:
+    """
+    Розбиває n_cols колонок на n_blocks суміжних блоків (start, stop) майже однакового розміру.
+    """
+    n_blocks = max(min(n_blocks, n_cols), 1)
+    bounds = np.linspace(0, n_cols, n_blocks + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def run_column_blocks(kernel: Callable, inputs: Sequence[np.ndarray], n_outputs: int = 1,
+                      args: tuple = (), n_threads: Optional[int] = None,
+                      block_cols: Optional[int] = None) -> List[np.ndarray]:
+    """
+    Виконує kernel(*input_blocks, *output_blocks, *args) над блоками колонок панелі
+    час × символи у пулі потоків. kernel має бути скомпільований з @njit(nogil=True):
+    тоді потоки справді працюють паралельно, без GIL.
+    Входи переводяться у Fortran-порядок (колонка – суцільний шматок пам'яті),
+    тож блок колонок – це суцільний зріз без копіювання, а ядро йде по колонці послідовно.
+    Кожен блок пише лише у свої колонки виходів, тож синхронізація не потрібна.
+
+    :param kernel: nogil-ядро, що заповнює виходи на місці
+    :param inputs: 2D float-масиви однакової форми (бари × колонки)
+    :param n_outputs: кількість 2D float64 виходів тієї ж форми
+    :param args: скалярні параметри ядра
+    :param n_threads: кількість потоків (None – глобальне налаштування)
+    :param block_cols: розмір блоку колонок (None – рівномірно між потоками)
+    """
+    inputs = [np.asfortranarray(x, dtype=np.float64) for x in inputs]
+    shape = inputs[0].shape
+    outputs = [np.empty(shape, dtype=np.float64, order="F") for _ in range(n_outputs)]
+    n_threads = n_threads or _num_threads
+    n_cols = shape[1]
+    n_blocks = -(-n_cols // block_cols) if block_cols else n_threads
+    blocks = column_blocks(n_cols, n_blocks)
+
+    def run(block):
+        a, b = block
+        kernel(*[x[:, a:b] for x in inputs], *[o[:, a:b] for o in outputs], *args)
+
+    if n_threads == 1 or len(blocks) <= 1:
+        for block in blocks:
+            run(block)
+    else:
+        with ThreadPoolExecutor(max_workers=min(n_threads, len(blocks))) as pool:
+            list(pool.map(run, blocks))
+    return outputs
@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import hashlib
+import inspect
+import sqlite3
+import subprocess
+from contextlib import closing
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+METRIC_COLUMNS = ["total_return", "sharpe_ratio", "max_drawdown", "win_rate", "exposure_time"]
+SYMBOL_METRIC_COLUMNS = ["total_return", "sharpe_ratio", "max_drawdown"]
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Відбиток вмісту DataFrame (векторний хеш рядків), щоб розрізняти запуски на різних даних.
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(",".join(map(str, df.columns)).encode())
+    return digest.hexdigest()[:16]
+
+
+def file_fingerprint(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Відбиток файлу (або всіх файлів директорії, напр. parquet-датасету) за вмістом –
+    для запусків, де дані не завантажуються цілком (свіпи читають лише свої шарди).
+    """
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, f) for root, _, names in os.walk(path) for f in names)
+    else:
+        files = [path]
+    digest = hashlib.sha1()
+    for name in files:
+        digest.update(os.path.relpath(name, path).encode() if name != path else b"")
+        with open(name, "rb") as f:
+            for block in iter(lambda: f.read(chunk_size), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def code_version() -> str:
+    """
+    Поточний git-коміт (із позначкою -dirty при незакомічених змінах) або "unknown".
+    """
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                             capture_output=True, text=True, timeout=5).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, timeout=5).stdout.strip()
+        return (rev + "-dirty" if dirty else rev) or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def strategy_params(strategy) -> dict:
+    """
+    Параметри конструктора стратегії (усе, крім price_data), зчитані з атрибутів екземпляра.
+    """
+    sig = inspect.signature(strategy.__class__.__init__)
+    return {
+        name: getattr(strategy, name)
+        for name in sig.parameters
+        if name not in ("self", "price_data") and hasattr(strategy, name)
+    }
+
+
+def _params_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _to_float(value) -> Optional[float]:
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+class ResultsStore:
+    """
+    Append-only сховище результатів бектестів і свіпів на SQLite.
+    Кожен запуск (run) має метадані: відбиток даних, версію коду, опис і час;
+    у нього пишуться агреговані метрики для кожної пари (strategy, params)
+    і, за наявності, метрики по символах. Набори параметрів нормалізовані
+    в param_sets (цілий param_id). record() також підтримує зведення: param_run_stats
+    (сума й кількість кожної метрики на пару run × param_id) і param_stats (те саме
+    по всіх запусках), з індексами за середнім – top_params читає їх, а не results.
+    """
+
+    def __init__(self, db_path: str = "./results/results.db", wal: bool = False):
+        """
+        :param db_path: шлях до SQLite-файлу
+        :param wal: WAL-журнал – лише коли всі процеси, що пишуть у сховище, на одній машині
+                    (WAL потребує спільної пам'яті й не працює на мережевих ФС)
+        """
+        self.db_path = db_path
+        self.wal = wal
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=60.0)
+        conn.execute("PRAGMA busy_timeout = 60000")
+        # Більший кеш сторінок: record() оновлює індекси зведень у випадковому порядку
+        conn.execute("PRAGMA cache_size = -65536")
+        return conn
+
+    def _init_db(self):
+        metric_defs = ", ".join(f"{m} REAL" for m in METRIC_COLUMNS)
+        symbol_defs = ", ".join(f"{m} REAL" for m in SYMBOL_METRIC_COLUMNS)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"PRAGMA journal_mode = {'WAL' if self.wal else 'DELETE'}")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL NOT NULL,
+                    data_fingerprint TEXT,
+                    code_version TEXT,
+                    description TEXT
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS param_sets (
+                    param_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    strategy TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    UNIQUE (strategy, params)
+                )
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS results (
+                    result_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+                    param_id INTEGER NOT NULL REFERENCES param_sets(param_id),
+                    n_symbols INTEGER,
+                    elapsed_sec REAL,
+                    {metric_defs}
+                )
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS symbol_results (
+                    result_id INTEGER NOT NULL REFERENCES results(result_id),
+                    symbol TEXT NOT NULL,
+                    {symbol_defs}
+                )
+                """
+            )
+            # Зведення для top_params: сума, кількість (не NULL) і середнє кожної метрики
+            stat_defs = ", ".join(f"{m}_sum REAL NOT NULL DEFAULT 0, {m}_n INTEGER NOT NULL DEFAULT 0, {m} REAL"
+                                  for m in METRIC_COLUMNS)
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS param_run_stats (
+                    run_id INTEGER NOT NULL,
+                    param_id INTEGER NOT NULL,
+                    {stat_defs},
+                    PRIMARY KEY (param_id, run_id)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS param_stats (
+                    param_id INTEGER PRIMARY KEY,
+                    last_run_id INTEGER NOT NULL,
+                    {stat_defs}
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id)")
+            for m in METRIC_COLUMNS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_param_run_stats_{m} ON param_run_stats(run_id, {m})")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_param_stats_{m} ON param_stats({m})")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_symbol_results ON symbol_results(result_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_symbol_results_symbol ON symbol_results(symbol)")
+
+    @staticmethod
+    def _upsert_stats(conn: sqlite3.Connection, stats: dict):
+        """
+        Додає суми/кількості метрик (stats: (run_id, param_id) -> [sum, n, ...]) до зведень.
+        Середнє перераховується з оновлених суми й кількості.
+        """
+        cols = [c for m in METRIC_COLUMNS for c in (f"{m}_sum", f"{m}_n")]
+        updates = ", ".join(
+            f"{m}_sum = {m}_sum + excluded.{m}_sum, {m}_n = {m}_n + excluded.{m}_n, "
+            f"{m} = ({m}_sum + excluded.{m}_sum) / NULLIF({m}_n + excluded.{m}_n, 0)"
+            for m in METRIC_COLUMNS
+        )
+        means = lambda v: [v[2 * i] / v[2 * i + 1] if v[2 * i + 1] else None for i in range(len(METRIC_COLUMNS))]
+        placeholders = ", ".join(["?"] * (2 + len(cols) + len(METRIC_COLUMNS)))
+        conn.executemany(
+            f"INSERT INTO param_run_stats (run_id, param_id, {', '.join(cols)}, {', '.join(METRIC_COLUMNS)}) "
+            f"VALUES ({placeholders}) ON CONFLICT (param_id, run_id) DO UPDATE SET {updates}",
+            [(run_id, param_id, *v, *means(v)) for (run_id, param_id), v in stats.items()],
+        )
+        conn.executemany(
+            f"INSERT INTO param_stats (param_id, last_run_id, {', '.join(cols)}, {', '.join(METRIC_COLUMNS)}) "
+            f"VALUES ({placeholders}) ON CONFLICT (param_id) DO UPDATE SET "
+            f"last_run_id = MAX(last_run_id, excluded.last_run_id), {updates}",
+            [(param_id, run_id, *v, *means(v)) for (run_id, param_id), v in stats.items()],
+        )
+
+    def start_run(self, data_fingerprint: Optional[str] = None, description: str = "",
+                  version: Optional[str] = None) -> int:
+        """
+        Реєструє новий запуск і повертає його run_id.
+        """
+        with closing(self._connect()) as conn, conn:
+            cur = conn.execute(
+                "INSERT INTO runs (created_at, data_fingerprint, code_version, description) VALUES (?, ?, ?, ?)",
+                (time.time(), data_fingerprint, version or code_version(), description),
+            )
+            return cur.lastrowid
+
+    def record(self, run_id: int, rows: List[dict]) -> int:
+        """
+        Додає результати до запуску. Кожен рядок – dict з ключами:
+        strategy, params (dict), метрики METRIC_COLUMNS, опційно n_symbols, elapsed_sec
+        і symbol_metrics (DataFrame з індексом symbol і колонками SYMBOL_METRIC_COLUMNS).
+        """
+        with closing(self._connect()) as conn, conn:
+            param_ids = {}
+            stats = {}
+            for row in rows:
+                key = (row["strategy"], _params_key(row.get("params", {})))
+                if key not in param_ids:
+                    conn.execute("INSERT OR IGNORE INTO param_sets (strategy, params) VALUES (?, ?)", key)
+                    param_ids[key] = conn.execute(
+                        "SELECT param_id FROM param_sets WHERE strategy = ? AND params = ?", key).fetchone()[0]
+                metrics = [_to_float(row.get(m)) for m in METRIC_COLUMNS]
+                cur = conn.execute(
+                    f"INSERT INTO results (run_id, param_id, n_symbols, elapsed_sec, "
+                    f"{', '.join(METRIC_COLUMNS)}) VALUES ({', '.join(['?'] * (4 + len(METRIC_COLUMNS)))})",
+                    (run_id, param_ids[key],
+                     None if row.get("n_symbols") is None else int(row["n_symbols"]),
+                     _to_float(row.get("elapsed_sec")),
+                     *metrics),
+                )
+                acc = stats.setdefault((run_id, param_ids[key]), [0.0, 0] * len(METRIC_COLUMNS))
+                for i, value in enumerate(metrics):
+                    if value is not None:
+                        acc[2 * i] += value
+                        acc[2 * i + 1] += 1
+                sym = row.get("symbol_metrics")
+                if sym is not None and len(sym):
+                    sym = sym.reindex(columns=SYMBOL_METRIC_COLUMNS)
+                    values = sym.to_numpy(dtype=np.float64)
+                    conn.executemany(
+                        f"INSERT INTO symbol_results (result_id, symbol, {', '.join(SYMBOL_METRIC_COLUMNS)}) "
+                        f"VALUES (?, ?, {', '.join(['?'] * len(SYMBOL_METRIC_COLUMNS))})",
+                        [(cur.lastrowid, str(s), *[None if np.isnan(v) else float(v) for v in vals])
+                         for s, vals in zip(sym.index, values)],
+                    )
+            self._upsert_stats(conn, stats)
+        return len(rows)
+
+    def record_frame(self, run_id: int, df: pd.DataFrame, params_column: str = "params") -> int:
+        """
+        Додає результати з DataFrame (напр. SweepQueue.merge_results): колонка params –
+        JSON-рядок або dict, решта – strategy, метрики, n_symbols.
+        """
+        rows = []
+        for rec in df.to_dict("records"):
+            params = rec.get(params_column, {})
+            rows.append(dict(rec, params=json.loads(params) if isinstance(params, str) else params))
+        return self.record(run_id, rows)
+
+    def top_params(self, metric: str = "sharpe_ratio", n: int = 20, last_runs: Optional[int] = 10,
+                   strategy: Optional[str] = None, ascending: bool = False) -> pd.DataFrame:
+        """
+        Найкращі n наборів параметрів за середнім значенням metric в останніх last_runs запусках.
+        """
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"[ResultsStore] Unknown metric: {metric}")
+        if last_runs is not None and last_runs < 1:
+            raise ValueError(f"[ResultsStore] last_runs must be >= 1 or None, got {last_runs}")
+        order = "ASC" if ascending else "DESC"
+        with closing(self._connect()) as conn:
+            first_run, last_run = conn.execute("SELECT MIN(run_id), MAX(run_id) FROM runs").fetchone()
+            lo = first_run or 0
+            if last_runs is not None:
+                row = conn.execute("SELECT MIN(run_id) FROM (SELECT run_id FROM runs ORDER BY run_id DESC LIMIT ?)",
+                                   (int(last_runs),)).fetchone()
+                lo = row[0] if row[0] is not None else 0
+
+            where, args = [f"t.{metric} IS NOT NULL"], []
+            if strategy is not None:
+                where.append("t.param_id IN (SELECT param_id FROM param_sets WHERE strategy = ?)")
+                args.append(strategy)
+            if lo <= (first_run or 0):
+                # Вікно охоплює всі запуски – готові середні в param_stats (індекс за метрикою)
+                source = f"SELECT param_id, {metric}, {metric}_n AS n_results, last_run_id FROM param_stats"
+            elif lo == last_run:
+                # Один запуск – індекс (run_id, метрика) у param_run_stats
+                source = (f"SELECT param_id, {metric}, {metric}_n AS n_results, run_id AS last_run_id "
+                          f"FROM param_run_stats WHERE run_id = ?")
+                args.insert(0, lo)
+            else:
+                # Кілька останніх запусків: групування йде в порядку ключа (param_id, run_id),
+                # без тимчасового B-дерева, по рядку на run × param, а не на результат
+                source = (f"SELECT param_id, SUM({metric}_sum) / SUM({metric}_n) AS {metric}, "
+                          f"SUM({metric}_n) AS n_results, MAX(CASE WHEN {metric}_n > 0 THEN run_id END) "
+                          f"AS last_run_id FROM param_run_stats WHERE run_id >= ? GROUP BY param_id "
+                          f"HAVING SUM({metric}_n) > 0")
+                args.insert(0, lo)
+            # Текст параметрів підтягуємо лише для top-n
+            query = (
+                f"SELECT p.strategy, p.params, t.{metric}, t.n_results, t.last_run_id FROM "
+                f"(SELECT * FROM ({source}) t WHERE {' AND '.join(where)} ORDER BY t.{metric} {order} LIMIT ?) t "
+                f"JOIN param_sets p ON p.param_id = t.param_id ORDER BY t.{metric} {order}"
+            )
+            args.append(int(n))
+            return pd.read_sql_query(query, conn, params=args)
+
+    def runs(self, limit: int = 50) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query("SELECT * FROM runs ORDER BY run_id DESC LIMIT ?", conn, params=[limit])
+
+    def results(self, run_id: Optional[int] = None) -> pd.DataFrame:
+        """
+        Агреговані результати одного запуску (за замовчуванням – останнього).
+        """
+        with closing(self._connect()) as conn:
+            if run_id is None:
+                row = conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+                run_id = row[0]
+            return pd.read_sql_query(
+                "SELECT r.result_id, r.run_id, p.strategy, p.params, r.n_symbols, r.elapsed_sec, "
+                f"{', '.join('r.' + m for m in METRIC_COLUMNS)} FROM results r "
+                "JOIN param_sets p ON p.param_id = r.param_id WHERE r.run_id = ? ORDER BY r.result_id",
+                conn, params=[int(run_id)])
+
+    def symbol_results(self, result_id: int) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query("SELECT * FROM symbol_results WHERE result_id = ?",
+                                     conn, params=[int(result_id)])
+
+
+def portfolio_symbol_metrics(pf) -> pd.DataFrame:
+    """
+    Метрики vbt-портфеля по кожному символу (колонці); для згрупованого портфеля
+    (спільний кеш) – внесок кожної колонки.
+    """
+    df = pd.DataFrame({
+        "total_return": pf.total_return(group_by=False),
+        "sharpe_ratio": pf.sharpe_ratio(group_by=False),
+        "max_drawdown": pf.max_drawdown(group_by=False),
+    })
+    df.index = df.index.map(str)
+    return df
+
@@ -0,0 +1,237 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+from numba import njit, prange
+
+
+METRICS = ["total_return", "sharpe_ratio", "max_drawdown"]
+
+
+@njit(cache=True)
+def _path_metrics_1d_nb(returns, ann_factor, out):
+    """
+    total_return, sharpe_ratio, max_drawdown для одного ряду дохідностей.
+    """
+    n = returns.shape[0]
+    value = 1.0
+    peak = 1.0
+    max_dd = 0.0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        r = returns[i]
+        value *= 1.0 + r
+        if value > peak:
+            peak = value
+        dd = value / peak - 1.0
+        if dd < max_dd:
+            max_dd = dd
+        delta = r - mean
+        mean += delta / (i + 1)
+        m2 += delta * (r - mean)
+    out[0] = value - 1.0
+    if n < 2:
+        out[1] = np.nan
+    else:
+        std = np.sqrt(m2 / (n - 1))
+        out[1] = np.inf if std == 0.0 else mean / std * np.sqrt(ann_factor)
+    out[2] = max_dd
+
+
+@njit(parallel=True, cache=True)
+def _block_bootstrap_nb(returns, starts, block_size, ann_factor):
+    """
+    Кругова блочна бутстрап-вибірка: кожна симуляція склеює блоки довжини block_size,
+    що починаються зі starts[sim, k]. Симуляції рахуються паралельно (prange).
+    """
+    n_sims, n_blocks = starts.shape
+    n = returns.shape[0]
+    out = np.empty((n_sims, 3))
+    for s in prange(n_sims):
+        path = np.empty(n)
+        pos = 0
+        for k in range(n_blocks):
+            st = starts[s, k]
+            for j in range(block_size):
+                if pos == n:
+                    break
+                path[pos] = returns[(st + j) % n]
+                pos += 1
+        _path_metrics_1d_nb(path, ann_factor, out[s])
+    return out
+
+
+@njit(parallel=True, cache=True)
+def _trade_paths_nb(trade_returns, order, ann_factor):
+    """
+    Метрики кривої капіталу з послідовності угод у порядку order[sim] (перестановка
+    або вибірка з поверненням).
+    """
+    n_sims, n_trades = order.shape
+    out = np.empty((n_sims, 3))
+    for s in prange(n_sims):
+        path = np.empty(n_trades)
+        for k in range(n_trades):
+            path[k] = trade_returns[order[s, k]]
+        _path_metrics_1d_nb(path, ann_factor, out[s])
+    return out
+
+
+@njit(parallel=True, cache=True)
+def _random_entry_nb(close, cols, durations, entries, cost_mult, ann_factor):
+    """
+    Baseline з випадковими входами: кожна угода стратегії (символ, тривалість)
+    замінюється угодою тієї ж тривалості з випадковим моментом входу.
+    """
+    n_sims, n_trades = entries.shape
+    out = np.empty((n_sims, 3))
+    for s in prange(n_sims):
+        path = np.empty(n_trades)
+        for k in range(n_trades):
+            c = cols[k]
+            e = entries[s, k]
+            p0 = close[e, c]
+            p1 = close[e + durations[k], c]
+            if np.isnan(p0) or np.isnan(p1) or p0 == 0.0:
+                path[k] = 0.0
+            else:
+                path[k] = p1 / p0 * cost_mult - 1.0
+        _path_metrics_1d_nb(path, ann_factor, out[s])
+    return out
+
+
+def _summarize(sims: np.ndarray, actual: np.ndarray, method: str, ci: float) -> pd.DataFrame:
+    lo, hi = (1.0 - ci) / 2.0, 1.0 - (1.0 - ci) / 2.0
+    rows = []
+    for m, name in enumerate(METRICS):
+        vals = sims[:, m]
+        vals = vals[np.isfinite(vals)]
+        rows.append({
+            "method": method,
+            "metric": name,
+            "actual": actual[m],
+            "mean": vals.mean() if len(vals) else np.nan,
+            "std": vals.std(ddof=1) if len(vals) > 1 else np.nan,
+            "ci_low": np.quantile(vals, lo) if len(vals) else np.nan,
+            "ci_high": np.quantile(vals, hi) if len(vals) else np.nan,
+            # Частка симуляцій, не гірших за фактичний результат
+            "p_value": float(np.mean(vals >= actual[m])) if len(vals) else np.nan,
+        })
+    return pd.DataFrame(rows).set_index(["method", "metric"])
+
+
+def _ann_factor(freq: str, year_freq: str = "365 days") -> float:
+    return pd.Timedelta(year_freq) / pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+
+
+def block_bootstrap(returns: np.ndarray, n_sims: int = 10_000, block_size: int = 60,
+                    freq: str = "1min", ci: float = 0.95, seed: Optional[int] = None,
+                    batch_size: int = 2_000) -> pd.DataFrame:
+    """
+    Кругова блочна бутстрап-оцінка довірчих інтервалів total_return, sharpe_ratio
+    і max_drawdown для ряду дохідностей по барах (блоки зберігають автокореляцію).
+    """
+    returns = np.nan_to_num(np.asarray(returns, dtype=np.float64))
+    n = len(returns)
+    ann = _ann_factor(freq)
+    n_blocks = -(-n // block_size)
+    rng = np.random.default_rng(seed)
+    parts = []
+    for start in range(0, n_sims, batch_size):
+        size = min(batch_size, n_sims - start)
+        starts = rng.integers(0, n, size=(size, n_blocks))
+        parts.append(_block_bootstrap_nb(returns, starts, block_size, ann))
+    actual = np.empty(3)
+    _path_metrics_1d_nb(returns, ann, actual)
+    return _summarize(np.concatenate(parts), actual, "block_bootstrap", ci)
+
+
+def trade_resample(trade_returns: np.ndarray, n_sims: int = 10_000, replace: bool = False,
+                   ci: float = 0.95, seed: Optional[int] = None,
+                   batch_size: int = 2_000) -> pd.DataFrame:
+    """
+    Перемішування порядку угод (replace=False: total_return не змінюється, а max_drawdown –
+    так) або бутстрап угод із поверненням (replace=True). Sharpe – на одну угоду, без анулізації.
+    Угоди складаються послідовно в один рахунок (кожна реінвестує весь капітал), тож actual
+    total_return – це добуток (1 + r) усіх угод, а не середнє по символах, як у compute_metrics.
+    """
+    trade_returns = np.asarray(trade_returns, dtype=np.float64)
+    n = len(trade_returns)
+    method = "trade_bootstrap" if replace else "trade_shuffle"
+    actual = np.empty(3)
+    _path_metrics_1d_nb(trade_returns, 1.0, actual)
+    if n == 0:
+        return _summarize(np.full((1, 3), np.nan), actual, method, ci)
+    rng = np.random.default_rng(seed)
+    parts = []
+    for start in range(0, n_sims, batch_size):
+        size = min(batch_size, n_sims - start)
+        if replace:
+            order = rng.integers(0, n, size=(size, n))
+        else:
+            order = rng.permuted(np.broadcast_to(np.arange(n), (size, n)), axis=1)
+        parts.append(_trade_paths_nb(trade_returns, order, 1.0))
+    return _summarize(np.concatenate(parts), actual, method, ci)
+
+
+def random_entry_baseline(close: np.ndarray, cols: np.ndarray, durations: np.ndarray,
+                          trade_returns: np.ndarray, fees: float = 0.001, slippage: float = 0.0005,
+                          n_sims: int = 10_000, ci: float = 0.95, seed: Optional[int] = None,
+                          batch_size: int = 2_000) -> pd.DataFrame:
+    """
+    Порівняння з випадковими входами: та сама кількість угод, ті самі символи і тривалості,
+    але моменти входу випадкові. p_value – частка випадкових стратегій, не гірших за фактичну.
+    Угоди, як і в trade_resample, складаються в один послідовний рахунок.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    cols = np.asarray(cols, dtype=np.int64)
+    durations = np.minimum(np.asarray(durations, dtype=np.int64), close.shape[0] - 1)
+    actual = np.empty(3)
+    _path_metrics_1d_nb(np.asarray(trade_returns, dtype=np.float64), 1.0, actual)
+    if len(cols) == 0:
+        return _summarize(np.full((1, 3), np.nan), actual, "random_entry", ci)
+
+    cost_mult = (1.0 - slippage) * (1.0 - fees) / ((1.0 + slippage) * (1.0 + fees))
+    highs = close.shape[0] - durations
+    rng = np.random.default_rng(seed)
+    parts = []
+    for start in range(0, n_sims, batch_size):
+        size = min(batch_size, n_sims - start)
+        entries = rng.integers(0, highs[None, :], size=(size, len(cols)))
+        parts.append(_random_entry_nb(close, cols, durations, entries, cost_mult, 1.0))
+    return _summarize(np.concatenate(parts), actual, "random_entry", ci)
+
+
+def analyze_portfolio(pf: vbt.Portfolio, n_sims: int = 10_000, block_size: int = 60,
+                      freq: str = "1min", fees: float = 0.001, slippage: float = 0.0005,
+                      ci: float = 0.95, seed: Optional[int] = 0) -> pd.DataFrame:
+    """
+    Повний набір перевірок стійкості для портфеля стратегії:
+     - block_bootstrap: по барах, на дохідностях рівноваженого портфеля символів;
+     - trade_shuffle / trade_bootstrap: по угодах усіх символів у порядку входу;
+     - random_entry: baseline з випадковими входами.
+    Для методів по угодах угоди всіх символів складаються в один послідовний рахунок,
+    тому їхні actual total_return / max_drawdown не збігаються з compute_metrics
+    (там – середнє по символах); порівнювати слід лише з симуляціями того ж методу.
+    """
+    returns = pf.returns()
+    bar_returns = returns.mean(axis=1).to_numpy() if returns.ndim == 2 else returns.to_numpy()
+
+    records = pf.get_trades().values
+    records = records[np.argsort(records["entry_idx"], kind="stable")]
+    trade_returns = records["return"].astype(np.float64)
+    durations = np.maximum(records["exit_idx"] - records["entry_idx"], 0)
+    close = pf.close.ffill().to_numpy()
+    if close.ndim == 1:
+        close = close[:, None]
+
+    parts = [
+        block_bootstrap(bar_returns, n_sims, block_size, freq, ci, seed),
+        trade_resample(trade_returns, n_sims, False, ci, seed),
+        trade_resample(trade_returns, n_sims, True, ci, seed),
+        random_entry_baseline(close, records["col"], durations, trade_returns,
+                              fees, slippage, n_sims, ci, seed),
+    ]
+    return pd.concat(parts)
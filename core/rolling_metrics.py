@@ -0,0 +1,253 @@
+from typing import Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+from numba import njit
+from vectorbt.portfolio.nb import add_nb
+
+
+ROLLING_COLUMNS = ["nav", "rolling_sharpe", "drawdown", "max_drawdown",
+                   "exposure", "time_in_market", "turnover"]
+
+
+@njit(cache=True)
+def _emit_nb(value, in_pos, ann_factor, count, rsum, rsq, peak, max_dd,
+             pos_bars, n_bars, turnover, row):
+    """
+    Один рядок звіту: середні по символах значення поточного стану.
+    """
+    n_cols = value.shape[0]
+    nav = 0.0
+    n_nav = 0
+    sharpe = 0.0
+    n_sharpe = 0
+    dd = 0.0
+    mdd = 0.0
+    n_dd = 0
+    open_cnt = 0
+    tim = 0.0
+    turn = 0.0
+    for j in range(n_cols):
+        if not np.isnan(value[j]):
+            nav += value[j]
+            n_nav += 1
+        if count[j] > 1:
+            mean = rsum[j] / count[j]
+            var = (rsq[j] - rsum[j] * mean) / (count[j] - 1)
+            if var > 0.0:
+                sharpe += mean / np.sqrt(var) * np.sqrt(ann_factor)
+                n_sharpe += 1
+        if not np.isnan(peak[j]):
+            dd += value[j] / peak[j] - 1.0
+            mdd += max_dd[j]
+            n_dd += 1
+        if in_pos[j]:
+            open_cnt += 1
+        if n_bars > 0:
+            tim += pos_bars[j] / n_bars
+        turn += turnover[j]
+    row[0] = nav / n_nav if n_nav > 0 else np.nan
+    row[1] = sharpe / n_sharpe if n_sharpe > 0 else np.nan
+    row[2] = dd / n_dd if n_dd > 0 else np.nan
+    row[3] = mdd / n_dd if n_dd > 0 else np.nan
+    row[4] = open_cnt / n_cols if n_cols > 0 else np.nan
+    row[5] = tim / n_cols if n_cols > 0 else np.nan
+    row[6] = turn / n_cols if n_cols > 0 else np.nan
+
+
+@njit(cache=True)
+def _rolling_update_nb(value, in_pos, traded, window, every, ann_factor, bar_counter,
+                       buf, buf_pos, count, rsum, rsq, prev_value, peak, max_dd,
+                       pos_bars, turnover, out_idx, out):
+    """
+    Оновлює стан по блоку барів (n_bars × n_symbols) за O(1) на бар і символ:
+    кільцевий буфер дохідностей для ковзного Sharpe, пік/просідання, час у позиції
+    та turnover (обсяг угод / капітал). Кожні every барів пише рядок у out.
+    Повертає кількість записаних рядків.
+    """
+    n_bars, n_cols = value.shape
+    n_out = 0
+    for i in range(n_bars):
+        for j in range(n_cols):
+            v = value[i, j]
+            if np.isnan(v):
+                continue
+            if prev_value[j] != 0.0 and not np.isnan(prev_value[j]):
+                r = (v - prev_value[j]) / prev_value[j]
+            else:
+                r = 0.0
+            prev_value[j] = v
+
+            # Ковзне вікно: замінюємо найстаріший елемент буфера
+            k = buf_pos[j]
+            if count[j] == window:
+                old = buf[k, j]
+                rsum[j] -= old
+                rsq[j] -= old * old
+            else:
+                count[j] += 1
+            buf[k, j] = r
+            rsum[j] += r
+            rsq[j] += r * r
+            buf_pos[j] = (k + 1) % window
+
+            if np.isnan(peak[j]) or v > peak[j]:
+                peak[j] = v
+            dd = v / peak[j] - 1.0
+            if dd < max_dd[j]:
+                max_dd[j] = dd
+
+            if in_pos[i, j]:
+                pos_bars[j] += 1
+            if v > 0.0:
+                turnover[j] += traded[i, j] / v
+
+        bar_counter += 1
+        if bar_counter % every == 0:
+            _emit_nb(value[i], in_pos[i], ann_factor, count, rsum, rsq, peak, max_dd,
+                     pos_bars, bar_counter, turnover, out[n_out])
+            out_idx[n_out] = i
+            n_out += 1
+    return n_out
+
+
+@njit(cache=True)
+def _replay_orders_nb(close, start, idx, col, size, price, fees, side, k0,
+                      cash, assets, last, value_out, in_pos_out, traded_out):
+    """
+    Відтворює стан портфеля vbt (кеш, активи, вартість) на блоці барів з записів ордерів,
+    як cash_nb/assets_nb/value у vectorbt (add_nb, ціна close з перенесенням вперед).
+    Ордери впорядковані за баром; k0 – перший ордер блоку. Повертає перший ордер наступного блоку.
+    """
+    n, m = close.shape
+    k = k0
+    asset_flow = np.zeros(m)
+    cash_flow = np.zeros(m)
+    for i in range(n):
+        for j in range(m):
+            asset_flow[j] = 0.0
+            cash_flow[j] = 0.0
+            traded_out[i, j] = 0.0
+        while k < idx.shape[0] and idx[k] == start + i:
+            j = col[k]
+            q = -size[k] if side[k] == 1 else size[k]
+            asset_flow[j] = add_nb(asset_flow[j], q)
+            cash_flow[j] = add_nb(cash_flow[j], -q * price[k] - fees[k])
+            traded_out[i, j] += size[k] * price[k]
+            k += 1
+        for j in range(m):
+            assets[j] = add_nb(assets[j], asset_flow[j])
+            cash[j] = add_nb(cash[j], cash_flow[j])
+            if not np.isnan(close[i, j]):
+                last[j] = close[i, j]
+            value_out[i, j] = cash[j] + assets[j] * last[j] if assets[j] != 0.0 else cash[j]
+            in_pos_out[i, j] = assets[j] != 0.0
+    return k
+
+
+def replay_orders(close: np.ndarray, orders: np.ndarray, init_cash,
+                  block_bars: int = 10_080) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Блоки (start, stop, value, in_pos, traded) портфеля vbt.from_signals без cash sharing,
+    відновлені з його записів ордерів (pf.orders.values) і close – для RollingMetrics.update.
+    Пам'ять – block_bars × символи, повні матриці pf.value()/pf.assets() не будуються.
+    """
+    n_bars, n_cols = close.shape
+    orders = orders[np.argsort(orders["idx"], kind="stable")]
+    cash = np.array(np.broadcast_to(np.asarray(init_cash, dtype=np.float64), n_cols))
+    assets = np.zeros(n_cols)
+    last = np.full(n_cols, np.nan)
+    k = 0
+    for start in range(0, n_bars, block_bars):
+        stop = min(start + block_bars, n_bars)
+        value = np.empty((stop - start, n_cols))
+        in_pos = np.empty((stop - start, n_cols), dtype=np.bool_)
+        traded = np.empty((stop - start, n_cols))
+        k = _replay_orders_nb(
+            np.ascontiguousarray(close[start:stop], dtype=np.float64), start,
+            orders["idx"], orders["col"], orders["size"], orders["price"], orders["fees"], orders["side"],
+            k, cash, assets, last, value, in_pos, traded,
+        )
+        yield start, stop, value, in_pos, traded
+
+
+class RollingMetrics:
+    """
+    Інкрементний акумулятор ризикових метрик по ходу симуляції:
+    ковзний Sharpe, поточне та максимальне просідання, експозиція, turnover і середній NAV.
+    Пам'ять – вікно × символи; на вихід – проріджений (кожні every барів) часовий ряд,
+    тож повні матриці value/returns не потрібні.
+    """
+
+    def __init__(self, n_symbols: int, window: int = 1440, every: int = 60,
+                 freq: str = "1min", year_freq: str = "365 days"):
+        """
+        :param n_symbols: кількість символів (колонок)
+        :param window: вікно ковзного Sharpe у барах
+        :param every: крок проріджування звіту у барах
+        :param freq: частота барів (для анулізації Sharpe)
+        """
+        self.window = int(window)
+        self.every = int(every)
+        self.ann_factor = pd.Timedelta(year_freq) / pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+        self.bar_counter = 0
+        self.buf = np.zeros((self.window, n_symbols))
+        self.buf_pos = np.zeros(n_symbols, dtype=np.int64)
+        self.count = np.zeros(n_symbols, dtype=np.int64)
+        self.rsum = np.zeros(n_symbols)
+        self.rsq = np.zeros(n_symbols)
+        self.prev_value = np.full(n_symbols, np.nan)
+        self.peak = np.full(n_symbols, np.nan)
+        self.max_dd = np.zeros(n_symbols)
+        self.pos_bars = np.zeros(n_symbols, dtype=np.int64)
+        self.turnover = np.zeros(n_symbols)
+        self._times = []
+        self._rows = []
+        self._last = None
+
+    def init_value(self, init_cash: float):
+        """
+        Початковий капітал – база для дохідності першого бару.
+        """
+        self.prev_value[:] = init_cash
+
+    def update(self, index: pd.DatetimeIndex, value: np.ndarray, in_pos: np.ndarray, traded: np.ndarray):
+        """
+        :param index: час барів блоку
+        :param value: вартість портфеля по символах (n_bars × n_symbols)
+        :param in_pos: чи відкрита позиція після бару (n_bars × n_symbols)
+        :param traded: обсяг угод у валюті котирування на барі (n_bars × n_symbols)
+        """
+        n_bars = len(index)
+        if n_bars == 0:
+            return
+        out = np.empty((n_bars // self.every + 1, len(ROLLING_COLUMNS)))
+        out_idx = np.empty(n_bars // self.every + 1, dtype=np.int64)
+        n_out = _rolling_update_nb(
+            np.ascontiguousarray(value, dtype=np.float64),
+            np.ascontiguousarray(in_pos, dtype=np.bool_),
+            np.ascontiguousarray(traded, dtype=np.float64),
+            self.window, self.every, self.ann_factor, self.bar_counter,
+            self.buf, self.buf_pos, self.count, self.rsum, self.rsq, self.prev_value,
+            self.peak, self.max_dd, self.pos_bars, self.turnover, out_idx, out,
+        )
+        self.bar_counter += n_bars
+        self._times.extend(index[out_idx[:n_out]])
+        self._rows.append(out[:n_out].copy())
+        # Останній бар – для фінального рядка звіту
+        self._last = (index[-1], np.array(value[-1], dtype=np.float64), np.array(in_pos[-1], dtype=np.bool_))
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Проріджений часовий ряд метрик (останній бар додається завжди).
+        """
+        times = list(self._times)
+        rows = [r for r in self._rows if len(r)]
+        if self._last is not None and (not times or times[-1] != self._last[0]):
+            row = np.empty(len(ROLLING_COLUMNS))
+            _emit_nb(self._last[1], self._last[2], self.ann_factor, self.count, self.rsum, self.rsq,
+                     self.peak, self.max_dd, self.pos_bars, self.bar_counter, self.turnover, row)
+            times.append(self._last[0])
+            rows.append(row[None, :])
+        data = np.concatenate(rows) if rows else np.empty((0, len(ROLLING_COLUMNS)))
+        return pd.DataFrame(data, index=pd.DatetimeIndex(times, name="time"), columns=ROLLING_COLUMNS)
@@ -0,0 +1,528 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import warnings
+from contextlib import closing
+import importlib
+import itertools
+import multiprocessing as mp
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.metrics import compute_metrics, metric_components, combine_metric_components
+from core.results_store import ResultsStore, file_fingerprint
+from core.parallel import set_num_threads
+
+
+# Метрики, які не можна зважувати кількістю символів шарду (див. metric_components)
+NON_ADDITIVE_METRICS = ("win_rate", "exposure_time")
+
+# Короткі імена стратегій -> шлях до класу (module:Class)
+STRATEGY_REGISTRY = {
+    "SmaCrossStrategy": "strategies.sma_cross:SmaCrossStrategy",
+    "RsiBbStrategy": "strategies.rsi_bb:RsiBbStrategy",
+    "VwapReversionStrategy": "strategies.vwap_reversion:VwapReversionStrategy",
+    "MultiTimeframeMomentum": "strategies.multi_tf_momentum:MultiTimeframeMomentum",
+    "AtrTrailingBreakout": "strategies.atr_trailing_breakout:AtrTrailingBreakout",
+    "VolumeSpikeBreakout": "strategies.volume_spike_breakout:VolumeSpikeBreakout",
+    "CrossSectionalFactorStrategy": "strategies.cross_sectional_factor:CrossSectionalFactorStrategy",
+}
+
+
+def resolve_strategy(name: str):
+    """
+    Повертає клас стратегії за коротким ім'ям з STRATEGY_REGISTRY
+    або за повним шляхом виду "package.module:ClassName".
+    """
+    path = STRATEGY_REGISTRY.get(name, name)
+    if ":" not in path:
+        raise ValueError(f"[Sweep] Unknown strategy: {name}")
+    module_name, cls_name = path.split(":", 1)
+    module = importlib.import_module(module_name)
+    return getattr(module, cls_name)
+
+
+def _chunks(items: List, size: int) -> List[List]:
+    size = max(int(size), 1)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def expand_grid(param_grid: Dict[str, List]) -> List[dict]:
+    """
+    Розгортає сітку параметрів {"short_window": [5, 10], ...} у список dict-ів.
+    """
+    if not param_grid:
+        return [{}]
+    keys = list(param_grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*(param_grid[k] for k in keys))]
+
+
+def build_tasks(strategy: str, param_grid: Dict[str, List], symbols: List[str],
+                params_per_task: int = 8, symbols_per_shard: int = 25) -> List[dict]:
+    """
+    Ділить (стратегія × сітка параметрів × символи) на задачі
+    (strategy, parameter chunk, symbol shard).
+    :param strategy: ім'я стратегії (див. STRATEGY_REGISTRY) або "module:Class"
+    :param param_grid: сітка параметрів
+    :param symbols: повний список символів
+    :param params_per_task: кількість наборів параметрів в одній задачі
+    :param symbols_per_shard: кількість символів в одному шарді
+    Крос-секційні стратегії (signal_based=False) ранжують і ребалансують увесь всесвіт
+    разом, тож для них шард один – усі символи.
+    """
+    param_sets = expand_grid(param_grid)
+    if getattr(resolve_strategy(strategy), "signal_based", True):
+        shards = _chunks(sorted(symbols), symbols_per_shard)
+    else:
+        shards = [sorted(symbols)]
+    tasks = []
+    for p_idx, p_chunk in enumerate(_chunks(param_sets, params_per_task)):
+        for s_idx, shard in enumerate(shards):
+            tasks.append({
+                "strategy": strategy,
+                "param_chunk": p_idx,
+                "shard": s_idx,
+                "params": p_chunk,
+                "symbols": shard,
+            })
+    return tasks
+
+
+class SweepQueue:
+    """
+    Довговічна локальна черга задач на SQLite.
+    Будь-яка кількість процесів (на одній або кількох машинах зі спільним сховищем)
+    може брати задачі через lease; якщо воркер падає, його lease протухає
+    і задача знову стає доступною.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 600.0, max_attempts: int = 3,
+                 wal: bool = False):
+        """
+        :param db_path: шлях до SQLite-файлу черги
+        :param lease_seconds: скільки секунд задача закріплена за воркером без heartbeat
+        :param max_attempts: після стількох невдалих спроб задача позначається як failed
+        :param wal: WAL-журнал – лише коли всі воркери на одній машині (WAL потребує спільної
+                    пам'яті й не працює на мережевих ФС); за замовчуванням – звичайний rollback-журнал
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.wal = wal
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=60.0, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 60000")
+        return conn
+
+    def _init_db(self):
+        with closing(self._connect()) as conn:
+            conn.execute(f"PRAGMA journal_mode = {'WAL' if self.wal else 'DELETE'}")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    strategy TEXT NOT NULL,
+                    param_chunk INTEGER NOT NULL,
+                    shard INTEGER NOT NULL,
+                    params TEXT NOT NULL,
+                    symbols TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, lease_expires)")
+
+    def enqueue(self, tasks: List[dict]) -> int:
+        """
+        Додає задачі у чергу. Повертає кількість доданих задач.
+        """
+        rows = [
+            (t["strategy"], t["param_chunk"], t["shard"],
+             json.dumps(t["params"]), json.dumps(t["symbols"]))
+            for t in tasks
+        ]
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "INSERT INTO tasks (strategy, param_chunk, shard, params, symbols) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def lease(self, worker_id: str) -> Optional[dict]:
+        """
+        Атомарно бере наступну доступну задачу: pending або leased із протухлим lease.
+        Повертає None, якщо брати нічого.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """
+                SELECT id, strategy, param_chunk, shard, params, symbols, attempts
+                FROM tasks
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY id
+                LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            task_id, strategy, p_chunk, shard, params, symbols, attempts = row
+            if attempts >= self.max_attempts:
+                # Задача вже падала (або її воркер помирав) max_attempts разів
+                conn.execute(
+                    "UPDATE tasks SET status = 'failed', worker = NULL, lease_expires = NULL, "
+                    "error = COALESCE(error, 'lease expired') WHERE id = ?",
+                    (task_id,),
+                )
+                conn.execute("COMMIT")
+                return self.lease(worker_id)
+
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, task_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return {
+            "id": task_id,
+            "strategy": strategy,
+            "param_chunk": p_chunk,
+            "shard": shard,
+            "params": json.loads(params),
+            "symbols": json.loads(symbols),
+        }
+
+    def heartbeat(self, task_id: int, worker_id: str) -> bool:
+        """
+        Продовжує lease задачі. Повертає False, якщо задачу вже перехопив інший воркер.
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, task_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, task_id: int, worker_id: str, result: List[dict]) -> bool:
+        """
+        Зберігає результати задачі. Результат від воркера, що втратив lease, ігнорується.
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, lease_expires = NULL, "
+                "finished_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result), time.time(), task_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, task_id: int, worker_id: str, error: str):
+        """
+        Повертає задачу в чергу (або позначає failed після max_attempts спроб).
+        """
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, lease_expires = NULL, error = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (self.max_attempts, error, task_id, worker_id),
+            )
+
+    def status_counts(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return {status: cnt for status, cnt in rows}
+
+    def is_finished(self) -> bool:
+        counts = self.status_counts()
+        return counts.get("pending", 0) == 0 and counts.get("leased", 0) == 0
+
+    def merge_results(self, aggregate: bool = True, allow_incomplete: bool = False) -> pd.DataFrame:
+        """
+        Зводить метрики всіх виконаних задач в одну таблицю.
+        :param aggregate: якщо True – об'єднує шарди символів у один рядок на
+                          (strategy, params): метрики compute_metrics перераховуються з
+                          метрик символів та інтервалів угод шардів (metric_components).
+                          Для результатів без цих складників решта метрик зважується
+                          кількістю символів шарду, а win_rate/exposure_time – None.
+                          Якщо False – рядок на кожен (strategy, params, shard).
+        elapsed_sec – час бектесту набору параметрів на шарді; при об'єднанні сумується.
+        :param allow_incomplete: якщо в черзі є задачі не в статусі done (pending, leased,
+                                 failed) – за замовчуванням RuntimeError, інакше попередження
+                                 і зведення лише виконаних задач.
+        """
+        unfinished = {k: v for k, v in self.status_counts().items() if k != "done"}
+        if unfinished:
+            msg = f"[Sweep] Queue {self.db_path} has unfinished tasks: {unfinished}"
+            if not allow_incomplete:
+                raise RuntimeError(msg)
+            warnings.warn(msg + "; merging done tasks only.")
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT strategy, shard, result FROM tasks WHERE status = 'done' ORDER BY id"
+            ).fetchall()
+
+        records = []
+        for strategy, shard, result in rows:
+            for item in json.loads(result):
+                rec = {"strategy": strategy, "shard": shard,
+                       "params": json.dumps(item["params"], sort_keys=True)}
+                rec.update(item["params"])
+                rec.update(item["metrics"])
+                rec["elapsed_sec"] = item.get("elapsed_sec")
+                rec["components"] = item.get("components")
+                records.append(rec)
+
+        df = pd.DataFrame(records)
+        if df.empty or not aggregate:
+            return df.drop(columns="components", errors="ignore")
+
+        metric_cols = [c for c in df.columns
+                       if c not in ("strategy", "shard", "params", "n_symbols", "elapsed_sec", "components")
+                       and c not in _param_columns(df)]
+        grouped = []
+        for (strategy, params), grp in df.groupby(["strategy", "params"], sort=False):
+            weights = grp["n_symbols"].astype(float)
+            rec = {"strategy": strategy, "params": params}
+            rec.update(json.loads(params))
+            if not getattr(resolve_strategy(strategy), "signal_based", True):
+                # Крос-секційний портфель не ділиться на шарди: метрики беремо як є
+                if len(grp) > 1:
+                    raise ValueError(f"[Sweep] {strategy} results span {len(grp)} shards; "
+                                     f"cross-sectional strategies must run on a single shard.")
+                for col in metric_cols:
+                    value = pd.to_numeric(grp[col], errors="coerce").iloc[0]
+                    rec[col] = None if pd.isna(value) else float(value)
+            else:
+                for col in metric_cols:
+                    vals = pd.to_numeric(grp[col], errors="coerce")
+                    mask = vals.notna()
+                    rec[col] = float(np.average(vals[mask], weights=weights[mask])) if mask.any() else None
+                if grp["components"].notna().all():
+                    rec.update({k: _to_builtin(v) for k, v in
+                                combine_metric_components(grp["components"].tolist()).items()})
+                else:
+                    # Без складників зважене середнє для цих метрик було б хибним
+                    for col in NON_ADDITIVE_METRICS:
+                        if col in rec:
+                            rec[col] = None
+            rec["n_symbols"] = int(weights.sum())
+            rec["n_shards"] = len(grp)
+            rec["elapsed_sec"] = pd.to_numeric(grp["elapsed_sec"], errors="coerce").sum(min_count=1)
+            grouped.append(rec)
+        return pd.DataFrame(grouped)
+
+
+def _param_columns(df: pd.DataFrame) -> set:
+    cols = set()
+    for params in df["params"].unique():
+        cols.update(json.loads(params).keys())
+    return cols
+
+
+def _to_builtin(value):
+    if value is None:
+        return None
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, (np.integer, int)):
+        return int(value)
+    return value
+
+
+class SweepWorker:
+    """
+    Воркер, що бере задачі з SweepQueue, проганяє бектести на своєму шарді символів
+    і записує метрики назад у чергу.
+    """
+
+    def __init__(self, queue: SweepQueue, data_path: str, worker_id: Optional[str] = None,
+                 idle_timeout: Optional[float] = None, poll_interval: float = 1.0):
+        """
+        :param queue: черга задач
+        :param data_path: шлях до parquet-файлу (схема DataLoader), доступний усім воркерам
+        :param worker_id: унікальний ідентифікатор (за замовчуванням host:pid:uuid)
+        :param idle_timeout: скільки секунд чекати, коли брати нічого, а задачі інших воркерів
+                             ще в роботі; None – до завершення черги (задачі впалих
+                             воркерів повертаються після lease_seconds і дістаються цьому)
+        :param poll_interval: пауза між спробами взяти задачу під час очікування
+        """
+        self.queue = queue
+        self.data_path = data_path
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+
+    def _load_shard(self, symbols: List[str]) -> pd.DataFrame:
+        # Читаємо з parquet лише символи поточного шарду
+        return pd.read_parquet(self.data_path, filters=[("symbol", "in", symbols)])
+
+    def run_task(self, task: dict) -> List[dict]:
+        """
+        Виконує одну задачу: для кожного набору параметрів – бектест на шарді.
+        """
+        strategy_cls = resolve_strategy(task["strategy"])
+        data = self._load_shard(task["symbols"])
+        n_symbols = int(data["symbol"].nunique())
+
+        results = []
+        for params in task["params"]:
+            started = time.perf_counter()
+            strat = strategy_cls(data, **params)
+            strat.run_backtest()
+            metrics = {k: _to_builtin(v) for k, v in compute_metrics(strat.pf).items()}
+            metrics["n_symbols"] = n_symbols
+            item = {"params": params, "metrics": metrics}
+            if strategy_cls.signal_based:
+                # Складники для точного об'єднання шардів у merge_results
+                item["components"] = metric_components(strat.pf)
+            item["elapsed_sec"] = time.perf_counter() - started
+            results.append(item)
+            # Продовжуємо lease між наборами параметрів
+            if not self.queue.heartbeat(task["id"], self.worker_id):
+                raise RuntimeError("lease lost")
+        return results
+
+    def run(self) -> int:
+        """
+        Головний цикл воркера. Повертає кількість виконаних задач.
+        """
+        done = 0
+        idle_since = None
+        while True:
+            task = self.queue.lease(self.worker_id)
+            if task is None:
+                if self.queue.is_finished():
+                    break
+                # Інші воркери ще працюють – чекаємо, можливо їхні lease протухнуть
+                idle_since = idle_since or time.time()
+                if self.idle_timeout is not None and time.time() - idle_since > self.idle_timeout:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            idle_since = None
+            print(f"[SweepWorker {self.worker_id}] Task {task['id']}: {task['strategy']} "
+                  f"chunk={task['param_chunk']} shard={task['shard']}")
+            try:
+                result = self.run_task(task)
+            except Exception as exc:
+                print(f"[SweepWorker {self.worker_id}] Task {task['id']} failed: {exc}")
+                self.queue.fail(task["id"], self.worker_id, repr(exc))
+                continue
+            if self.queue.complete(task["id"], self.worker_id, result):
+                done += 1
+        return done
+
+
+def _worker_entry(db_path: str, data_path: str, lease_seconds: float, max_attempts: int,
+                  idle_timeout: Optional[float], threads: int, wal: bool):
+    set_num_threads(threads)
+    queue = SweepQueue(db_path, lease_seconds=lease_seconds, max_attempts=max_attempts, wal=wal)
+    SweepWorker(queue, data_path, idle_timeout=idle_timeout).run()
+
+
+def run_local(db_path: str, data_path: str, n_workers: int = 4, lease_seconds: float = 600.0,
+              max_attempts: int = 3, idle_timeout: Optional[float] = None,
+              threads_per_worker: Optional[int] = None, wal: bool = False,
+              allow_incomplete: bool = False) -> pd.DataFrame:
+    """
+    Запускає n_workers процесів-воркерів на локальній машині (замість окремих вузлів),
+    чекає завершення і повертає зведену таблицю результатів.
+    threads_per_worker – потоки індикаторних ядер у кожному воркері
+    (за замовчуванням ядра машини порівну між воркерами, щоб не було переповнення).
+    wal=True – WAL-журнал черги (лише якщо до неї не під'єднуються воркери з інших машин).
+    Воркери за замовчуванням чекають до завершення черги; якщо після них лишилися
+    невиконані задачі – RuntimeError (allow_incomplete=True – попередження, див. merge_results).
+    """
+    threads = threads_per_worker or max((os.cpu_count() or 1) // max(n_workers, 1), 1)
+    # spawn замість fork: батьківський процес може вже мати пули потоків numba/TBB
+    ctx = mp.get_context("spawn")
+    procs = [
+        ctx.Process(target=_worker_entry,
+                   args=(db_path, data_path, lease_seconds, max_attempts, idle_timeout, threads, wal))
+        for _ in range(n_workers)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    queue = SweepQueue(db_path, lease_seconds=lease_seconds, max_attempts=max_attempts, wal=wal)
+    counts = queue.status_counts()
+    print(f"[Sweep] Finished: {counts}")
+    return queue.merge_results(allow_incomplete=allow_incomplete)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Sharded parameter sweep runner")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_worker = sub.add_parser("worker", help="run a worker pulling tasks from the queue")
+    p_worker.add_argument("--db", required=True)
+    p_worker.add_argument("--data", required=True)
+    p_worker.add_argument("--lease-seconds", type=float, default=600.0)
+    p_worker.add_argument("--max-attempts", type=int, default=3)
+    p_worker.add_argument("--idle-timeout", type=float, default=None,
+                          help="max seconds to wait for other workers' tasks (default: until the queue is finished)")
+    p_worker.add_argument("--threads", type=int, default=None, help="indicator threads (default: all cores)")
+    p_worker.add_argument("--wal", action="store_true", help="WAL journal (single-host queues only)")
+
+    p_merge = sub.add_parser("merge", help="merge finished task metrics into one CSV")
+    p_merge.add_argument("--db", required=True)
+    p_merge.add_argument("--out", default="./results/sweep_metrics.csv")
+    p_merge.add_argument("--per-shard", action="store_true")
+    p_merge.add_argument("--allow-incomplete", action="store_true",
+                         help="merge done tasks even if some are pending, leased or failed")
+    p_merge.add_argument("--store", default=None, help="also append merged rows to a ResultsStore db")
+    p_merge.add_argument("--data", default=None, help="parquet the workers ran on (fingerprinted in --store)")
+
+    args = parser.parse_args(argv)
+    if args.command == "worker":
+        set_num_threads(args.threads)
+        queue = SweepQueue(args.db, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts,
+                           wal=args.wal)
+        SweepWorker(queue, args.data, idle_timeout=args.idle_timeout).run()
+    elif args.command == "merge":
+        df = SweepQueue(args.db).merge_results(aggregate=not args.per_shard,
+                                               allow_incomplete=args.allow_incomplete)
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        df.to_csv(args.out, index=False)
+        print(f"[Sweep] {len(df)} rows saved to {args.out}")
+        if args.store and not args.per_shard:
+            store = ResultsStore(args.store)
+            fingerprint = file_fingerprint(args.data) if args.data else None
+            run_id = store.start_run(data_fingerprint=fingerprint, description=f"sweep {args.db}")
+            store.record_frame(run_id, df)
+            print(f"[Sweep] Run {run_id} appended to {args.store}")
+
+
+if __name__ == "__main__":
+    main()
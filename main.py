@@ -16,7 +16,8 @@ def main():
         data_path="./data/btc_1m_feb25.parquet",
         start_date="2025-02-01",
         end_date="2025-02-28",
-        symbols=None  # якщо None, підхопить топ-100 ліквідних пар
+        symbols=None,  # якщо None, підхопить топ-100 ліквідних пар
+        align_grid=True,  # повна хвилинна сітка, внутрішні пропуски заповнюються ffill
     )
     data = loader.load_data()
 
@@ -1,6 +1,6 @@
 import pandas as pd
-import ta
 from strategies.base import StrategyBase
+from core import indicators
 
 class AtrTrailingBreakout(StrategyBase):
     """
@@ -16,20 +16,17 @@ class AtrTrailingBreakout(StrategyBase):
         self.signals = None
 
     def generate_signals(self) -> pd.DataFrame:
+        if self.per_symbol:
+            return self._per_symbol_signals()
         df_wide = self.data
         close = df_wide["close"]
         high = df_wide["high"]
         low = df_wide["low"]
 
-        def atr_apply(h, l, c):
-            atr_ind = ta.volatility.AverageTrueRange(h, l, c, window=self.atr_period)
-            return atr_ind.average_true_range()
+        # ATR для всіх символів одним ядром, паралельно по блоках колонок
+        atr_df = indicators.atr(high, low, close, window=self.atr_period)
 
-        # Обчислюємо ATR для кожного символу
-        atr_list = [atr_apply(high[col], low[col], close[col]).rename(col) for col in close.columns]
-        atr_df = pd.concat(atr_list, axis=1)
-
-        rolling_high = close.rolling(self.lookback).max()
+        rolling_high = indicators.rolling_max(close, self.lookback)
         buy_signal = (close > rolling_high).astype(int)
         exit_signal = (close < (rolling_high - self.atr_mult * atr_df)).astype(int) * -1
 
@@ -43,4 +40,4 @@ class AtrTrailingBreakout(StrategyBase):
         entries = self.signals == 1
         exits = self.signals == -1
         return self._run_portfolio(close, entries, exits,
-                                   fees=0.001, slippage=0.0005, direction='longonly')
+                                   fees=self.fees, slippage=self.slippage, direction=self.direction)
@@ -1,19 +1,36 @@
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
 import vectorbt as vbt
 from core.metrics import compute_metrics
+from core.rolling_metrics import RollingMetrics, replay_orders
+from core.results_store import strategy_params
 
 class StrategyBase(ABC):
     """
     Абстрактний базовий клас для торгової стратегії.
     Він містить спільні методи для перетворення даних та створення портфеля.
     """
+    # Параметри симуляції портфеля (стратегії можуть перевизначати)
+    fees: float = 0.001
+    slippage: float = 0.0005
+    direction: str = 'longonly'
+    # True – generate_signals дає сигнали входу/виходу по кожному символу окремо, а портфель
+    # будується з них через _run_portfolio (vbt.from_signals); на цьому контракті працює
+    # OutOfCoreBacktester. Стратегії зі спільним кешем/ребалансуванням ставлять False.
+    signal_based: bool = True
+
     def __init__(self, price_data: pd.DataFrame):
         """
         :param price_data: DataFrame із колонками [time, symbol, open, high, low, close, volume]
         """
         self.price_data = price_data
         self.raw_data = price_data
+        # Event-time бари (volume/dollar/tick з build_bars) у різних символів мають різні
+        # часові мітки: у спільній wide-таблиці вони "рвані", і ковзні вікна ловлять NaN.
+        # Тому для кількох символів сигнали рахуються окремо на барах кожного символу.
+        self.bar_type = price_data.attrs.get("bar_type", "time")
+        self.per_symbol = self.bar_type != "time" and price_data["symbol"].nunique() > 1
         self.data = self._reshape_to_wide(price_data)
         self.pf = None
 
@@ -39,10 +56,58 @@ class StrategyBase(ABC):
             raise ValueError("Спочатку запустіть run_backtest.")
         return compute_metrics(self.pf)
 
+    def rolling_metrics(self, report_every: int = 60, window: int = 1440,
+                        block_bars: int = 10_080) -> RollingMetrics:
+        """
+        Ковзні метрики (Sharpe, просідання, експозиція, turnover, NAV) по символах з уже
+        побудованого self.pf – без повторної симуляції, тож графіки і get_metrics рахуються
+        з одного й того ж портфеля. Вартість і позиції відновлюються з ордерів pf блоками
+        по block_bars барів (replay_orders), повні матриці pf.value()/pf.assets() не будуються.
+        """
+        if self.pf is None:
+            self.run_backtest()
+        close = self.pf.close
+        close = close.to_numpy() if hasattr(close, "to_numpy") else np.asarray(close)
+        if close.ndim == 1:
+            close = close[:, None]
+        index = self.pf.wrapper.index
+
+        rolling = RollingMetrics(close.shape[1], window=window, every=report_every)
+        init_cash = np.broadcast_to(np.asarray(self.pf.init_cash, dtype=np.float64), close.shape[1])
+        rolling.init_value(init_cash)
+        for start, stop, value, in_pos, traded in replay_orders(close, self.pf.orders.values, init_cash,
+                                                                block_bars=block_bars):
+            rolling.update(index[start:stop], value, in_pos, traded)
+        return rolling
+
+    def _per_symbol_signals(self) -> pd.DataFrame:
+        """
+        Сигнали на event-time барах: для кожного символу створюється екземпляр тієї ж
+        стратегії з тими ж параметрами лише на його барах (як при запуску на одному символі),
+        а результат розкладається на спільну wide-сітку (0 там, де в символу немає бару).
+        """
+        params = strategy_params(self)
+        close = self.data["close"]
+        parts = [
+            type(self)(group, **params).generate_signals()
+            for _, group in self.price_data.groupby("symbol", sort=False)
+        ]
+        signals = pd.concat(parts, axis=1).reindex(index=close.index, columns=close.columns)
+        self.signals = signals.fillna(0).astype(int)
+        return self.signals
+
     def _reshape_to_wide(self, df_long: pd.DataFrame) -> pd.DataFrame:
         """
         Перетворює дані з long-формату у wide (pivot по time та symbol).
+        Дані після валідації DataLoader не мають дублікатів, тож достатньо простого pivot
+        без агрегації; pivot_table лишається для сирих даних із дублікатами.
         """
+        if not df_long.duplicated(["time", "symbol"]).any():
+            return df_long.pivot(
+                index="time",
+                columns="symbol",
+                values=["open", "high", "low", "close", "volume"]
+            )
         return df_long.pivot_table(
             index="time",
             columns="symbol",
@@ -0,0 +1,235 @@
+from abc import abstractmethod
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+from numba import njit, prange
+
+from strategies.base import StrategyBase
+from core.rolling_metrics import RollingMetrics
+
+
+def top_k_ranks(factor: np.ndarray, ks: Sequence[int]) -> np.ndarray:
+    """
+    Позиції символів у частково відсортованому (за спаданням factor) рядку.
+    Один np.argpartition по всій матриці (час × символи) з kth = ks - 1 гарантує,
+    що для кожного k із ks множина {rank < k} – це рівно top-k бару.
+    NaN у factor опиняються в кінці рядка.
+    """
+    factor = np.asarray(factor, dtype=np.float64)
+    n_cols = factor.shape[1]
+    kth = sorted({min(max(int(k), 1), n_cols) - 1 for k in ks})
+    key = np.where(np.isnan(factor), np.inf, -factor)
+    order = np.argpartition(key, kth, axis=1)
+    ranks = np.empty(factor.shape, dtype=np.int32)
+    np.put_along_axis(ranks, order, np.arange(n_cols, dtype=np.int32)[None, :].repeat(len(factor), axis=0), axis=1)
+    return ranks
+
+
+@njit(parallel=True, cache=True)
+def _simulate_top_k_nb(close, ranks, valid, reb_idx, ks, init_cash, fees, slippage):
+    """
+    Симуляція портфелів top-k зі спільним кешем для кожного k (паралельно по k).
+    На барах reb_idx портфель ребалансується до рівних ваг серед обраних символів
+    (спершу продажі, потім покупки за зростанням обсягу ордера – як call_seq="auto" у vbt),
+    тож результат збігається з run_backtest для того ж k.
+    Повертає вартість портфеля (бари × k) і обсяг угод у валюті котирування (бари × k).
+    """
+    n_bars, n_cols = close.shape
+    n_k = ks.shape[0]
+    value_out = np.empty((n_bars, n_k))
+    traded_out = np.zeros((n_bars, n_k))
+    for m in prange(n_k):
+        k = ks[m]
+        cash = init_cash
+        pos = np.zeros(n_cols)
+        last = np.full(n_cols, np.nan)
+        target = np.zeros(n_cols)
+        buy_val = np.empty(n_cols)
+        buy_col = np.empty(n_cols, dtype=np.int64)
+        r = 0
+        for i in range(n_bars):
+            for j in range(n_cols):
+                if not np.isnan(close[i, j]):
+                    last[j] = close[i, j]
+
+            if r < reb_idx.shape[0] and reb_idx[r] == i:
+                value = cash
+                n_sel = 0
+                for j in range(n_cols):
+                    if pos[j] != 0.0:
+                        value += pos[j] * last[j]
+                    if valid[r, j] and ranks[r, j] < k and not np.isnan(close[i, j]):
+                        n_sel += 1
+                weight = 1.0 / n_sel if n_sel > 0 else 0.0
+                # Спершу продажі (звільняють кеш), покупки збираємо окремо
+                n_buy = 0
+                for j in range(n_cols):
+                    if np.isnan(close[i, j]):
+                        continue
+                    target_value = weight * value if valid[r, j] and ranks[r, j] < k else 0.0
+                    target[j] = target_value / close[i, j]
+                    d = target_value - pos[j] * close[i, j]
+                    if d < 0.0:
+                        size = pos[j] - target[j]
+                        price = close[i, j] * (1.0 - slippage)
+                        cash += size * price * (1.0 - fees)
+                        pos[j] = target[j]
+                        traded_out[i, m] += size * price
+                    elif d > 0.0:
+                        # Стабільне вставлення за зростанням обсягу (рівні – в порядку колонок, як у vbt)
+                        b = n_buy
+                        while b > 0 and buy_val[b - 1] > d:
+                            buy_val[b] = buy_val[b - 1]
+                            buy_col[b] = buy_col[b - 1]
+                            b -= 1
+                        buy_val[b] = d
+                        buy_col[b] = j
+                        n_buy += 1
+                for b in range(n_buy):
+                    j = buy_col[b]
+                    size = target[j] - pos[j]
+                    price = close[i, j] * (1.0 + slippage)
+                    if size * price * (1.0 + fees) > cash:
+                        size = cash / (price * (1.0 + fees))
+                    if size > 0.0:
+                        cash -= size * price * (1.0 + fees)
+                        pos[j] += size
+                        traded_out[i, m] += size * price
+                r += 1
+
+            value = cash
+            for j in range(n_cols):
+                if pos[j] != 0.0:
+                    value += pos[j] * last[j]
+            value_out[i, m] = value
+    return value_out, traded_out
+
+
+class CrossSectionalStrategyBase(StrategyBase):
+    """
+    Базовий клас крос-секційної стратегії: на кожному барі ребалансування символи
+    ранжуються за фактором (compute_factor), і портфель зі спільним кешем тримає
+    top_k найкращих з рівними вагами. Ранжування – один argpartition по матриці
+    час × символи, симуляція – vbt.Portfolio.from_orders з cash_sharing, тож
+    циклів по барах у Python немає.
+    """
+    init_cash: float = 100.0
+    signal_based: bool = False
+
+    def __init__(self, price_data: pd.DataFrame, top_k: int = 10, rebalance_every: int = 60):
+        """
+        :param top_k: скільки символів тримати
+        :param rebalance_every: крок ребалансування у барах
+        """
+        super().__init__(price_data)
+        if self.per_symbol:
+            raise ValueError(
+                f"[CrossSectionalStrategyBase] Cross-sectional ranking needs a common time grid; "
+                f"'{self.bar_type}' bars of several symbols do not share timestamps. Use time bars."
+            )
+        self.top_k = top_k
+        self.rebalance_every = rebalance_every
+        self.factor_values = None
+        self.weights = None
+        self.signals = None
+
+    @abstractmethod
+    def compute_factor(self) -> pd.DataFrame:
+        """
+        Має повернути фактор (час × символи); більше значення – кращий ранг, NaN – символ пропускається.
+        """
+        pass
+
+    def _rebalance_rows(self) -> np.ndarray:
+        return np.arange(0, len(self.data.index), max(int(self.rebalance_every), 1))
+
+    def _rank_inputs(self, ks: Sequence[int]):
+        if self.factor_values is None:
+            self.factor_values = self.compute_factor()
+        close = self.data["close"].to_numpy(dtype=np.float64)
+        rows = self._rebalance_rows()
+        factor = self.factor_values.reindex(columns=self.data["close"].columns).to_numpy(dtype=np.float64)[rows]
+        valid = ~np.isnan(factor) & ~np.isnan(close[rows])
+        return close, rows, top_k_ranks(factor, ks), valid
+
+    def generate_signals(self) -> pd.DataFrame:
+        """
+        Цільові ваги на барах ребалансування (self.weights, NaN між ними) і сигнали
+        у форматі решти стратегій: 1 – символ входить у top-k, -1 – виходить.
+        """
+        close_df = self.data["close"]
+        close, rows, ranks, valid = self._rank_inputs([self.top_k])
+        held = valid & (ranks < self.top_k)
+        n_held = held.sum(axis=1, keepdims=True)
+        weights = np.full(close.shape, np.nan)
+        weights[rows] = np.where(held, 1.0 / np.maximum(n_held, 1), 0.0)
+        # Ордери з NaN-ціною vbt не приймає – такі символи на цьому барі не торгуються
+        weights[np.isnan(close)] = np.nan
+        self.weights = pd.DataFrame(weights, index=close_df.index, columns=close_df.columns)
+
+        in_top = np.full(close.shape, np.nan)
+        in_top[rows] = held
+        in_top = pd.DataFrame(in_top, index=close_df.index, columns=close_df.columns).ffill().fillna(0.0)
+        self.signals = in_top.diff().fillna(in_top).astype(int)
+        return self.signals
+
+    def run_backtest(self):
+        if self.weights is None:
+            self.generate_signals()
+        self.pf = vbt.Portfolio.from_orders(
+            self.data["close"],
+            size=self.weights,
+            size_type="targetpercent",
+            group_by=True,
+            cash_sharing=True,
+            call_seq="auto",
+            init_cash=self.init_cash,
+            fees=self.fees,
+            slippage=self.slippage,
+        )
+        return self.pf
+
+    def run_top_k(self, ks: Sequence[int], freq: str = "1min", year_freq: str = "365 days") -> pd.DataFrame:
+        """
+        Бектест одразу для багатьох k: одне ранжування і паралельна (numba) симуляція
+        портфеля зі спільним кешем для кожного k. Повертає метрики по k.
+        """
+        ks = np.asarray(sorted(set(int(k) for k in ks)), dtype=np.int64)
+        close, rows, ranks, valid = self._rank_inputs(ks)
+        value, traded = _simulate_top_k_nb(close, ranks, valid, rows.astype(np.int64), ks,
+                                           float(self.init_cash), float(self.fees), float(self.slippage))
+        prev = np.vstack([np.full((1, len(ks)), float(self.init_cash)), value[:-1]])
+        returns = value / prev - 1.0
+        std = returns.std(axis=0, ddof=1)
+        ann = pd.Timedelta(year_freq) / pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(std == 0.0, np.inf, returns.mean(axis=0) / std * np.sqrt(ann))
+        peak = np.maximum.accumulate(value, axis=0)
+        return pd.DataFrame({
+            "total_return": value[-1] / self.init_cash - 1.0,
+            "sharpe_ratio": sharpe,
+            "max_drawdown": (value / peak - 1.0).min(axis=0),
+            "turnover": traded.sum(axis=0) / value.mean(axis=0),
+        }, index=pd.Index(ks, name="top_k"))
+
+    def rolling_metrics(self, report_every: int = 60, window: int = 1440,
+                        block_bars: int = 10_080) -> RollingMetrics:
+        """
+        Ковзні метрики портфеля (одна колонка – уся група зі спільним кешем) для Backtester.
+        Ряди групи – вектори довжиною n_bars; в акумулятор вони подаються блоками по block_bars.
+        """
+        if self.pf is None:
+            self.run_backtest()
+        value = self.pf.value().to_numpy(dtype=np.float64)
+        in_pos = self.pf.position_mask(group_by=True).to_numpy()
+        orders = self.pf.orders.values
+        traded = np.bincount(orders["idx"], weights=orders["size"] * orders["price"], minlength=len(value))
+        rolling = RollingMetrics(1, window=window, every=report_every)
+        rolling.init_value(self.init_cash)
+        for start in range(0, len(value), block_bars):
+            stop = min(start + block_bars, len(value))
+            rolling.update(self.data.index[start:stop], value[start:stop, None],
+                           in_pos[start:stop, None], traded[start:stop, None])
+        return rolling
@@ -0,0 +1,32 @@
+import pandas as pd
+from strategies.cross_sectional import CrossSectionalStrategyBase
+from core import indicators
+
+class CrossSectionalFactorStrategy(CrossSectionalStrategyBase):
+    """
+    Крос-секційна ротація: тримаємо top_k символів за одним із факторів:
+     - momentum: дохідність за lookback барів;
+     - volume_spike: обсяг відносно середнього за lookback;
+     - vwap_deviation: наскільки ціна нижче ковзного VWAP (купуємо найбільш "дешеві").
+    """
+    FACTORS = ("momentum", "volume_spike", "vwap_deviation")
+
+    def __init__(self, price_data: pd.DataFrame, factor: str = "momentum", lookback: int = 60,
+                 top_k: int = 10, rebalance_every: int = 60):
+        if factor not in self.FACTORS:
+            raise ValueError(f"[CrossSectionalFactorStrategy] Unknown factor: {factor}. Use one of {self.FACTORS}")
+        super().__init__(price_data, top_k=top_k, rebalance_every=rebalance_every)
+        self.factor = factor
+        self.lookback = lookback
+
+    def compute_factor(self) -> pd.DataFrame:
+        close = self.data["close"]
+        volume = self.data["volume"]
+
+        if self.factor == "momentum":
+            return close / close.shift(self.lookback) - 1.0
+        if self.factor == "volume_spike":
+            return volume / indicators.rolling_mean(volume, self.lookback)
+
+        vwap = indicators.rolling_sum(close * volume, self.lookback) / indicators.rolling_sum(volume, self.lookback)
+        return -(close - vwap) / vwap
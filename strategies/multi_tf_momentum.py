@@ -13,6 +13,8 @@ class MultiTimeframeMomentum(StrategyBase):
         self.signals = None
 
     def generate_signals(self) -> pd.DataFrame:
+        if self.per_symbol:
+            return self._per_symbol_signals()
         df_wide = self.data
         close_1m = df_wide["close"]
 
@@ -35,4 +37,4 @@ class MultiTimeframeMomentum(StrategyBase):
         entries = self.signals == 1
         exits = self.signals == -1
         return self._run_portfolio(close, entries, exits,
-                                   fees=0.001, slippage=0.0005, direction='longonly')
+                                   fees=self.fees, slippage=self.slippage, direction=self.direction)
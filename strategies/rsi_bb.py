@@ -1,6 +1,6 @@
 import pandas as pd
-import ta
 from strategies.base import StrategyBase
+from core import indicators
 
 class RsiBbStrategy(StrategyBase):
     """
@@ -8,6 +8,8 @@ class RsiBbStrategy(StrategyBase):
     Якщо RSI < 30 та ціна пробиває нижню межу BB знизу вгору – вхід,
     якщо RSI > 70 – вихід.
     """
+    fees = 0.00075
+
     def __init__(self, price_data: pd.DataFrame, rsi_window: int = 14,
                  bb_window: int = 20, bb_std: float = 2.0):
         super().__init__(price_data)
@@ -17,35 +19,21 @@ class RsiBbStrategy(StrategyBase):
         self.signals = None
 
     def generate_signals(self) -> pd.DataFrame:
+        if self.per_symbol:
+            return self._per_symbol_signals()
         df_wide = self.data
         close = df_wide["close"]
 
-        rsi = close.apply(lambda col: ta.momentum.RSIIndicator(col, window=self.rsi_window).rsi())
-
-        def bb_apply(col):
-            bb = ta.volatility.BollingerBands(col, window=self.bb_window, window_dev=self.bb_std)
-            return pd.DataFrame({
-                "lower": bb.bollinger_lband(),
-                "upper": bb.bollinger_hband()
-            })
-
-        bb_dict = {c: bb_apply(close[c]) for c in close.columns}
-
-        signals_list = []
-        for c in close.columns:
-            c_rsi = rsi[c]
-            c_lower = bb_dict[c]["lower"]
-            c_close = close[c]
+        # RSI і смуги Боллінджера для всіх символів – паралельні ядра по блоках колонок
+        rsi = indicators.rsi(close, window=self.rsi_window)
+        lower, _ = indicators.bollinger_bands(close, window=self.bb_window, window_dev=self.bb_std)
 
-            buy_signal = ((c_rsi < 30) &
-                          (c_close > c_lower) &
-                          (c_close.shift(1) <= c_lower.shift(1))).astype(int)
-            sell_signal = (c_rsi > 70).astype(int) * -1
-            c_signals = buy_signal + sell_signal
-            c_signals.name = c
-            signals_list.append(c_signals)
+        buy_signal = ((rsi < 30) &
+                      (close > lower) &
+                      (close.shift(1) <= lower.shift(1))).astype(int)
+        sell_signal = (rsi > 70).astype(int) * -1
 
-        signals_df = pd.concat(signals_list, axis=1)
+        signals_df = buy_signal + sell_signal
         self.signals = signals_df
         return signals_df
 
@@ -56,4 +44,4 @@ class RsiBbStrategy(StrategyBase):
         entries = self.signals == 1
         exits = self.signals == -1
         return self._run_portfolio(close, entries, exits,
-                                   fees=0.00075, slippage=0.0005, direction='longonly')
+                                   fees=self.fees, slippage=self.slippage, direction=self.direction)
@@ -1,5 +1,6 @@
 import pandas as pd
 from strategies.base import StrategyBase
+from core import indicators
 
 class SmaCrossStrategy(StrategyBase):
     """
@@ -15,17 +16,19 @@ class SmaCrossStrategy(StrategyBase):
         self.signals = None
 
     def generate_signals(self) -> pd.DataFrame:
+        if self.per_symbol:
+            return self._per_symbol_signals()
         df_wide = self.data
         close = df_wide["close"]
 
-        sma_short = close.rolling(self.short_window).mean()
-        sma_long = close.rolling(self.long_window).mean()
+        sma_short = indicators.rolling_mean(close, self.short_window)
+        sma_long = indicators.rolling_mean(close, self.long_window)
 
         crossover = (sma_short > sma_long).astype(int) - (sma_short < sma_long).astype(int)
 
         # Фільтр волатильності
         daily_ret = close.pct_change()
-        vol = daily_ret.rolling(1440).std()
+        vol = indicators.rolling_std(daily_ret, 1440)
         low_vol_mask = vol < self.vol_threshold
         crossover = crossover.where(~low_vol_mask, other=0)
 
@@ -39,4 +42,4 @@ class SmaCrossStrategy(StrategyBase):
         entries = self.signals == 1
         exits = self.signals == -1
         return self._run_portfolio(close, entries, exits,
-                                   fees=0.001, slippage=0.0005, direction='longonly')
+                                   fees=self.fees, slippage=self.slippage, direction=self.direction)
@@ -1,5 +1,6 @@
 import pandas as pd
 from strategies.base import StrategyBase
+from core import indicators
 
 class VolumeSpikeBreakout(StrategyBase):
     """
@@ -12,16 +13,18 @@ class VolumeSpikeBreakout(StrategyBase):
         self.signals = None
 
     def generate_signals(self) -> pd.DataFrame:
+        if self.per_symbol:
+            return self._per_symbol_signals()
         df_wide = self.data
         close = df_wide["close"]
         volume = df_wide["volume"]
 
-        vol_mean = volume.rolling(self.lookback).mean()
-        vol_std = volume.rolling(self.lookback).std()
+        vol_mean = indicators.rolling_mean(volume, self.lookback)
+        vol_std = indicators.rolling_std(volume, self.lookback)
         spike = volume > (vol_mean + self.volume_mult * vol_std)
 
-        rolling_high = close.rolling(self.lookback).max()
-        rolling_low = close.rolling(self.lookback).min()
+        rolling_high = indicators.rolling_max(close, self.lookback)
+        rolling_low = indicators.rolling_min(close, self.lookback)
 
         buy_signal = (spike & (close > rolling_high)).astype(int)
         sell_signal = (close < rolling_low).astype(int) * -1
@@ -36,4 +39,4 @@ class VolumeSpikeBreakout(StrategyBase):
         entries = self.signals == 1
         exits = self.signals == -1
         return self._run_portfolio(close, entries, exits,
-                                   fees=0.001, slippage=0.0005, direction='longonly')
+                                   fees=self.fees, slippage=self.slippage, direction=self.direction)
@@ -1,5 +1,6 @@
 import pandas as pd
 from strategies.base import StrategyBase
+from core import indicators
 
 class VwapReversionStrategy(StrategyBase):
     """
@@ -13,13 +14,15 @@ class VwapReversionStrategy(StrategyBase):
         self.signals = None
 
     def generate_signals(self) -> pd.DataFrame:
+        if self.per_symbol:
+            return self._per_symbol_signals()
         df_wide = self.data  # вже перетворено в wide-формат
         close = df_wide["close"]
         volume = df_wide["volume"]
 
         price_times_vol = close * volume
-        rolling_pv = price_times_vol.rolling(1440).sum()
-        rolling_vol = volume.rolling(1440).sum()
+        rolling_pv = indicators.rolling_sum(price_times_vol, 1440)
+        rolling_vol = indicators.rolling_sum(volume, 1440)
         vwap = rolling_pv / rolling_vol
 
         deviation = (close - vwap) / vwap
@@ -36,4 +39,4 @@ class VwapReversionStrategy(StrategyBase):
         entries = self.signals == 1
         exits = self.signals == -1
         return self._run_portfolio(close, entries, exits,
-                                   fees=0.001, slippage=0.0005, direction='longonly')
+                                   fees=self.fees, slippage=self.slippage, direction=self.direction)
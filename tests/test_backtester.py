@@ -4,6 +4,7 @@ import numpy as np
 import os
 
 from strategies.sma_cross import SmaCrossStrategy
+from strategies.cross_sectional_factor import CrossSectionalFactorStrategy
 from core.backtester import Backtester
 
 @pytest.fixture
@@ -34,3 +35,56 @@ def test_backtester_run_all(sample_data, tmp_path):
     heat_img = os.path.join(tmp_path, "screenshots", "SmaCrossStrategy_heatmap.png")
     assert os.path.exists(eq_img)
     assert os.path.exists(heat_img)
+
+def test_backtester_appends_runs_to_store(sample_data, tmp_path):
+    strat = SmaCrossStrategy(sample_data)
+    bt = Backtester([strat], results_path=str(tmp_path))
+    bt.run_all()
+    bt.run_all()
+
+    assert len(bt.store.runs()) == 2
+    latest = bt.store.results()
+    assert latest["strategy"].tolist() == ["SmaCrossStrategy"]
+    assert '"short_window": 10' in latest["params"].iloc[0]
+
+def test_backtester_cross_sectional(tmp_path):
+    dates = pd.date_range("2025-02-01", periods=120, freq="1min")
+    symbols = ["A/BTC", "B/BTC", "C/BTC"]
+    idx = pd.MultiIndex.from_product([dates, symbols], names=["time", "symbol"])
+    df = pd.DataFrame({
+        "open": np.random.rand(360),
+        "high": np.random.rand(360),
+        "low": np.random.rand(360),
+        "close": np.random.rand(360) + 0.5,
+        "volume": np.random.rand(360)
+    }, index=idx).reset_index()
+    strat = CrossSectionalFactorStrategy(df, lookback=10, top_k=2, rebalance_every=10)
+    bt = Backtester([strat], results_path=str(tmp_path), report_every=10)
+    bt.run_all()
+
+    rolling = pd.read_csv(os.path.join(tmp_path, "CrossSectionalFactorStrategy_rolling.csv"))
+    assert len(rolling) == 12
+    assert len(bt.store.symbol_results(bt.store.results()["result_id"].iloc[0])) == 3
+
+def test_rolling_metrics_come_from_strategy_portfolio():
+    rng = np.random.default_rng(3)
+    dates = pd.date_range("2025-02-01", periods=300, freq="1min")
+    symbols = ["A/BTC", "B/BTC"]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, (300, 2)), axis=0))
+    df = pd.DataFrame({
+        "time": np.repeat(dates, 2),
+        "symbol": symbols * 300,
+        "open": close.ravel(), "high": close.ravel(), "low": close.ravel(), "close": close.ravel(),
+        "volume": rng.random(600),
+    })
+    strat = SmaCrossStrategy(df, short_window=3, long_window=10)
+    pf = strat.run_backtest()
+
+    # Розбиття на блоки не змінює результат; NAV і експозиція, відновлені з ордерів pf,
+    # збігаються з його повними матрицями value/assets
+    rolling = strat.rolling_metrics(report_every=10).to_frame()
+    pd.testing.assert_frame_equal(rolling, strat.rolling_metrics(report_every=10, block_bars=37).to_frame())
+    assert len(pf.orders.values) > 0
+    np.testing.assert_allclose(rolling["nav"], pf.value().mean(axis=1).loc[rolling.index], rtol=1e-12)
+    assert rolling["exposure"].iloc[-1] == pytest.approx((pf.assets().iloc[-1] != 0).mean())
+    assert rolling["turnover"].iloc[-1] > 0
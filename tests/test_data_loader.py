@@ -2,8 +2,16 @@ import pytest
 import os
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
 from unittest.mock import patch, MagicMock
 from core.data_loader.BinanceDataLoader import DataLoader
+from core.data_loader.validation import inspect_bars, align_to_grid
+from core.data_loader.bars import BAR_SCHEMA, build_bars, load_bars
+from core.data_loader.trades import TradeLoader, iter_trade_batches
+from core.data_loader.market_cache import MarketMetadataCache
+from core.data_loader.synthetic import SyntheticMarket, SYNTHETIC_META_KEY
+from strategies.sma_cross import SmaCrossStrategy
+from strategies.cross_sectional_factor import CrossSectionalFactorStrategy
 
 @pytest.fixture
 def fake_parquet(tmp_path) -> str:
@@ -27,6 +35,14 @@ def test_load_data_from_local_parquet(fake_parquet, mocker):
     mock_fetch.assert_not_called()
     assert len(df) == 5
 
+def test_load_data_aligns_grid_to_date_range(fake_parquet):
+    loader = DataLoader(data_path=fake_parquet, start_date="2025-02-01", end_date="2025-02-28",
+                        align_grid=True, freq="1D")
+    df = loader.load_data()
+    assert df["time"].min() == pd.Timestamp("2025-02-01") and df["time"].max() == pd.Timestamp("2025-02-28")
+    # Після останнього справжнього бару (2025-02-05) ціни не вигадуються
+    assert df.loc[df["time"] > "2025-02-05", "close"].isna().all()
+
 def test_load_data_when_no_local_file(mocker, tmp_path):
     non_existent_file = str(tmp_path / "nonexistent.parquet")
     loader = DataLoader(data_path=non_existent_file, start_date="2025-02-01", end_date="2025-02-28")
@@ -59,8 +75,319 @@ def test_data_validation(mocker, tmp_path):
         loader.load_data()
     assert "Missing columns" in str(excinfo.value)
 
-def test_get_top_liquid_symbols(fake_parquet):
-    loader = DataLoader(data_path=fake_parquet, start_date="2025-02-01", end_date="2025-02-28")
+def test_get_top_liquid_symbols(fake_parquet, tmp_path):
+    loader = DataLoader(data_path=fake_parquet, start_date="2025-02-01", end_date="2025-02-28",
+                        meta_path=str(tmp_path / "meta"))
+    loader.binance = loader.market_cache.exchange = FakeExchange()
+    loader.load_data()
+    # OLD/BTC делістована до start_date, NEW/BTC ще не залістована
+    assert loader.get_top_liquid_symbols(limit=1) == ["MID/BTC"]
+
+def test_inspect_bars_reports_duplicates_and_gaps():
+    times = pd.to_datetime([
+        "2025-02-01 00:00", "2025-02-01 00:02", "2025-02-01 00:01",  # не по порядку
+        "2025-02-01 00:02",                                          # дублікат
+        "2025-02-01 00:06",                                          # пропуск 3 бари
+    ])
+    df = pd.DataFrame({
+        "time": times,
+        "symbol": ["BTC/TEST"] * 5,
+        "open": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "high": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "low": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "close": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "volume": [1.0, 1.0, 1.0, 1.0, 1.0],
+    })
+    clean, report = inspect_bars(df)
+    row = report.loc["BTC/TEST"]
+    assert row["duplicates"] == 1
+    assert row["out_of_order"] == 1
+    assert row["gaps"] == 1
+    assert row["missing_bars"] == 3
+    assert len(clean) == 4
+    assert clean["time"].is_monotonic_increasing
+    # з дублікатів лишається останній
+    assert clean.loc[clean["time"] == times[1], "close"].item() == 4.0
+
+def test_align_to_grid_fill_policy():
+    df = pd.DataFrame({
+        "time": pd.to_datetime(["2025-02-01 00:00", "2025-02-01 00:03", "2025-02-01 00:01",
+                                "2025-02-01 00:03", "2025-02-01 00:00"]),
+        "symbol": ["A/BTC", "A/BTC", "B/BTC", "B/BTC", "C/BTC"],
+        "open": [1.0, 4.0, 10.0, 11.0, 7.0],
+        "high": [1.0, 4.0, 10.0, 11.0, 7.0],
+        "low": [1.0, 4.0, 10.0, 11.0, 7.0],
+        "close": [1.0, 4.0, 10.0, 11.0, 7.0],
+        "volume": [5.0, 5.0, 5.0, 5.0, 5.0],
+    })
+    out, filled = align_to_grid(df, fill_policy="ffill", fill_limit=1, end="2025-02-01 00:05")
+    wide = out.pivot(index="time", columns="symbol", values="close")
+    assert wide.shape == (6, 3)
+    assert wide["A/BTC"].tolist()[:2] == [1.0, 1.0]
+    assert np.isnan(wide["A/BTC"].iloc[2])   # за межами fill_limit
+    assert np.isnan(wide["B/BTC"].iloc[0])   # до лістингу
+    # після останнього справжнього бару (делістинг / кінець історії) – NaN, а не застарілі ціни
+    assert wide[["A/BTC", "B/BTC"]].iloc[4:].isna().all().all()
+    assert wide["C/BTC"].iloc[1:].isna().all()
+    assert filled.to_dict() == {"A/BTC": 1, "B/BTC": 1, "C/BTC": 0}
+    assert out.loc[(out["symbol"] == "B/BTC") & (out["time"] == wide.index[2]), "volume"].item() == 0.0
+
+@pytest.fixture
+def fake_trades(tmp_path):
+    rng = np.random.default_rng(7)
+    n = 5000
+    times = pd.Timestamp("2025-02-01") + pd.to_timedelta(np.sort(rng.integers(0, 30 * 60_000, n)), unit="ms")
+    trades = pd.DataFrame({
+        "time": times,
+        "symbol": "ETH/BTC",
+        "id": np.arange(n),
+        "price": 100 + np.cumsum(rng.normal(0, 0.01, n)),
+        "amount": rng.exponential(1.0, n),
+        "side": "buy",
+    })
+    path = tmp_path / "trades.parquet"
+    trades.to_parquet(path)
+    return trades, str(path)
+
+def test_time_bars_match_resample(fake_trades):
+    trades, path = fake_trades
+    bars = build_bars(iter_trade_batches(path, batch_size=777), bar_type="time", threshold="1min")
+    expected = trades.set_index("time").resample("1min").agg(
+        {"price": ["first", "max", "min", "last"], "amount": "sum"}).dropna()
+    assert len(bars) == len(expected)
+    np.testing.assert_allclose(bars["open"], expected[("price", "first")])
+    np.testing.assert_allclose(bars["high"], expected[("price", "max")])
+    np.testing.assert_allclose(bars["close"], expected[("price", "last")])
+    np.testing.assert_allclose(bars["volume"], expected[("amount", "sum")])
+
+@pytest.mark.parametrize("bar_type, threshold", [("volume", 50.0), ("dollar", 5000.0), ("tick", 100)])
+def test_threshold_bars_independent_of_batching(fake_trades, tmp_path, bar_type, threshold):
+    trades, path = fake_trades
+    small = build_bars(iter_trade_batches(path, batch_size=333), bar_type=bar_type,
+                       threshold=threshold, keep_partial=False)
+    out_path = str(tmp_path / "bars.parquet")
+    build_bars(iter_trade_batches(path, batch_size=100_000), bar_type=bar_type,
+               threshold=threshold, out_path=out_path, keep_partial=False)
+    large = pd.read_parquet(out_path)
+    pd.testing.assert_frame_equal(small, large, check_dtype=False)
+    if bar_type == "tick":
+        assert len(small) == len(trades) // threshold
+    assert small["volume"].sum() <= trades["amount"].sum()
+
+
+class FakeTradeExchange:
+    """
+    Перші дві години періоду – без трейдів, далі 1200 трейдів в одну мс (більше
+    за сторінку) і пачки по 7 з однаковим мс (межі сторінок усередині мс).
+    """
+    def __init__(self, n=3000):
+        start = int(pd.Timestamp("2025-02-01 02:00").timestamp() * 1000)
+        self.trades = [{"id": i, "timestamp": start + max(i - 1199, 0) // 7 * 1000, "price": 1.0 + i, "amount": 1.0,
+                        "side": "buy"} for i in range(n)]
+
+    def fetch_trades(self, symbol, since=None, limit=None, params=None):
+        if params and "fromId" in params:
+            return [t for t in self.trades if t["id"] >= params["fromId"]][:limit]
+        return [t for t in self.trades if since <= t["timestamp"] < since + 3_600_000][:limit]
+
+
+def test_trade_loader_pages_without_gaps_or_duplicates(tmp_path):
+    loader = TradeLoader(trades_path=str(tmp_path), start_date="2025-02-01", end_date="2025-02-01 02:03",
+                         symbols=["ETH/BTC"])
+    loader.binance = FakeTradeExchange()
+    end = int(loader.end_date.timestamp() * 1000)
+    expected = [t["id"] for t in loader.binance.trades if t["timestamp"] < end]
+
+    with patch("core.data_loader.trades.time.sleep"):
+        paths = loader.load_trades()
+    assert pd.read_parquet(paths[0])["id"].tolist() == expected
+
+    bars = loader.build_bars(bar_type="tick", threshold=1000, keep_partial=False)
+    assert len(bars) == len(expected) // 1000
+
+
+def test_load_data_keeps_event_time_bars(fake_trades, tmp_path):
+    trades, path = fake_trades
+    # Тік-бар на кожен трейд: кілька барів мають той самий timestamp (трейди в одну мілісекунду)
+    assert trades["time"].duplicated().any()
+    out_path = str(tmp_path / "tick_bars.parquet")
+    build_bars(iter_trade_batches(path), bar_type="tick", threshold=1, out_path=out_path)
+
+    loader = DataLoader(data_path=out_path, start_date="2025-02-01", end_date="2025-02-02",
+                        align_grid=True)
+    df = loader.load_data()
+    # Без дедуплікації, 1-хв пропусків і вирівнювання на сітку
+    assert len(df) == len(trades)
+    assert df.attrs["bar_type"] == "tick"
+    assert (loader.gap_report[["duplicates", "gaps", "out_of_order"]] == 0).all().all()
+    assert "filled_bars" not in loader.gap_report.columns
+    np.testing.assert_allclose(df["close"], trades["price"])
+
+def test_strategy_runs_per_symbol_on_volume_bars(tmp_path):
+    # Два символи з різними моментами трейдів: volume-бари не мають спільних часових міток
+    rng = np.random.default_rng(11)
+    parts = []
+    for sym in ["ETH/BTC", "BNB/BTC"]:
+        n = 4000
+        parts.append(pd.DataFrame({
+            "time": pd.Timestamp("2025-02-01") + pd.to_timedelta(np.sort(rng.integers(0, 60 * 60_000, n)), unit="ms"),
+            "symbol": sym,
+            "price": 100 + np.cumsum(rng.normal(0, 0.05, n)),
+            "amount": rng.exponential(1.0, n),
+        }))
+    path = tmp_path / "trades.parquet"
+    pd.concat(parts).sort_values("time", kind="stable").to_parquet(path, index=False)
+    out_path = str(tmp_path / "bars.parquet")
+    build_bars(iter_trade_batches(str(path)), bar_type="volume", threshold=20.0, out_path=out_path)
+
+    bars = load_bars(out_path)
+    assert bars.attrs["bar_type"] == "volume"
+    strat = SmaCrossStrategy(bars, short_window=3, long_window=10)
+    assert strat.per_symbol
+    strat.run_backtest()
+
+    for sym, group in bars.groupby("symbol"):
+        single = SmaCrossStrategy(group.reset_index(drop=True), short_window=3, long_window=10)
+        assert not single.per_symbol
+        expected = single.generate_signals()[sym]
+        # На барах символу сигнали ті самі, що й при окремому запуску; є і входи, і виходи
+        pd.testing.assert_series_equal(strat.signals[sym].loc[expected.index], expected, check_dtype=False)
+        assert (expected == 1).any() and (expected == -1).any()
+        single.run_backtest()
+        assert strat.pf.total_return()[sym] == pytest.approx(single.pf.total_return()[sym])
+
+    with pytest.raises(ValueError):
+        CrossSectionalFactorStrategy(bars)
+
+
+class FakeExchange:
+    """
+    Біржа з трьома BTC-парами: OLD/BTC делістована в січні, NEW/BTC залістована в березні
+    (зараз найбільший обсяг), MID/BTC торгується весь час.
+    """
+    DAYS = {
+        "OLD/BTC": (pd.Timestamp("2024-06-01"), pd.Timestamp("2025-01-10"), 500.0),
+        "MID/BTC": (pd.Timestamp("2024-06-01"), pd.Timestamp("2025-06-01"), 100.0),
+        "NEW/BTC": (pd.Timestamp("2025-03-01"), pd.Timestamp("2025-06-01"), 900.0),
+    }
+
+    def __init__(self):
+        self.calls = {"markets": 0, "tickers": 0, "ohlcv": []}
+
+    def fetch_markets(self):
+        self.calls["markets"] += 1
+        return [
+            {"symbol": sym, "base": sym.split("/")[0], "quote": "BTC", "active": sym != "OLD/BTC",
+             "precision": {"price": 1e-8, "amount": 0.01}, "limits": {"amount": {"min": 0.01}, "cost": {"min": 1e-4}}}
+            for sym in self.DAYS
+        ] + [{"symbol": "ETH/USDT", "base": "ETH", "quote": "USDT", "active": True}]
+
+    def fetch_tickers(self):
+        self.calls["tickers"] += 1
+        return {sym: {"quoteVolume": vol} for sym, (_, _, vol) in self.DAYS.items()}
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls["ohlcv"].append((symbol, timeframe, since))
+        first, last, vol = self.DAYS[symbol]
+        if timeframe == "1d":
+            days = pd.date_range(max(first, pd.Timestamp(since, unit="ms")), last, freq="1D")[:limit]
+            return [[int(d.value // 1_000_000), 1.0, 1.0, 1.0, 1.0, vol] for d in days]
+        start = max(first, pd.Timestamp(since, unit="ms"))
+        minutes = pd.date_range(start, periods=limit, freq="1min")
+        minutes = minutes[minutes <= last]
+        return [[int(t.value // 1_000_000), 1.0, 1.0, 1.0, 1.0, 1.0] for t in minutes]
+
+
+def test_market_cache_ttl_and_snapshots(tmp_path):
+    ex = FakeExchange()
+    cache = MarketMetadataCache(str(tmp_path / "meta"), exchange=ex, ttl_hours=1.0)
+    first = cache.markets()
+    assert ex.calls["markets"] == 1
+    # Новий екземпляр читає знімок з диска, поки не минув TTL
+    again = MarketMetadataCache(str(tmp_path / "meta"), exchange=ex, ttl_hours=1.0).markets()
+    assert ex.calls["markets"] == 1
+    pd.testing.assert_frame_equal(first, again)
+    assert first.set_index("symbol").loc["MID/BTC", "amount_precision"] == 0.01
+
+    cache.markets(refresh=True)
+    assert ex.calls["markets"] == 2
+    assert cache.snapshot("2000-01-01") is None
+    assert cache.snapshot(pd.Timestamp.utcnow().tz_localize(None) + pd.Timedelta(minutes=1)) is not None
+
+
+def test_universe_is_point_in_time(tmp_path):
+    ex = FakeExchange()
+    cache = MarketMetadataCache(str(tmp_path / "meta"), exchange=ex)
+    # Сьогодні лідер – NEW/BTC, а OLD/BTC уже делістована
+    assert cache.universe(limit=2) == ["NEW/BTC", "MID/BTC"]
+    # На 2025-01-05 NEW/BTC ще не існувала, а OLD/BTC торгувалась з найбільшим обсягом
+    assert cache.universe(as_of="2025-01-05", limit=2) == ["OLD/BTC", "MID/BTC"]
+
+    n_calls = len(ex.calls["ohlcv"])
+    assert cache.universe(as_of="2025-01-05", limit=2) == ["OLD/BTC", "MID/BTC"]
+    assert len(ex.calls["ohlcv"]) == n_calls  # повторний вибір – лише з кешу
+
+    with open(cache.universe_log) as f:
+        assert len(f.readlines()) == 3
+
+
+def test_fetch_skips_symbols_outside_listing_range(tmp_path):
+    ex = FakeExchange()
+    loader = DataLoader(data_path=str(tmp_path / "data.parquet"), start_date="2025-02-01",
+                        end_date="2025-02-02", symbols=["OLD/BTC", "MID/BTC", "NEW/BTC"],
+                        meta_path=str(tmp_path / "meta"))
+    loader.binance = loader.market_cache.exchange = ex
+    df = loader.load_data()
+
+    minute_calls = [c for c in ex.calls["ohlcv"] if c[1] == "1m"]
+    assert {c[0] for c in minute_calls} == {"MID/BTC"}
+    assert df["symbol"].unique().tolist() == ["MID/BTC"]
+
+    # Кеш пам'ятає, з якого всесвіту і періоду його побудовано
+    cached = DataLoader(data_path=str(tmp_path / "data.parquet"), start_date="2025-02-01",
+                        end_date="2025-02-02", meta_path=str(tmp_path / "meta"))
+    cached.load_data()
+    assert cached.universe_info["symbols"] == ["OLD/BTC", "MID/BTC", "NEW/BTC"]
+    assert cached.universe_info["start_date"] == "2025-02-01T00:00:00"
+
+
+def test_synthetic_market_is_deterministic_and_consistent():
+    kwargs = dict(n_symbols=6, periods=3000, seed=5, correlation=0.6)
+    df = SyntheticMarket(**kwargs).to_frame()
+    pd.testing.assert_frame_equal(df, SyntheticMarket(**kwargs).to_frame())
+    assert not df["close"].equals(SyntheticMarket(**{**kwargs, "seed": 6}).to_frame()["close"])
+
+    assert len(df) == 6 * 3000
+    assert (df["low"] <= df[["open", "close"]].min(axis=1)).all()
+    assert (df["high"] >= df[["open", "close"]].max(axis=1)).all()
+    assert (df["volume"] > 0).all()
+
+    close = df.pivot(index="time", columns="symbol", values="close")
+    # open – попередній close, зокрема на межі блоків генерації
+    opens = df.pivot(index="time", columns="symbol", values="open")
+    np.testing.assert_allclose(opens.iloc[1:].to_numpy(), close.iloc[:-1].to_numpy())
+    corr = np.log(close).diff().corr().to_numpy()
+    assert abs(corr[np.triu_indices(6, 1)].mean() - 0.6) < 0.1
+
+
+def test_synthetic_parquet_matches_loader_schema(tmp_path):
+    market = SyntheticMarket(n_symbols=4, periods=2000, seed=1, gap_prob=0.002, gap_bars=4)
+    path = str(tmp_path / "synthetic.parquet")
+    n_rows = market.to_parquet(path)
+
+    schema = pq.read_schema(path)
+    assert schema.remove_metadata().equals(BAR_SCHEMA)
+    assert b"seed" in schema.metadata[SYNTHETIC_META_KEY]
+
+    loader = DataLoader(data_path=path, start_date="2025-02-01", end_date="2025-02-28")
     df = loader.load_data()
-    top_symbols = loader.get_top_liquid_symbols(limit=1)
-    assert len(top_symbols) == 1
+    assert len(df) == n_rows
+    expected = market.to_frame().sort_values(["symbol", "time"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(df.sort_values(["symbol", "time"]).reset_index(drop=True), expected)
+
+    # Пропуски: ~ gap_prob × gap_bars відсутніх барів, жодних дублікатів
+    _, report = inspect_bars(df)
+    missing = 4 * 2000 - n_rows
+    assert report["duplicates"].sum() == 0
+    assert 0.002 < missing / (4 * 2000) < 0.02
+
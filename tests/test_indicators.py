@@ -0,0 +1,71 @@
+import pytest
+import pandas as pd
+import numpy as np
+import ta
+
+from core import indicators
+from core.parallel import column_blocks, get_num_threads, run_column_blocks, set_num_threads
+from core.data_loader.synthetic import generate_ohlcv
+
+
+@pytest.fixture
+def panel():
+    # Широка панель з пропусками (NaN) і відрізком незмінної ціни
+    data = generate_ohlcv(n_symbols=7, periods=2000, seed=3, gap_prob=0.001)
+    wide = data.pivot(index="time", columns="symbol")
+    wide.iloc[100:130, wide.columns.get_loc(("close", "S000/BTC"))] = wide["close"].iloc[99, 0]
+    return wide
+
+
+@pytest.fixture
+def threads():
+    yield
+    set_num_threads(None)
+
+
+def assert_same(result: pd.DataFrame, expected: pd.DataFrame):
+    np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize("window", [5, 20, 1440])
+def test_rolling_kernels_match_pandas(panel, window):
+    close = panel["close"]
+    returns = close.pct_change(fill_method=None)
+    assert_same(indicators.rolling_sum(close, window), close.rolling(window).sum())
+    assert_same(indicators.rolling_mean(close, window), close.rolling(window).mean())
+    assert_same(indicators.rolling_std(returns, window), returns.rolling(window).std())
+    assert_same(indicators.rolling_std(close, window, ddof=0), close.rolling(window).std(ddof=0))
+    assert_same(indicators.rolling_max(close, window), close.rolling(window).max())
+    assert_same(indicators.rolling_min(close, window), close.rolling(window).min())
+
+
+def test_ta_kernels_match_ta(panel):
+    close, high, low = panel["close"], panel["high"], panel["low"]
+
+    expected_atr = pd.DataFrame({
+        c: ta.volatility.AverageTrueRange(high[c], low[c], close[c], window=14).average_true_range().to_numpy()
+        for c in close.columns
+    }, index=close.index)
+    assert_same(indicators.atr(high, low, close, window=14), expected_atr)
+
+    assert_same(indicators.rsi(close, window=14),
+                close.apply(lambda col: ta.momentum.RSIIndicator(col, window=14).rsi()))
+
+    lower, upper = indicators.bollinger_bands(close, window=20, window_dev=2.0)
+    bands = {c: ta.volatility.BollingerBands(close[c], window=20, window_dev=2.0) for c in close.columns}
+    assert_same(lower, pd.DataFrame({c: bands[c].bollinger_lband() for c in close.columns}))
+    assert_same(upper, pd.DataFrame({c: bands[c].bollinger_hband() for c in close.columns}))
+
+
+def test_results_do_not_depend_on_threads_or_blocks(panel, threads):
+    close = panel["close"]
+    assert set_num_threads(1) == get_num_threads() == 1
+    expected = indicators.rsi(close)
+
+    set_num_threads(3)
+    assert_same(indicators.rsi(close), expected)
+    out, = run_column_blocks(indicators._rsi_nb, [close.to_numpy()], args=(14,), block_cols=2)
+    np.testing.assert_array_equal(out, expected.to_numpy())
+
+    assert column_blocks(7, 3) == [(0, 2), (2, 5), (5, 7)]
+    assert column_blocks(2, 8) == [(0, 1), (1, 2)]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+import pandas as pd
+import numpy as np
+
+from core.optimizer import HalvingSearch
+
+
+GRID = {"short_window": [3, 5, 8, 13], "long_window": [20, 30, 50]}
+
+
+@pytest.fixture
+def trend_data():
+    # Незалежні символи з різними періодами циклу: найкращі вікна SMA відрізняються
+    # між символами, тож ранжування на частці даних не збігається з повним
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("2025-02-01", periods=400, freq="1min")
+    frames = []
+    for i in range(8):
+        period = rng.uniform(8, 40)
+        path = np.exp(np.cumsum(rng.normal(0, 0.004, len(dates))) + np.sin(np.arange(len(dates)) / period) * 0.05)
+        close = path * (i + 1)
+        frames.append(pd.DataFrame({
+            "time": dates, "symbol": f"S{i}/BTC",
+            "open": close, "high": close, "low": close, "close": close,
+            "volume": np.ones(len(dates)),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _ranking(search, r):
+    return sorted(((search.evaluate(p, r), json.dumps(p, sort_keys=True)) for p in search.candidates), reverse=True)
+
+
+@pytest.mark.parametrize("budget", ["symbols", "time"])
+def test_successive_halving_matches_full_grid(trend_data, budget):
+    search = HalvingSearch("SmaCrossStrategy", GRID, trend_data, eta=2, min_budget=0.25, budget=budget)
+    result = search.successive_halving()
+
+    grid = HalvingSearch("SmaCrossStrategy", GRID, trend_data, budget=budget)
+    full = _ranking(grid, 1.0)
+    # Переможець на найменшому бюджеті – інший, тож halving справді має що відсіювати
+    assert _ranking(grid, 0.25)[0][1] != full[0][1]
+
+    assert result["params"].iloc[0] == full[0][1]
+    assert np.isclose(result["score"].iloc[0], full[0][0])
+    assert [s["n_candidates"] for s in search.schedule] == [12, 6, 3]
+    # 12 × 1/4 + 6 × 1/2 + 3 × 1 повних прогонів замість 12
+    assert np.isclose(search.budget_used, 9.0)
+
+
+def test_time_budget_uses_period_prefix(trend_data):
+    search = HalvingSearch("SmaCrossStrategy", GRID, trend_data, budget="time")
+    subset = search._subset(0.25)
+    times = np.sort(trend_data["time"].unique())
+    assert subset["time"].max() == times[99]
+    assert subset["symbol"].nunique() == trend_data["symbol"].nunique()
+    assert len(subset) == len(trend_data) // 4
+
+
+def test_hyperband_schedule_is_reproducible(trend_data, tmp_path):
+    runs = []
+    for _ in range(2):
+        search = HalvingSearch("SmaCrossStrategy", GRID, trend_data, eta=2, min_budget=0.25,
+                               constraint=lambda p: p["short_window"] < p["long_window"], seed=11)
+        top = search.hyperband(sampler="tpe")
+        path = tmp_path / "schedule.json"
+        search.save_schedule(str(path))
+        runs.append(json.loads(path.read_text()))
+
+    assert not top.empty and (top["budget"] == 1.0).all()
+    assert runs[0]["schedule"] == runs[1]["schedule"]
+    assert runs[0]["history"] == runs[1]["history"]
+    assert sorted({s["bracket"] for s in runs[0]["schedule"]}) == [0, 1, 2]
@@ -0,0 +1,98 @@
+import pytest
+import pandas as pd
+import numpy as np
+
+from contextlib import closing
+
+from core.results_store import ResultsStore, data_fingerprint, file_fingerprint
+
+
+def _rows(rng, n_params=30):
+    return [{
+        "strategy": "SmaCrossStrategy",
+        "params": {"short_window": w, "long_window": 50},
+        "total_return": rng.normal(),
+        "sharpe_ratio": float(w),
+        "max_drawdown": -abs(rng.normal()),
+        "win_rate": None,
+        "exposure_time": np.nan,
+        "n_symbols": np.int64(3),
+    } for w in range(n_params)]
+
+
+def test_runs_are_appended_and_queried(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    rng = np.random.default_rng(0)
+    for _ in range(3):
+        run_id = store.start_run(data_fingerprint="abc", description="test", version="v1")
+        store.record(run_id, _rows(rng))
+
+    assert len(store.runs()) == 3
+    assert len(store.results()) == 30
+
+    top = store.top_params(metric="sharpe_ratio", n=5, last_runs=2)
+    assert len(top) == 5
+    assert top["sharpe_ratio"].tolist() == [29.0, 28.0, 27.0, 26.0, 25.0]
+    assert (top["n_results"] == 2).all()
+    assert '"short_window": 29' in top["params"].iloc[0]
+
+    with pytest.raises(ValueError):
+        store.top_params(metric="unknown")
+
+
+def test_symbol_metrics_and_fingerprint(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    run_id = store.start_run()
+    sym = pd.DataFrame({"total_return": [0.1, -0.2], "sharpe_ratio": [1.0, np.nan],
+                        "max_drawdown": [-0.1, -0.3]}, index=["ETH/BTC", "BNB/BTC"])
+    store.record(run_id, [{"strategy": "X", "params": {}, "total_return": -0.05, "symbol_metrics": sym}])
+    result_id = store.results(run_id)["result_id"].iloc[0]
+    per_symbol = store.symbol_results(int(result_id))
+    assert per_symbol["symbol"].tolist() == ["ETH/BTC", "BNB/BTC"]
+    assert per_symbol["sharpe_ratio"].isna().tolist() == [False, True]
+
+    df = pd.DataFrame({"a": [1, 2], "b": [3.0, 4.0]})
+    assert data_fingerprint(df) == data_fingerprint(df.copy())
+    assert data_fingerprint(df) != data_fingerprint(df.assign(b=[3.0, 5.0]))
+
+
+def test_top_params_summaries_match_results(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    rng = np.random.default_rng(1)
+    for _ in range(4):
+        run_id = store.start_run()
+        rows = [{"strategy": "SmaCrossStrategy" if w % 2 else "RsiBbStrategy", "params": {"w": int(w)},
+                 "total_return": rng.normal(), "sharpe_ratio": None if w == 3 else rng.normal(),
+                 "max_drawdown": -abs(rng.normal())} for w in rng.choice(40, size=30, replace=False)]
+        # Повторний запис того ж набору в той самий запуск теж потрапляє в середнє
+        store.record(run_id, rows + rows[:5])
+
+    with closing(store._connect()) as conn:
+        raw = pd.read_sql_query("SELECT r.run_id, p.strategy, p.params, r.sharpe_ratio FROM results r "
+                                "JOIN param_sets p ON p.param_id = r.param_id", conn)
+
+    def expected(last_runs, strategy=None):
+        df = raw[raw["run_id"] >= raw["run_id"].max() - last_runs + 1].dropna(subset=["sharpe_ratio"])
+        if strategy is not None:
+            df = df[df["strategy"] == strategy]
+        return df.groupby("params")["sharpe_ratio"].agg(["mean", "size"]).sort_values("mean", ascending=False)
+
+    # Одне вікно на кожен шлях: усі запуски, один запуск, кілька останніх
+    for last_runs, strategy in [(None, None), (4, "SmaCrossStrategy"), (1, None), (2, "RsiBbStrategy")]:
+        top = store.top_params(metric="sharpe_ratio", n=7, last_runs=last_runs, strategy=strategy)
+        exp = expected(last_runs or 4, strategy).head(7)
+        assert top["params"].tolist() == exp.index.tolist()
+        np.testing.assert_allclose(top["sharpe_ratio"], exp["mean"])
+        assert top["n_results"].tolist() == exp["size"].tolist()
+
+    with pytest.raises(ValueError):
+        store.top_params(last_runs=0)
+
+
+def test_file_fingerprint(tmp_path):
+    path = tmp_path / "data.parquet"
+    pd.DataFrame({"a": [1, 2]}).to_parquet(path)
+    first = file_fingerprint(str(path))
+    assert first == file_fingerprint(str(path))
+    pd.DataFrame({"a": [1, 3]}).to_parquet(path)
+    assert file_fingerprint(str(path)) != first
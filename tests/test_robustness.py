@@ -0,0 +1,86 @@
+import pytest
+import pandas as pd
+import numpy as np
+
+from core.robustness import analyze_portfolio, block_bootstrap, random_entry_baseline, trade_resample
+from strategies.sma_cross import SmaCrossStrategy
+
+
+@pytest.fixture
+def sample_data():
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("2025-02-01", periods=500, freq="1min")
+    symbols = ["ETH/BTC", "BNB/BTC"]
+    idx = pd.MultiIndex.from_product([dates, symbols], names=["time", "symbol"])
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, len(idx))))
+    df = pd.DataFrame({
+        "open": close,
+        "high": close,
+        "low": close,
+        "close": close,
+        "volume": rng.random(len(idx)) * 10,
+    }, index=idx).reset_index()
+    return df
+
+
+def test_trade_shuffle_keeps_total_return():
+    trade_returns = np.array([0.05, -0.02, 0.03, -0.04, 0.01])
+    res = trade_resample(trade_returns, n_sims=500, seed=0)
+    row = res.loc[("trade_shuffle", "total_return")]
+    assert row["ci_low"] == pytest.approx(row["actual"])
+    assert row["ci_high"] == pytest.approx(row["actual"])
+    dd = res.loc[("trade_shuffle", "max_drawdown")]
+    assert dd["ci_low"] <= dd["ci_high"] <= 0
+
+
+def test_block_bootstrap_is_deterministic_by_seed():
+    returns = np.random.default_rng(3).normal(0, 0.001, 2000)
+    a = block_bootstrap(returns, n_sims=300, block_size=20, seed=5)
+    b = block_bootstrap(returns, n_sims=300, block_size=20, seed=5)
+    pd.testing.assert_frame_equal(a, b)
+    row = a.loc[("block_bootstrap", "total_return")]
+    assert row["ci_low"] < row["mean"] < row["ci_high"]
+
+
+def test_trade_bootstrap_ci_and_p_value():
+    trade_returns = np.random.default_rng(2).normal(0.01, 0.005, 200)
+    res = trade_resample(trade_returns, n_sims=1000, replace=True, seed=0)
+    assert (res["ci_low"] <= res["ci_high"]).all()
+    assert res["p_value"].between(0, 1).all()
+    row = res.loc[("trade_bootstrap", "total_return")]
+    assert row["actual"] == pytest.approx(np.prod(1 + trade_returns) - 1)
+    # Стабільний позитивний edge: довірчий інтервал не перетинає нуль
+    assert 0 < row["ci_low"] <= row["actual"] <= row["ci_high"]
+
+
+def test_random_entry_detects_edge():
+    # Плоска ціна з трьома стрибками на 5%; угоди стратегії точно їх ловлять
+    close = np.full((1000, 2), 100.0)
+    jumps = [(200, 0), (500, 1), (800, 0)]
+    for bar, col in jumps:
+        close[bar:, col] *= 1.05
+    cols = np.array([col for _, col in jumps])
+    durations = np.full(len(jumps), 10)
+    trade_returns = np.array([close[b + 5, c] / close[b - 5, c] * 0.997 - 1 for b, c in jumps])
+
+    res = random_entry_baseline(close, cols, durations, trade_returns, n_sims=2000, seed=0)
+    assert (res["ci_low"] <= res["ci_high"]).all()
+    assert res["p_value"].between(0, 1).all()
+    assert res.loc[("random_entry", "total_return"), "p_value"] < 0.01
+
+    # Угоди, гірші за випадкові входи, – p_value великий
+    flat = random_entry_baseline(close, cols, durations, np.full(len(jumps), -0.01),
+                                 n_sims=2000, seed=0)
+    assert flat.loc[("random_entry", "total_return"), "p_value"] > 0.5
+
+
+def test_analyze_portfolio(sample_data):
+    strat = SmaCrossStrategy(sample_data, vol_threshold=0.0)
+    pf = strat.run_backtest()
+    res = analyze_portfolio(pf, n_sims=200, block_size=10)
+    methods = set(res.index.get_level_values("method"))
+    assert methods == {"block_bootstrap", "trade_shuffle", "trade_bootstrap", "random_entry"}
+    assert set(res.columns) >= {"actual", "ci_low", "ci_high", "p_value"}
+    valid = res.dropna(subset=["ci_low", "ci_high"])
+    assert (valid["ci_low"] <= valid["ci_high"]).all()
+    assert res["p_value"].dropna().between(0, 1).all()
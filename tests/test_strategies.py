@@ -9,6 +9,9 @@ from strategies.vwap_reversion import VwapReversionStrategy
 from strategies.multi_tf_momentum import MultiTimeframeMomentum
 from strategies.atr_trailing_breakout import AtrTrailingBreakout
 from strategies.volume_spike_breakout import VolumeSpikeBreakout
+from strategies.cross_sectional import top_k_ranks
+from strategies.cross_sectional_factor import CrossSectionalFactorStrategy
+from core.data_loader.synthetic import generate_ohlcv
 
 @pytest.fixture
 def sample_data():
@@ -93,3 +96,64 @@ def test_volume_spike_breakout_backtest(sample_data):
     pf = strat.run_backtest()
     metrics = strat.get_metrics()
     assert "sharpe_ratio" in metrics
+
+@pytest.fixture
+def universe_data():
+    rng = np.random.default_rng(7)
+    dates = pd.date_range("2025-02-01", periods=600, freq="1min")
+    symbols = [f"S{i}/BTC" for i in range(12)]
+    close = np.exp(np.cumsum(rng.normal(0, 0.003, (len(dates), len(symbols))), axis=0))
+    close[:200, 3] = np.nan  # символ з'являється пізніше
+    df = pd.DataFrame({
+        "time": np.repeat(dates, len(symbols)),
+        "symbol": np.tile(symbols, len(dates)),
+        "close": close.ravel(),
+        "volume": rng.random(close.size) * 10,
+    }).dropna()
+    df["open"] = df["high"] = df["low"] = df["close"]
+    return df
+
+def test_top_k_ranks_matches_full_sort():
+    rng = np.random.default_rng(0)
+    factor = rng.normal(size=(50, 20))
+    factor[::7, 2] = np.nan
+    ranks = top_k_ranks(factor, [1, 3, 8])
+    full = np.argsort(np.where(np.isnan(factor), np.inf, -factor), axis=1)
+    for k in [1, 3, 8]:
+        expected = np.zeros(factor.shape, dtype=bool)
+        np.put_along_axis(expected, full[:, :k], True, axis=1)
+        assert ((ranks < k) == expected).all()
+
+@pytest.mark.parametrize("factor", ["momentum", "volume_spike", "vwap_deviation"])
+def test_cross_sectional_backtest(universe_data, factor):
+    strat = CrossSectionalFactorStrategy(universe_data, factor=factor, lookback=30, top_k=4, rebalance_every=20)
+    signals = strat.generate_signals()
+    assert signals.shape == (600, 12)
+    # не більше top_k позицій одночасно і всі ваги на барі ребалансування в сумі дають 1
+    held = signals.cumsum()
+    assert held.max().max() <= 1 and held.sum(axis=1).max() <= 4
+    assert np.allclose(strat.weights.iloc[40].sum(), 1.0)
+
+    strat.run_backtest()
+    metrics = strat.get_metrics()
+    assert "sharpe_ratio" in metrics
+
+def test_cross_sectional_top_k_matches_portfolio(universe_data):
+    strat = CrossSectionalFactorStrategy(universe_data, lookback=30, top_k=4, rebalance_every=20)
+    pf = strat.run_backtest()
+    res = strat.run_top_k([1, 4, 12])
+    assert list(res.index) == [1, 4, 12]
+    assert np.isclose(res.loc[4, "total_return"], pf.total_return(), rtol=1e-9)
+    assert np.isclose(res.loc[4, "sharpe_ratio"], pf.sharpe_ratio(), rtol=1e-9)
+    assert np.isclose(res.loc[4, "max_drawdown"], pf.max_drawdown(), rtol=1e-9)
+
+
+def test_sma_cross_volatility_filter_on_synthetic_data():
+    # Фільтр волатильності має вікно 1440 барів: на 60 рядках він ніколи не спрацьовує
+    data = generate_ohlcv(n_symbols=3, periods=3 * 1440, seed=2)
+    signals = SmaCrossStrategy(data, vol_threshold=0.0).generate_signals()
+    filtered = SmaCrossStrategy(data, vol_threshold=1.0).generate_signals()
+    assert (signals.iloc[1440:] != 0).any().all()
+    pd.testing.assert_frame_equal(filtered.iloc[:1440], signals.iloc[:1440])
+    assert (filtered.iloc[1440:] == 0).all().all()
+
@@ -0,0 +1,159 @@
+import json
+import pytest
+from contextlib import closing
+import pandas as pd
+import numpy as np
+
+from core.sweep import SweepQueue, SweepWorker, build_tasks, expand_grid, run_local, main
+from core.metrics import compute_metrics
+from core.data_loader.synthetic import SyntheticMarket
+from strategies.sma_cross import SmaCrossStrategy
+from core.results_store import ResultsStore, file_fingerprint
+
+
+@pytest.fixture
+def sweep_parquet(tmp_path) -> str:
+    dates = pd.date_range("2025-02-01", periods=60, freq="1min")
+    symbols = ["ETH/BTC", "BNB/BTC", "XRP/BTC"]
+    idx = pd.MultiIndex.from_product([dates, symbols], names=["time", "symbol"])
+    n = len(idx)
+    df = pd.DataFrame({
+        "open": np.random.rand(n) * 100,
+        "high": np.random.rand(n) * 100,
+        "low": np.random.rand(n) * 100,
+        "close": np.random.rand(n) * 100,
+        "volume": np.random.rand(n) * 10,
+    }, index=idx).reset_index()
+    file_path = tmp_path / "sweep_data.parquet"
+    df.to_parquet(file_path, compression="snappy")
+    return str(file_path)
+
+
+def test_build_tasks_shapes():
+    grid = {"short_window": [5, 10, 15], "long_window": [20, 50]}
+    assert len(expand_grid(grid)) == 6
+    tasks = build_tasks("SmaCrossStrategy", grid, ["A", "B", "C"], params_per_task=4, symbols_per_shard=2)
+    # 2 чанки параметрів × 2 шарди символів
+    assert len(tasks) == 4
+    assert sum(len(t["params"]) for t in tasks) == 6 * 2
+
+
+def test_cross_sectional_strategy_is_not_sharded(tmp_path):
+    # Ранжування потребує всього всесвіту: один шард на чанк параметрів
+    tasks = build_tasks("CrossSectionalFactorStrategy", {"top_k": [1, 2]}, ["C", "A", "B"],
+                        params_per_task=1, symbols_per_shard=2)
+    assert len(tasks) == 2
+    assert all(t["symbols"] == ["A", "B", "C"] for t in tasks)
+
+    queue = SweepQueue(str(tmp_path / "queue.db"))
+    metrics = {"sharpe_ratio": 1.5, "total_return": 0.1, "n_symbols": 3}
+    queue.enqueue(tasks[:1])
+    task = queue.lease("w")
+    queue.complete(task["id"], "w", [{"params": task["params"][0], "metrics": metrics}])
+    merged = queue.merge_results()
+    assert merged["sharpe_ratio"].tolist() == [1.5]
+
+    # Шарди, зібрані в обхід build_tasks, не усереднюються
+    queue.enqueue([dict(tasks[0], shard=1, symbols=["A"])])
+    task = queue.lease("w")
+    queue.complete(task["id"], "w", [{"params": task["params"][0], "metrics": metrics}])
+    with pytest.raises(ValueError):
+        queue.merge_results()
+
+
+def test_stale_lease_is_released(tmp_path):
+    queue = SweepQueue(str(tmp_path / "queue.db"), lease_seconds=0.0, max_attempts=2)
+    queue.enqueue(build_tasks("SmaCrossStrategy", {"short_window": [5]}, ["A"]))
+
+    first = queue.lease("crashed-worker")
+    assert first is not None
+    # lease протух одразу – інший воркер перехоплює задачу
+    second = queue.lease("worker-2")
+    assert second["id"] == first["id"]
+    assert not queue.complete(first["id"], "crashed-worker", [])
+    assert queue.complete(second["id"], "worker-2", [])
+    assert queue.status_counts() == {"done": 1}
+
+
+def test_queue_journal_mode(tmp_path):
+    # За замовчуванням – rollback-журнал (працює на мережевих ФС), WAL – лише за запитом
+    for wal, mode in [(False, "delete"), (True, "wal")]:
+        queue = SweepQueue(str(tmp_path / f"queue_{mode}.db"), wal=wal)
+        with closing(queue._connect()) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == mode
+
+
+def test_run_local_merges_shards(tmp_path, sweep_parquet):
+    db_path = str(tmp_path / "queue.db")
+    queue = SweepQueue(db_path)
+    tasks = build_tasks("SmaCrossStrategy", {"short_window": [5, 10], "long_window": [20]},
+                        ["ETH/BTC", "BNB/BTC", "XRP/BTC"], params_per_task=1, symbols_per_shard=2)
+    queue.enqueue(tasks)
+
+    merged = run_local(db_path, sweep_parquet, n_workers=2)
+    assert queue.status_counts() == {"done": len(tasks)}
+    assert len(merged) == 2
+    assert (merged["n_symbols"] == 3).all()
+    assert (merged["n_shards"] == 2).all()
+    assert "sharpe_ratio" in merged.columns
+
+    per_shard = queue.merge_results(aggregate=False)
+    assert len(per_shard) == 4
+    # Час бектесту на шарді; при об'єднанні шардів – сума
+    assert (per_shard["elapsed_sec"] > 0).all()
+    expected = per_shard.groupby("params")["elapsed_sec"].sum()
+    np.testing.assert_allclose(merged.set_index("params").loc[expected.index, "elapsed_sec"], expected)
+
+    store_path = str(tmp_path / "results.db")
+    main(["merge", "--db", db_path, "--out", str(tmp_path / "sweep_metrics.csv"),
+          "--store", store_path, "--data", sweep_parquet])
+    store = ResultsStore(store_path)
+    assert store.runs()["data_fingerprint"].iloc[0] == file_fingerprint(sweep_parquet)
+    assert (store.results()["elapsed_sec"] > 0).all()
+
+
+def test_merged_shards_match_unsharded_metrics(tmp_path):
+    market = SyntheticMarket(n_symbols=6, periods=2000, seed=5)
+    data_path = str(tmp_path / "synthetic.parquet")
+    market.to_parquet(data_path)
+    params = {"short_window": 5, "long_window": 30, "vol_threshold": 0.0}
+
+    queue = SweepQueue(str(tmp_path / "queue.db"))
+    queue.enqueue(build_tasks("SmaCrossStrategy", {k: [v] for k, v in params.items()},
+                              market.symbols, symbols_per_shard=2))
+    SweepWorker(queue, data_path).run()
+    merged = queue.merge_results()
+
+    # win_rate і exposure_time не адитивні: їх перераховано з метрик символів та інтервалів угод
+    strat = SmaCrossStrategy(market.to_frame(), **params)
+    strat.run_backtest()
+    expected = compute_metrics(strat.pf)
+    assert merged["n_shards"].iloc[0] == 3
+    for key, value in expected.items():
+        assert merged[key].iloc[0] == pytest.approx(value, rel=1e-9), key
+
+    # Результати без складників (старі воркери): не адитивні метрики не зводяться
+    with closing(queue._connect()) as conn, conn:
+        for task_id, result in conn.execute("SELECT id, result FROM tasks").fetchall():
+            items = [{k: v for k, v in item.items() if k != "components"} for item in json.loads(result)]
+            conn.execute("UPDATE tasks SET result = ? WHERE id = ?", (json.dumps(items), task_id))
+    legacy = queue.merge_results()
+    assert legacy["win_rate"].isna().all() and legacy["exposure_time"].isna().all()
+    assert legacy["total_return"].iloc[0] == pytest.approx(expected["total_return"], rel=1e-9)
+
+
+def test_run_local_waits_for_crashed_workers_lease(tmp_path, sweep_parquet):
+    db_path = str(tmp_path / "queue.db")
+    queue = SweepQueue(db_path, lease_seconds=3.0)
+    queue.enqueue(build_tasks("SmaCrossStrategy", {"short_window": [5, 10], "long_window": [20]},
+                              ["ETH/BTC", "BNB/BTC", "XRP/BTC"], params_per_task=1, symbols_per_shard=3))
+    # Воркер узяв задачу і впав: після lease_seconds її має підхопити інший
+    assert queue.lease("dead-worker") is not None
+    with pytest.raises(RuntimeError):
+        queue.merge_results()
+    with pytest.warns(UserWarning):
+        assert len(queue.merge_results(allow_incomplete=True)) == 0
+
+    merged = run_local(db_path, sweep_parquet, n_workers=1, lease_seconds=3.0)
+    assert queue.status_counts() == {"done": 2}
+    assert len(merged) == 2